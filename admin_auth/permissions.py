@@ -3,7 +3,7 @@ from django.db import models
 from .models import AdminUser
 
 ROLE_PERMISSIONS = {
-    'super_admin': ['manage_admin_users','view_dashboard','manage_settings','manage_assets'],
+    'super_admin': ['manage_admin_users','view_dashboard','manage_settings','manage_assets','manage_payouts'],
     'admin': ['view_dashboard','manage_settings','manage_assets'],
     'moderator': ['view_dashboard','manage_assets'],
     'viewer': ['view_dashboard'],
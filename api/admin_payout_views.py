@@ -0,0 +1,40 @@
+from dataclasses import asdict
+from django.utils import timezone
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from .models import AuditLog
+from admin_auth.permissions import require_permission
+from payments.payout_jobs import job_summary
+from payments.payouts import request_run, run_lock, run_payouts
+
+
+def lock_state(lock):
+    return {
+        'running': bool(lock.lease_owner and lock.lease_expires_at and lock.lease_expires_at > timezone.now()),
+        'requested_at': lock.requested_at,
+        'requested_by': lock.requested_by,
+    }
+
+
+class AdminPayoutRunView(APIView):
+    """GET previews the sells ready for payout, with the payout job queue
+    by status and whether a run is in progress or requested; POST requests
+    a bulk run, which run_payouts --daemon carries out."""
+
+    @require_permission('view_dashboard')
+    def get(self, request):
+        return Response({
+            'success': True,
+            'run': asdict(run_payouts(dry_run=True)),
+            'jobs': job_summary(),
+            'lock': lock_state(run_lock()),
+        })
+
+    @require_permission('manage_payouts')
+    def post(self, request):
+        lock = request_run(request.admin.email)
+        AuditLog.objects.create(
+            action='ADMIN_PAYOUT_REQUESTED',
+            details=f'Payout run requested by {request.admin.email}',
+        )
+        return Response({'success': True, 'queued': True, 'lock': lock_state(lock)}, status=202)
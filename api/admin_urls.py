@@ -17,6 +17,8 @@ from .admin_views import (
     AdminSellOrderUpdateView,
 )
 from .admin_payment_settings_view import AdminExchangePaymentSettingsView
+from .admin_watcher_views import AdminWatcherMetricsView
+from .admin_payout_views import AdminPayoutRunView
 
 urlpatterns = [
     path('settings', AdminSettingsUpdateView.as_view()),
@@ -35,4 +37,6 @@ urlpatterns = [
     path('exchanges/<str:exchange_id>', AdminExchangeUpdateView.as_view()),
     path('sell-orders', AdminSellOrdersView.as_view()),
     path('sell-orders/<str:payment_id>', AdminSellOrderUpdateView.as_view()),
+    path('watcher/metrics', AdminWatcherMetricsView.as_view()),
+    path('payouts/run', AdminPayoutRunView.as_view()),
 ]
\ No newline at end of file
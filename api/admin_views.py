@@ -263,7 +263,7 @@ class AdminOverviewView(APIView):
         tx_total = Transaction.objects.count()
         tx_today = Transaction.objects.filter(created_at__gte=today_start).count()
         tx_week = Transaction.objects.filter(created_at__gte=week_start).count()
-        tx_pending = Transaction.objects.filter(status='pending').count()
+        tx_pending = Transaction.objects.filter(status__in=['pending', 'detected']).count()
         tx_completed = Transaction.objects.filter(status='completed').count()
         
         # Transaction volume
@@ -502,6 +502,10 @@ class AdminBuyOrderUpdateView(APIView):
         
         # Update fields
         if tx_hash is not None:
+            if tx_hash.strip() != (order.tx_hash or ''):
+                # New hash: let the delivery watcher check it straight away
+                order.next_check_at = None
+                order.check_failures = 0
             order.tx_hash = tx_hash.strip()
             
         if payment_status:
@@ -0,0 +1,18 @@
+from django.http import HttpResponse
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from admin_auth.permissions import require_permission
+from blockchain.stats import prometheus_text, watcher_stats
+
+
+class AdminWatcherMetricsView(APIView):
+    """Blockchain watcher health: provider latency, errors, backlog by age
+    and time to confirm. ``?output=prometheus`` returns the text format
+    for scraping."""
+
+    @require_permission('view_dashboard')
+    def get(self, request):
+        stats = watcher_stats()
+        if request.query_params.get('output') == 'prometheus':
+            return HttpResponse(prometheus_text(stats), content_type='text/plain; version=0.0.4')
+        return Response({'success': True, 'watcher': stats})
@@ -0,0 +1,6 @@
+from django.urls import path
+from .chain_webhook_views import ChainWebhookView
+
+urlpatterns = [
+    path('chain/webhooks/<str:provider>', ChainWebhookView.as_view()),
+]
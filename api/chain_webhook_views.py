@@ -0,0 +1,34 @@
+import json
+import logging
+
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from blockchain.webhooks import WEBHOOK_PROVIDERS, record_event
+
+logger = logging.getLogger(__name__)
+
+
+class ChainWebhookView(APIView):
+    """Receives BlockCypher / Alchemy notifications about watched transactions.
+
+    Only verifies and stores them; the watcher applies stored events under
+    the leases of the rows they are about.
+    """
+
+    def post(self, request, provider: str):
+        handler = WEBHOOK_PROVIDERS.get(provider)
+        if not handler:
+            return Response({'detail': 'not_found'}, status=404)
+        raw = request.body
+        if not handler['verify'](raw, request.headers, request.query_params):
+            return Response({'detail': 'invalid_signature'}, status=401)
+        try:
+            payload = json.loads(raw)
+        except ValueError:
+            return Response({'detail': 'invalid_payload'}, status=400)
+        if not isinstance(payload, dict):
+            return Response({'detail': 'invalid_payload'}, status=400)
+
+        event = record_event(provider, payload)
+        return Response({'success': True, 'duplicate': event is None})
@@ -0,0 +1,196 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application
+from django.test.utils import override_settings
+
+from api.models import Asset, BuyOrder, PaystackWebhookEvent, Transaction, Vendor
+from payments.standin import PaystackStandin
+from payments.webhooks import process_events
+
+from .paystack_standin import add_standin_arguments, standin_options
+
+STEPS = ["confirm", "initialize", "pay", "callback"]
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the buy checkout end to end against the local Paystack stand-in: serves the site on a "
+        "local port and runs concurrent customers through confirm, Paystack initialize, checkout, the "
+        "callback page and the charge.success webhook. Writes (and then removes) rows in the configured "
+        "database, so run it against a development database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--checkouts", type=int, default=200, help="Customers to run through checkout")
+        parser.add_argument("--concurrency", type=int, default=16, help="Customers checking out at once")
+        parser.add_argument("--amount", type=float, default=100.0, help="Order amount in GHS")
+        parser.add_argument("--timeout", type=float, default=120, help="Seconds to wait for webhooks to drain")
+        parser.add_argument("--keep", action="store_true", help="Keep the orders and events afterwards")
+        add_standin_arguments(parser)
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:8]
+        secret = getattr(settings, "PAYSTACK_SECRET_KEY", "") or f"sk_test_standin_{run_id}"
+        site = ThreadedWSGIServer(("127.0.0.1", 0), QuietHandler)
+        site.daemon_threads = True
+        site.set_app(get_internal_wsgi_application())
+        site_url = f"http://127.0.0.1:{site.server_address[1]}"
+        threading.Thread(target=site.serve_forever, name="benchmark-site", daemon=True).start()
+        standin = PaystackStandin(secret, webhook_url=f"{site_url}/api/paystack/webhook", **standin_options(options))
+
+        asset = Asset.objects.create(
+            symbol="USDT",
+            asset_name=f"Checkout benchmark {run_id}",
+            network="TRC20",
+            buy_rate=15,
+            network_fee_usd=0,
+        )
+        vendor = Vendor.objects.create(
+            name="Checkout benchmark",
+            email=f"checkout-{run_id}@example.invalid",
+            password_hash="!",
+            momo_number="0",
+            is_active=False,
+        )
+        orders = []
+        try:
+            with standin, override_settings(PAYSTACK_BASE_URL=standin.url, PAYSTACK_SECRET_KEY=secret):
+                self.run_benchmark(options, site_url, standin, asset, vendor, orders)
+        finally:
+            site.shutdown()
+            site.server_close()
+            if not options["keep"]:
+                PaystackWebhookEvent.objects.filter(reference__in=orders).delete()
+                Transaction.objects.filter(payment_id__in=orders).delete()
+                BuyOrder.objects.filter(order_id__in=orders).delete()
+                asset.delete()
+                vendor.delete()
+
+    def checkout(self, session, site_url, asset, vendor, amount):
+        """Run one customer through checkout; returns (order_id, step timings, error)."""
+        timings = {}
+
+        def step(name, call):
+            started = time.monotonic()
+            response = call()
+            timings[name] = time.monotonic() - started
+            return response
+
+        order_id = None
+        try:
+            r = step("confirm", lambda: session.post(f"{site_url}/api/buy/confirm", json={
+                "asset_id": asset.id,
+                "amount_ghs": amount,
+                "recipient_address": "TStandinCheckoutBenchmarkAddress00",
+                "vendor_email": vendor.email,
+            }))
+            if r.status_code != 200:
+                return order_id, timings, f"confirm {r.status_code}"
+            order_id = r.json()["order_id"]
+            r = step("initialize", lambda: session.post(f"{site_url}/api/buy/paystack/init", json={
+                "order_id": order_id,
+                "email": vendor.email,
+            }))
+            if r.status_code != 200:
+                return order_id, timings, f"initialize {r.status_code}"
+            authorization_url = r.json()["authorization_url"]
+            r = step("pay", lambda: session.get(authorization_url, allow_redirects=False))
+            if r.status_code != 302:
+                return order_id, timings, f"pay {r.status_code}"
+            r = step("callback", lambda: session.get(r.headers["Location"]))
+            if r.status_code != 200:
+                return order_id, timings, f"callback {r.status_code}"
+        except requests.RequestException as exc:
+            return order_id, timings, type(exc).__name__
+        return order_id, timings, None
+
+    def run_benchmark(self, options, site_url, standin, asset, vendor, orders):
+        count = options["checkouts"]
+        self.stdout.write(
+            f"Running {count} checkouts, {options['concurrency']} at a time: Paystack latency "
+            f"{options['latency']}s, errors {options['error_rate']:.0%}, stalls {options['stall_rate']:.0%}."
+        )
+        local = threading.local()
+
+        def one(_):
+            if not hasattr(local, "session"):
+                local.session = requests.Session()
+            return self.checkout(local.session, site_url, asset, vendor, options["amount"])
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            results = list(pool.map(one, range(count)))
+        elapsed = time.monotonic() - started
+
+        errors = {}
+        timings = {name: [] for name in STEPS}
+        totals = []
+        for order_id, steps, error in results:
+            if order_id:
+                orders.append(order_id)
+            if error:
+                errors[error] = errors.get(error, 0) + 1
+                continue
+            for name, seconds in steps.items():
+                timings[name].append(seconds)
+            totals.append(sum(steps.values()))
+        completed = len(totals)
+        self.stdout.write(self.style.SUCCESS(
+            f"Completed {completed}/{count} checkouts in {elapsed:.1f}s: {completed / elapsed:.1f} checkouts/s."
+        ))
+        for name, values in [*timings.items(), ("total", totals)]:
+            values.sort()
+            if values:
+                self.stdout.write(
+                    f"  {name:<10} p50 {percentile(values, 0.5) * 1000:7.1f}ms  "
+                    f"p95 {percentile(values, 0.95) * 1000:7.1f}ms  p99 {percentile(values, 0.99) * 1000:7.1f}ms"
+                )
+        if errors:
+            self.stdout.write(self.style.WARNING(
+                "Failed checkouts: " + ", ".join(f"{error}={n}" for error, n in sorted(errors.items()))
+            ))
+
+        # Wait for the stand-in to deliver its charge.success webhooks, then
+        # apply the inbox the way process_paystack_events would.
+        deadline = time.monotonic() + options["timeout"]
+        while standin.webhooks_pending() and time.monotonic() < deadline:
+            time.sleep(0.1)
+        applied = 0
+        while True:
+            batch = process_events()
+            applied += batch
+            if not batch:
+                break
+        paid = BuyOrder.objects.filter(order_id__in=orders, payment_status="paid").count()
+        stats = standin.snapshot()
+        self.stdout.write(
+            "Webhooks: " + ", ".join(f"{key}={n}" for key, n in sorted(stats["webhooks"].items()))
+            + f"; {applied} events applied, {paid}/{len(orders)} orders marked paid."
+        )
+        self.stdout.write(
+            f"Paystack requests: {stats['requests']} over {stats['connections']} connections; "
+            + ", ".join(f"{call}={n}" for call, n in sorted(stats["calls"].items()))
+        )
+        if stats["injected"]:
+            self.stdout.write(
+                "Injected faults: " + ", ".join(f"{kind}={n}" for kind, n in sorted(stats["injected"].items()))
+            )
+        if options["keep"]:
+            self.stdout.write(f"Kept {len(orders)} orders: {orders[0]} ... {orders[-1]}" if orders else "No orders")
@@ -0,0 +1,80 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.standin import PaystackStandin
+
+
+def add_standin_arguments(parser):
+    parser.add_argument("--latency", type=float, default=0.05, help="Mean API latency, in seconds")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Standard deviation of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of API calls answered with 500")
+    parser.add_argument(
+        "--stall-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of API calls applied but answered --stall seconds late",
+    )
+    parser.add_argument("--stall", type=float, default=30.0, help="Seconds a stalled call is held")
+    parser.add_argument("--settle-after", type=float, default=1.0, help="Seconds a transfer stays pending")
+    parser.add_argument(
+        "--transfer-failure-rate", type=float, default=0.0, help="Fraction of transfers that settle as failed"
+    )
+    parser.add_argument("--webhook-delay", type=float, default=0.2, help="Seconds before a webhook is sent")
+    parser.add_argument(
+        "--duplicate-rate", type=float, default=0.0, help="Fraction of webhooks delivered a second time"
+    )
+
+
+def standin_options(options) -> dict:
+    return {
+        "latency": options["latency"],
+        "jitter": options["jitter"],
+        "error_rate": options["error_rate"],
+        "stall_rate": options["stall_rate"],
+        "stall": options["stall"],
+        "settle_after": options["settle_after"],
+        "transfer_failure_rate": options["transfer_failure_rate"],
+        "webhook_delay": options["webhook_delay"],
+        "duplicate_rate": options["duplicate_rate"],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve the local Paystack stand-in until interrupted. Start the site with "
+        "PAYSTACK_STANDIN_URL set to the printed URL to send its Paystack calls here."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument(
+            "--webhook-url",
+            default=None,
+            help="Where to POST signed webhooks, e.g. http://127.0.0.1:8000/api/paystack/webhook",
+        )
+        add_standin_arguments(parser)
+
+    def handle(self, *args, **options):
+        secret = getattr(settings, "PAYSTACK_SECRET_KEY", "")
+        if not secret:
+            raise CommandError("PAYSTACK_SECRET_KEY must be set: the stand-in checks it and signs webhooks with it.")
+        standin = PaystackStandin(
+            secret,
+            webhook_url=options["webhook_url"],
+            host=options["host"],
+            port=options["port"],
+            **standin_options(options),
+        )
+        with standin:
+            self.stdout.write(self.style.SUCCESS(f"Paystack stand-in listening on {standin.url}"))
+            if not options["webhook_url"]:
+                self.stdout.write(self.style.WARNING("No --webhook-url: webhooks will not be sent."))
+            try:
+                while True:
+                    time.sleep(60)
+            except KeyboardInterrupt:
+                pass
+        self.stdout.write(f"Paystack stand-in stopped: {standin.snapshot()}")
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from payments.webhooks import process_events
+
+
+class Command(BaseCommand):
+    help = "Apply stored Paystack webhook events (payments and payouts) in arrival order."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=200, help="Maximum events to apply per batch")
+        parser.add_argument("--daemon", action="store_true", help="Keep running, polling every --interval seconds")
+        parser.add_argument("--interval", type=float, default=1, help="Seconds between polls when idle")
+
+    def handle(self, *args, **options):
+        if not options["daemon"]:
+            self.stdout.write(f"Applied {process_events(options['limit'])} Paystack events.")
+            return
+        try:
+            while True:
+                close_old_connections()
+                applied = process_events(options["limit"])
+                if applied:
+                    self.stdout.write(f"Applied {applied} Paystack events.")
+                if applied < options["limit"]:
+                    time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Paystack event worker stopped.")
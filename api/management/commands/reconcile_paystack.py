@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from payments.reconcile import sync_all
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconcile buy orders, VIP payments and sell payouts against Paystack's transaction and transfer "
+        "listings, reading only what is new since the last run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Ignore the stored cursors and read everything")
+        parser.add_argument("--daemon", action="store_true", help="Keep running, syncing every --interval seconds")
+        parser.add_argument("--interval", type=float, default=300, help="Seconds between syncs in daemon mode")
+
+    def run_once(self, full):
+        for report in sync_all(full).values():
+            style = self.style.WARNING if report.errors else self.style.SUCCESS
+            self.stdout.write(style(
+                f"{report.stream}: {report.records} records over {report.pages} pages, "
+                f"{report.applied} updates applied."
+            ))
+            for error in report.errors:
+                self.stdout.write(self.style.ERROR(f"  {error}"))
+
+    def handle(self, *args, **options):
+        if not options["daemon"]:
+            self.run_once(options["full"])
+            return
+        full = options["full"]
+        try:
+            while True:
+                close_old_connections()
+                self.run_once(full)
+                full = False
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Paystack reconciliation stopped.")
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from blockchain.leases import default_worker_id
+from payments.payout_jobs import run_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Work the payout job queue: submit queued Paystack transfers, verify submitted ones and retry "
+        "failures with backoff. Several workers can run at once; each leases the jobs it works on."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=50, help="Jobs to lease per batch")
+        parser.add_argument("--concurrency", type=int, default=4, help="Paystack calls in flight at once")
+        parser.add_argument("--daemon", action="store_true", help="Keep running, polling every --interval seconds")
+        parser.add_argument("--interval", type=float, default=2, help="Seconds between polls when idle")
+
+    def run_once(self, owner, options):
+        run = run_jobs(owner, options["limit"], options["concurrency"])
+        if run.claimed:
+            self.stdout.write(
+                f"{run.claimed} jobs: {run.submitted} submitted, {run.succeeded} succeeded, "
+                f"{run.retried} to retry, {run.dead} dead."
+            )
+        if run.lost:
+            self.stdout.write(self.style.WARNING(f"  Lost the lease on {run.lost} jobs; results dropped."))
+        for error in run.errors:
+            self.stdout.write(self.style.WARNING(f"  {error}"))
+        return run
+
+    def handle(self, *args, **options):
+        owner = f"payouts:{default_worker_id()}"
+        if not options["daemon"]:
+            self.run_once(owner, options)
+            return
+        try:
+            while True:
+                close_old_connections()
+                run = self.run_once(owner, options)
+                if run.claimed < options["limit"]:
+                    time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Payout job worker stopped.")
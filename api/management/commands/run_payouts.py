@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.models import AuditLog
+from blockchain.leases import default_worker_id
+from payments.payouts import PayoutRunBusy, run_lock, run_payouts, run_requested
+
+
+class Command(BaseCommand):
+    help = (
+        "Pay out every confirmed sell without a payout through Paystack bulk transfers. Only one run "
+        "pays at a time; with --daemon, carry out the runs requested from the admin payout page."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be paid")
+        parser.add_argument("--daemon", action="store_true", help="Keep running, polling for requested runs")
+        parser.add_argument("--interval", type=float, default=5, help="Seconds between polls for requests")
+
+    def run_once(self, owner, dry_run=False):
+        try:
+            run = run_payouts(dry_run=dry_run, owner=owner)
+        except PayoutRunBusy:
+            lock = run_lock()
+            self.stdout.write(self.style.WARNING(
+                f"Another payout run ({lock.lease_owner}) holds the lock until {lock.lease_expires_at}."
+            ))
+            return None
+        self.stdout.write(f"{run.ready} sells ready for payout, GHS {run.amount_ghs:,.2f}.")
+        if dry_run:
+            return run
+        self.stdout.write(self.style.SUCCESS(
+            f"Submitted {run.submitted} transfers ({run.succeeded} succeeded, {run.failed} failed), "
+            f"recovered {run.recovered} earlier submissions, created {run.recipients_created} recipients."
+        ))
+        if run.skipped:
+            self.stdout.write(self.style.WARNING(
+                f"Skipped {len(run.skipped)} sells without a recipient code: {', '.join(run.skipped)}"
+            ))
+        for error in run.errors:
+            self.stdout.write(self.style.ERROR(error))
+        return run
+
+    def handle(self, *args, **options):
+        owner = f"payout-run:{default_worker_id()}"
+        if not options["daemon"]:
+            self.run_once(owner, options["dry_run"])
+            return
+        try:
+            while True:
+                close_old_connections()
+                if run_requested():
+                    requested_by = run_lock().requested_by
+                    run = self.run_once(owner)
+                    if run is not None:
+                        AuditLog.objects.create(
+                            action="ADMIN_PAYOUT_RUN",
+                            details=(
+                                f"Requested by {requested_by or 'unknown'}: submitted {run.submitted} of "
+                                f"{run.ready} payouts (GHS {run.amount_ghs}), {len(run.errors)} errors"
+                            ),
+                        )
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Payout run worker stopped.")
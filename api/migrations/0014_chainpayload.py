@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:16
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_transaction_lease_expires_at_transaction_lease_owner'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChainPayload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('network', models.CharField(blank=True, max_length=20)),
+                ('payload', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('transaction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chain_payloads', to='api.transaction')),
+            ],
+        ),
+    ]
@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+
+def _hex_to_int(value):
+    if isinstance(value, str) and value.startswith('0x'):
+        return int(value, 16)
+    return value
+
+
+def _compact(meta, confirmations):
+    """Summarise a raw provider payload in the v1 chain_metadata layout."""
+    compact = {
+        'v': 1,
+        'block_number': None,
+        'confirmations': confirmations,
+        'matched_output': None,
+        'amount': None,
+        'status': None,
+    }
+    receipt = meta.get('receipt') or meta.get('result')
+    if isinstance(receipt, dict):
+        # EVM receipt, either bare or inside the JSON-RPC envelope
+        compact['block_number'] = _hex_to_int(receipt.get('blockNumber'))
+        compact['status'] = 'success' if _hex_to_int(receipt.get('status')) == 1 else 'failed'
+    elif isinstance(meta.get('log'), dict):
+        compact['block_number'] = _hex_to_int(meta['log'].get('blockNumber'))
+        compact['status'] = 'success'
+    elif 'outputs' in meta:
+        # BlockCypher /txs payload
+        height = meta.get('block_height')
+        compact['block_number'] = height if isinstance(height, int) and height >= 0 else None
+        compact['status'] = 'failed' if meta.get('double_spend') else ('success' if confirmations else 'pending')
+    elif 'ret' in meta:
+        # TronGrid transaction
+        ret = meta.get('ret') or [{}]
+        contract_ret = ret[0].get('contractRet')
+        compact['block_number'] = meta.get('blockNumber')
+        compact['status'] = 'success' if contract_ret == 'SUCCESS' else (contract_ret or 'pending').lower()
+    return compact
+
+
+def compact_chain_metadata(apps, schema_editor):
+    Transaction = apps.get_model('api', 'Transaction')
+    ChainPayload = apps.get_model('api', 'ChainPayload')
+    # Archive the original payloads only where the watcher would archive
+    # them too; otherwise they are dropped along with the row's copy.
+    archive = getattr(settings, 'BLOCKCHAIN_STORE_RAW_PAYLOADS', False)
+    qs = Transaction.objects.exclude(chain_metadata={}).only('id', 'network', 'chain_metadata', 'blockchain_confirmations')
+    batch, payloads = [], []
+
+    def flush():
+        ChainPayload.objects.bulk_create(payloads)
+        Transaction.objects.bulk_update(batch, ['chain_metadata'])
+        batch.clear()
+        payloads.clear()
+
+    for tx in qs.iterator(chunk_size=BATCH_SIZE):
+        meta = tx.chain_metadata
+        if not isinstance(meta, dict) or meta.get('v'):
+            continue
+        if archive:
+            payloads.append(ChainPayload(transaction_id=tx.id, network=tx.network, payload=meta))
+        tx.chain_metadata = _compact(meta, tx.blockchain_confirmations)
+        batch.append(tx)
+        if len(batch) >= BATCH_SIZE:
+            flush()
+    if batch:
+        flush()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_chainpayload'),
+    ]
+
+    operations = [
+        migrations.RunPython(compact_chain_metadata, migrations.RunPython.noop),
+    ]
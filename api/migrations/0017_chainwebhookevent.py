@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:25
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_buyorder_delivery_tracking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChainWebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(max_length=20)),
+                ('event_key', models.CharField(max_length=128)),
+                ('payload', models.JSONField(default=dict)),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('processed_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('provider', 'event_key'), name='unique_chain_webhook_event')],
+            },
+        ),
+    ]
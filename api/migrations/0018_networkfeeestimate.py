@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:27
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_chainwebhookevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NetworkFeeEstimate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('network', models.CharField(max_length=20, unique=True)),
+                ('fee_native', models.FloatField(default=0.0)),
+                ('fee_usd', models.FloatField(default=0.0)),
+                ('native_usd', models.FloatField(blank=True, null=True)),
+                ('samples', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
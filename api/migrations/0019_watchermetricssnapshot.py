@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:29
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_networkfeeestimate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WatcherMetricsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('worker', models.CharField(max_length=100, unique=True)),
+                ('snapshot', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:38
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_paystackwebhookevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaystackSyncCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stream', models.CharField(max_length=20, unique=True)),
+                ('synced_to', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='payout_reference',
+            field=models.CharField(blank=True, db_index=True, max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='transfer_code',
+            field=models.CharField(blank=True, db_index=True, max_length=100, null=True),
+        ),
+    ]
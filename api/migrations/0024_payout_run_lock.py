@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0023_paystack_event_leases'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayoutRunLock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(default='payouts', max_length=20, unique=True)),
+                ('lease_owner', models.CharField(blank=True, max_length=100, null=True)),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.CharField(blank=True, max_length=255)),
+            ],
+        ),
+    ]
@@ -71,9 +71,9 @@ class Transaction(models.Model):
     network_fee = models.FloatField(default=0.0)
     vendor_receives = models.FloatField(blank=True, null=True)
     status = models.CharField(max_length=20, default='pending')
-    payout_reference = models.CharField(max_length=100, blank=True, null=True)
+    payout_reference = models.CharField(max_length=100, blank=True, null=True, db_index=True)
     payout_status = models.CharField(max_length=20, blank=True, null=True)
-    transfer_code = models.CharField(max_length=100, blank=True, null=True)
+    transfer_code = models.CharField(max_length=100, blank=True, null=True, db_index=True)
     description = models.TextField(blank=True, null=True)
     customer_email = models.EmailField(blank=True, null=True)
     created_at = models.DateTimeField(default=timezone.now)
@@ -82,8 +82,23 @@ class Transaction(models.Model):
     completed_at = models.DateTimeField(blank=True, null=True)
     blockchain_confirmations = models.IntegerField(default=0)
     last_chain_check = models.DateTimeField(blank=True, null=True)
+    next_check_at = models.DateTimeField(blank=True, null=True, db_index=True)
+    check_failures = models.PositiveIntegerField(default=0)
+    lease_owner = models.CharField(max_length=100, blank=True, null=True)
+    lease_expires_at = models.DateTimeField(blank=True, null=True, db_index=True)
     chain_metadata = models.JSONField(default=dict, blank=True)
 
+class ChainPayload(models.Model):
+    """Append-only archive of raw blockchain provider responses.
+
+    Transaction.chain_metadata only keeps a compact summary; the full
+    payloads land here when BLOCKCHAIN_STORE_RAW_PAYLOADS is enabled.
+    """
+    transaction = models.ForeignKey(Transaction, on_delete=models.CASCADE, related_name='chain_payloads')
+    network = models.CharField(max_length=20, blank=True)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now)
+
 class BuyOrder(models.Model):
     order_id = models.CharField(max_length=100, unique=True)
     
@@ -103,6 +118,15 @@ class BuyOrder(models.Model):
     recipient_address = models.CharField(max_length=255)
     tx_hash = models.CharField(max_length=255, blank=True, null=True)
     
+    # Delivery tracking, maintained by the blockchain watcher once tx_hash is sent
+    delivery_confirmations = models.IntegerField(default=0)
+    last_chain_check = models.DateTimeField(blank=True, null=True)
+    next_check_at = models.DateTimeField(blank=True, null=True, db_index=True)
+    check_failures = models.PositiveIntegerField(default=0)
+    lease_owner = models.CharField(max_length=100, blank=True, null=True)
+    lease_expires_at = models.DateTimeField(blank=True, null=True, db_index=True)
+    chain_metadata = models.JSONField(default=dict, blank=True)
+    
     # Status Tracking
     status = models.CharField(max_length=20, default='pending')  # Overall status
     payment_status = models.CharField(max_length=20, default='pending')  # NEW: pending, paid, failed
@@ -298,4 +322,140 @@ class Review(models.Model):
         ]
     
     def __str__(self):
-        return f"Review by {self.vendor.name} - {self.rating} stars"
\ No newline at end of file
+        return f"Review by {self.vendor.name} - {self.rating} stars"
+
+class ChainScanCursor(models.Model):
+    """Last block the log scanner has fully processed on a network"""
+    network = models.CharField(max_length=20, unique=True)
+    last_block = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.network} @ {self.last_block}"
+
+class ChainWebhookEvent(models.Model):
+    """Address/transaction notification pushed by a blockchain provider.
+
+    Stored as received so a failed update can be retried by the watcher.
+    event_key dedupes provider retries.
+    """
+    provider = models.CharField(max_length=20)
+    event_key = models.CharField(max_length=128)
+    payload = models.JSONField(default=dict)
+    received_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(blank=True, null=True, db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['provider', 'event_key'], name='unique_chain_webhook_event'),
+        ]
+
+    def __str__(self):
+        return f"{self.provider} {self.event_key}"
+
+class NetworkFeeEstimate(models.Model):
+    """Smoothed cost of one outgoing transfer on a network, kept by the fee oracle"""
+    network = models.CharField(max_length=20, unique=True)
+    fee_native = models.FloatField(default=0.0)
+    fee_usd = models.FloatField(default=0.0)
+    native_usd = models.FloatField(blank=True, null=True)
+    samples = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.network}: ${self.fee_usd:.4f}"
+
+class WatcherMetricsSnapshot(models.Model):
+    """Latest in-process metrics published by one blockchain watcher worker"""
+    worker = models.CharField(max_length=100, unique=True)
+    snapshot = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.worker} @ {self.updated_at}"
+
+class PaystackWebhookEvent(models.Model):
+    """Paystack webhook delivery, stored before it is acted on.
+
+    The webhook view only verifies and appends here; process_paystack_events
+    applies events in arrival order. event_key dedupes Paystack's retries.
+    Workers lease the events they apply, the same way payout jobs are leased.
+    """
+    event = models.CharField(max_length=50)
+    event_key = models.CharField(max_length=150, unique=True)
+    reference = models.CharField(max_length=150, blank=True, db_index=True)
+    payload = models.JSONField(default=dict)
+    received_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(blank=True, null=True, db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    lease_owner = models.CharField(max_length=100, blank=True, null=True)
+    lease_expires_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.event} {self.reference}"
+
+class PaystackSyncCursor(models.Model):
+    """How far the Paystack reconciliation job has read one listing
+    (transactions or transfers)"""
+    stream = models.CharField(max_length=20, unique=True)
+    synced_to = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.stream} @ {self.synced_to}"
+
+class PayoutRunLock(models.Model):
+    """Single row that serialises bulk payout runs.
+
+    run_payouts leases it for the length of a run, so cron, the CLI and
+    admin requests never pay the same sells at once. The admin endpoint only
+    sets requested_at; run_payouts --daemon picks the request up.
+    """
+    name = models.CharField(max_length=20, unique=True, default='payouts')
+    lease_owner = models.CharField(max_length=100, blank=True, null=True)
+    lease_expires_at = models.DateTimeField(blank=True, null=True)
+    requested_at = models.DateTimeField(blank=True, null=True)
+    requested_by = models.CharField(max_length=255, blank=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.lease_owner or 'idle'})"
+
+class PayoutJob(models.Model):
+    """Queued Paystack transfer for one sell.
+
+    idempotency_key comes from the sell's payment_id, so queueing the same
+    payout twice returns the existing job. reference is the Paystack
+    transfer reference of the current attempt; it only changes after
+    Paystack reports that transfer failed. run_payout_jobs submits, verifies
+    and retries jobs; ones that run out of attempts end up "dead".
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('submitted', 'Submitted'),
+        ('succeeded', 'Succeeded'),
+        ('dead', 'Dead'),
+    ]
+    transaction = models.OneToOneField(Transaction, on_delete=models.CASCADE, related_name='payout_job')
+    idempotency_key = models.CharField(max_length=100, unique=True)
+    reference = models.CharField(max_length=50, unique=True)
+    amount_ghs = models.FloatField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    # Transfers Paystack reported failed; each retry after one gets a new reference.
+    generation = models.PositiveIntegerField(default=0)
+    transfer_code = models.CharField(max_length=100, blank=True)
+    # Set once a transfer request for the current reference has been sent,
+    # after which the job is verified before it is ever sent again.
+    submitted_at = models.DateTimeField(blank=True, null=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now, db_index=True)
+    lease_owner = models.CharField(max_length=100, blank=True, null=True)
+    lease_expires_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.reference} ({self.status})"
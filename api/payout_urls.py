@@ -1,5 +1,6 @@
 from django.urls import path
-from .payout_views import CreateRecipientView, InitiateTransferView, VerifyTransferView, PaystackWebhookView
+from .payout_views import CreateRecipientView, InitiateTransferView, VerifyTransferView
+from .paystack_webhook_views import PaystackWebhookView
 
 urlpatterns = [
     path('payouts/recipient', CreateRecipientView.as_view()),
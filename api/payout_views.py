@@ -1,9 +1,9 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from django.utils import timezone
 from django.db import transaction as dbtx
 from .models import Vendor, Transaction
-from payments.paystack import create_recipient, initiate_transfer, verify_transfer
+from payments.paystack import create_recipient, verify_transfer
+from payments.payout_jobs import PayoutConflict, enqueue
 
 class CreateRecipientView(APIView):
     def post(self, request):
@@ -23,20 +23,26 @@ class CreateRecipientView(APIView):
 class InitiateTransferView(APIView):
     def post(self, request):
         payment_id = request.data.get('payment_id')
-        t = Transaction.objects.filter(payment_id=payment_id).first()
+        t = Transaction.objects.filter(payment_id=payment_id).select_related('vendor').first()
         if not t:
             return Response({'detail':'transaction_not_found'}, status=404)
         v = t.vendor
         if not v.paystack_recipient_code:
             return Response({'detail':'missing_recipient_code'}, status=400)
-        code, body = initiate_transfer(t.fiat_amount or 0, v.paystack_recipient_code, f'Payout {payment_id}')
-        if code in (200, 201) and body.get('status'):
-            data = body.get('data') or {}
-            t.transfer_code = data.get('transfer_code') or data.get('reference') or t.transfer_code
-            t.payout_status = 'processing'
-            t.save()
-            return Response({'success': True, 'transfer_code': t.transfer_code})
-        return Response({'detail':'paystack_error', 'body': body}, status=400)
+        if not t.fiat_amount or t.fiat_amount <= 0:
+            return Response({'detail':'invalid_amount'}, status=400)
+        try:
+            job, created = enqueue(t)
+        except PayoutConflict as e:
+            return Response({'detail':'payout_in_progress', 'payout_status': str(e)}, status=409)
+        # Submitted by run_payout_jobs; the response never waits on Paystack.
+        return Response({
+            'success': True,
+            'queued': created,
+            'reference': job.reference,
+            'status': job.status,
+            'transfer_code': job.transfer_code or t.transfer_code,
+        }, status=202 if created else 200)
 
 class VerifyTransferView(APIView):
     def post(self, request):
@@ -46,25 +52,3 @@ class VerifyTransferView(APIView):
             status_text = body.get('data', {}).get('status')
             return Response({'success': True, 'status': status_text})
         return Response({'detail':'verification_failed', 'body': body}, status=400)
-
-class PaystackWebhookView(APIView):
-    def post(self, request):
-        event = request.data.get('event')
-        data = request.data.get('data') or {}
-        if event == 'transfer.success':
-            ref = data.get('reference') or data.get('transfer_code')
-            if ref:
-                t = Transaction.objects.filter(transfer_code=ref).first()
-                if t:
-                    t.payout_status = 'success'
-                    t.status = 'completed'
-                    t.completed_at = timezone.now()
-                    t.save()
-        elif event == 'transfer.failed':
-            ref = data.get('reference') or data.get('transfer_code')
-            if ref:
-                t = Transaction.objects.filter(transfer_code=ref).first()
-                if t:
-                    t.payout_status = 'failed'
-                    t.save()
-        return Response({'ok': True})
\ No newline at end of file
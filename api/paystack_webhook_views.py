@@ -0,0 +1,27 @@
+import json
+
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from payments.webhooks import record_event, verify_signature
+
+
+class PaystackWebhookView(APIView):
+    """Paystack webhook inbox for charge and transfer events.
+
+    Only verifies and stores the delivery; process_paystack_events applies
+    it. Served at both /api/paystack/webhook and /api/payouts/webhook.
+    """
+
+    def post(self, request):
+        raw = request.body
+        if not verify_signature(raw, request.META.get('HTTP_X_PAYSTACK_SIGNATURE')):
+            return Response({'detail': 'invalid_signature'}, status=401)
+        try:
+            payload = json.loads(raw)
+        except ValueError:
+            return Response({'detail': 'invalid_payload'}, status=400)
+        if not isinstance(payload, dict):
+            return Response({'detail': 'invalid_payload'}, status=400)
+        event = record_event(payload)
+        return Response({'success': True, 'duplicate': event is None})
@@ -0,0 +1,122 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from api.models import PayoutJob, Transaction, Vendor
+from payments.payout_jobs import JobRun, claim_jobs, enqueue, run_jobs, write_back
+from payments.payouts import payout_reference
+
+
+def transfer(status, reference, code='TRF_1'):
+    return {'status': True, 'data': {'status': status, 'reference': reference, 'transfer_code': code}}
+
+
+class PayoutJobTests(TestCase):
+    def setUp(self):
+        self.vendor = Vendor.objects.create(
+            name='V', email='v@example.com', password_hash='!', momo_number='0244000000',
+            paystack_recipient_code='RCP_1',
+        )
+
+    def sell(self, payment_id='S-1', **fields):
+        return Transaction.objects.create(
+            payment_id=payment_id, type='sell', vendor=self.vendor, crypto_amount=10, network='TRC20',
+            wallet_address='T', fiat_amount=150, status=fields.pop('status', 'crypto_confirmed'), **fields,
+        )
+
+    def test_enqueue_is_idempotent(self):
+        t = self.sell()
+        job, created = enqueue(t)
+        again, created_again = enqueue(t)
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(job.pk, again.pk)
+        self.assertEqual(job.reference, payout_reference('S-1'))
+
+    def test_enqueue_after_failed_bulk_payout_uses_a_new_reference(self):
+        t = self.sell(payout_status='failed', payout_reference=payout_reference('S-1'))
+        job, created = enqueue(t)
+        t.refresh_from_db()
+        self.assertTrue(created)
+        self.assertEqual(job.generation, 1)
+        self.assertNotEqual(job.reference, payout_reference('S-1'))
+        self.assertEqual(t.payout_reference, job.reference)
+
+    def test_successful_submit_completes_the_sell(self):
+        t = self.sell()
+        job, _ = enqueue(t)
+        answer = (200, transfer('success', job.reference))
+        with mock.patch('payments.payout_jobs.initiate_transfer', return_value=answer) as send:
+            run = run_jobs('worker-a')
+        job.refresh_from_db()
+        t.refresh_from_db()
+        send.assert_called_once()
+        self.assertEqual(run.succeeded, 1)
+        self.assertEqual(job.status, 'succeeded')
+        self.assertIsNone(job.lease_owner)
+        self.assertEqual((t.status, t.payout_status), ('completed', 'success'))
+
+    def test_timed_out_submit_is_verified_not_resent(self):
+        t = self.sell()
+        job, _ = enqueue(t)
+        with mock.patch('payments.payout_jobs.initiate_transfer', side_effect=TimeoutError('read timed out')):
+            run_jobs('worker-a')
+        PayoutJob.objects.filter(pk=job.pk).update(next_attempt_at=timezone.now())
+        answer = (200, transfer('success', job.reference))
+        with mock.patch('payments.payout_jobs.initiate_transfer') as send, \
+                mock.patch('payments.payout_jobs.verify_transfer', return_value=answer):
+            run_jobs('worker-a')
+        send.assert_not_called()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'succeeded')
+
+    def test_failed_transfer_moves_to_the_next_reference(self):
+        t = self.sell()
+        job, _ = enqueue(t)
+        first = job.reference
+        PayoutJob.objects.filter(pk=job.pk).update(status='submitted', submitted_at=timezone.now())
+        with mock.patch('payments.payout_jobs.verify_transfer', return_value=(200, transfer('failed', first))):
+            run_jobs('worker-a')
+        job.refresh_from_db()
+        t.refresh_from_db()
+        self.assertEqual(job.status, 'queued')
+        self.assertEqual(job.generation, 1)
+        self.assertNotEqual(job.reference, first)
+        self.assertEqual(t.payout_reference, job.reference)
+
+    def test_results_for_a_lost_lease_are_dropped(self):
+        t = self.sell()
+        enqueue(t)
+        jobs = claim_jobs('worker-a', 10)
+        # The lease ran out and another worker took the job over.
+        PayoutJob.objects.filter(pk=jobs[0].pk).update(
+            lease_owner='worker-b', lease_expires_at=timezone.now() + timedelta(minutes=2),
+        )
+        jobs[0].status = 'dead'
+        jobs[0].transaction.payout_status = 'failed'
+        run = JobRun()
+        with self.assertLogs('payments.payout_jobs', 'WARNING'):
+            write_back('worker-a', jobs, timezone.now(), run)
+        job = PayoutJob.objects.get(pk=jobs[0].pk)
+        t.refresh_from_db()
+        self.assertEqual(run.lost, 1)
+        self.assertEqual((job.status, job.lease_owner), ('queued', 'worker-b'))
+        self.assertEqual(t.payout_status, 'queued')
+
+    def test_sell_completed_during_the_call_is_not_overwritten(self):
+        t = self.sell()
+        enqueue(t)
+        jobs = claim_jobs('worker-a', 10)
+        completed_at = timezone.now() - timedelta(minutes=1)
+        Transaction.objects.filter(pk=t.pk).update(
+            status='completed', payout_status='success', completed_at=completed_at,
+        )
+        jobs[0].status = 'submitted'
+        jobs[0].transaction.payout_status = 'processing'
+        write_back('worker-a', jobs, timezone.now(), JobRun())
+        t.refresh_from_db()
+        job = PayoutJob.objects.get(pk=jobs[0].pk)
+        self.assertEqual((t.status, t.payout_status, t.completed_at), ('completed', 'success', completed_at))
+        self.assertEqual(job.status, 'succeeded')
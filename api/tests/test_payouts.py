@@ -0,0 +1,96 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from admin_auth.models import AdminUser
+from api.models import PayoutRunLock, Transaction, Vendor
+from payments.payouts import PayoutRunBusy, acquire_run_lock, payout_reference, run_payouts
+
+
+def bulk_answer(entries):
+    return 200, {'status': True, 'data': [
+        {'reference': reference, 'status': status, 'transfer_code': f'TRF_{n}'}
+        for n, (reference, status) in enumerate(entries)
+    ]}
+
+
+class RunPayoutsTests(TestCase):
+    def setUp(self):
+        self.vendor = Vendor.objects.create(
+            name='V', email='v@example.com', password_hash='!', momo_number='0244000000',
+            paystack_recipient_code='RCP_1',
+        )
+
+    def sell(self, payment_id, **fields):
+        return Transaction.objects.create(
+            payment_id=payment_id, type='sell', vendor=self.vendor, crypto_amount=10, network='TRC20',
+            wallet_address='T', fiat_amount=150, status='crypto_confirmed', **fields,
+        )
+
+    def test_pays_ready_sells_in_one_bulk_request(self):
+        first, second = self.sell('S-1'), self.sell('S-2')
+        self.sell('S-3', payout_status='queued')
+        answer = bulk_answer([(payout_reference('S-1'), 'success'), (payout_reference('S-2'), 'pending')])
+        with mock.patch('payments.payouts.initiate_bulk_transfer', return_value=answer) as send:
+            run = run_payouts(owner='cron')
+        send.assert_called_once()
+        self.assertEqual(len(send.call_args[0][0]), 2)
+        self.assertEqual((run.ready, run.submitted, run.succeeded), (2, 2, 1))
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.status, first.payout_status), ('completed', 'success'))
+        self.assertEqual((second.status, second.payout_status), ('crypto_confirmed', 'processing'))
+        self.assertIsNone(PayoutRunLock.objects.get().lease_owner)
+
+    def test_interrupted_submission_is_recovered_not_resent(self):
+        t = self.sell('S-1', payout_status='submitting', payout_reference=payout_reference('S-1'))
+        found = (200, {'status': True, 'data': {'status': 'success', 'transfer_code': 'TRF_1'}})
+        with mock.patch('payments.payouts.verify_transfer', return_value=found), \
+                mock.patch('payments.payouts.initiate_bulk_transfer') as send:
+            run = run_payouts(owner='cron')
+        send.assert_not_called()
+        t.refresh_from_db()
+        self.assertEqual(run.recovered, 1)
+        self.assertEqual(t.payout_status, 'success')
+
+    def test_second_run_is_refused_while_one_holds_the_lock(self):
+        self.sell('S-1')
+        self.assertTrue(acquire_run_lock('cron'))
+        with mock.patch('payments.payouts.initiate_bulk_transfer') as send:
+            with self.assertRaises(PayoutRunBusy):
+                run_payouts(owner='cli')
+        send.assert_not_called()
+        self.assertEqual(Transaction.objects.get().payout_status, None)
+
+    def test_dry_run_ignores_the_lock(self):
+        self.sell('S-1')
+        acquire_run_lock('cron')
+        self.assertEqual(run_payouts(dry_run=True).ready, 1)
+
+
+class AdminPayoutRunViewTests(TestCase):
+    def admin(self, role):
+        admin = AdminUser.objects.create(username=role, email=f'{role}@example.com', role=role, password_hash='!')
+        admin.generate_session()
+        admin.save()
+        return {'HTTP_AUTHORIZATION': f'Bearer {admin.session_token}'}
+
+    def test_post_queues_a_run_instead_of_paying(self):
+        with mock.patch('payments.payouts.initiate_bulk_transfer') as send:
+            response = self.client.post('/api/admin/payouts/run', **self.admin('super_admin'))
+        send.assert_not_called()
+        self.assertEqual(response.status_code, 202)
+        lock = PayoutRunLock.objects.get()
+        self.assertIsNotNone(lock.requested_at)
+        self.assertEqual(lock.requested_by, 'super_admin@example.com')
+
+    def test_post_needs_the_payout_permission(self):
+        response = self.client.post('/api/admin/payouts/run', **self.admin('admin'))
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(PayoutRunLock.objects.filter(requested_at__isnull=False).exists())
+
+    def test_get_reports_the_lock(self):
+        acquire_run_lock('cron')
+        response = self.client.get('/api/admin/payouts/run', **self.admin('viewer'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['lock']['running'])
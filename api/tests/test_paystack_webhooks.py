@@ -0,0 +1,139 @@
+import hashlib
+import hmac
+import json
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.models import BuyOrder, PaystackWebhookEvent, PayoutJob, Transaction, Vendor
+from payments.payout_jobs import enqueue
+from payments.webhooks import MAX_EVENT_ATTEMPTS, apply_event, claim_events, process_events, record_event
+
+SECRET = 'sk_test_webhooks'
+
+
+def payload(event, reference, subject=None):
+    return {'event': event, 'data': {'id': subject or reference, 'reference': reference}}
+
+
+def fail(data):
+    raise RuntimeError('handler blew up')
+
+
+@override_settings(PAYSTACK_SECRET_KEY=SECRET)
+class WebhookViewTests(TestCase):
+    def post(self, body, signature=None):
+        raw = json.dumps(body).encode()
+        signature = signature or hmac.new(SECRET.encode(), raw, hashlib.sha512).hexdigest()
+        return self.client.post(
+            '/api/paystack/webhook', raw, content_type='application/json', HTTP_X_PAYSTACK_SIGNATURE=signature,
+        )
+
+    def test_stores_delivery_once(self):
+        body = payload('charge.success', 'BUY-1')
+        self.assertEqual(self.post(body).json(), {'success': True, 'duplicate': False})
+        self.assertEqual(self.post(body).json(), {'success': True, 'duplicate': True})
+        self.assertEqual(PaystackWebhookEvent.objects.count(), 1)
+
+    def test_rejects_bad_signature(self):
+        self.assertEqual(self.post(payload('charge.success', 'BUY-1'), signature='0' * 128).status_code, 401)
+        self.assertFalse(PaystackWebhookEvent.objects.exists())
+
+
+class ProcessEventsTests(TestCase):
+    def setUp(self):
+        self.order = BuyOrder.objects.create(
+            order_id='BUY-1', amount_ghs=100, rate_usd_to_ghs=15, usdt_amount=6, total_charge_ghs=100,
+            network='TRC20', recipient_address='T',
+        )
+
+    def test_charge_success_marks_order_paid(self):
+        event = record_event(payload('charge.success', 'BUY-1'))
+        self.assertEqual(process_events(owner='worker-a'), 1)
+        self.order.refresh_from_db()
+        event.refresh_from_db()
+        self.assertEqual(self.order.payment_status, 'paid')
+        self.assertIsNotNone(event.processed_at)
+        self.assertIsNone(event.lease_owner)
+        self.assertEqual(process_events(owner='worker-a'), 0)
+
+    def test_events_leased_elsewhere_are_left_alone(self):
+        first = record_event(payload('charge.success', 'BUY-1', subject='1'))
+        record_event(payload('transfer.success', 'BUY-1', subject='2'))
+        PaystackWebhookEvent.objects.filter(pk=first.pk).update(
+            lease_owner='worker-b', lease_expires_at=timezone.now() + timedelta(minutes=1),
+        )
+        # The later event waits for the earlier one held by worker-b.
+        self.assertEqual(claim_events('worker-a', 10), [])
+        self.assertEqual(process_events(owner='worker-a'), 0)
+        self.assertFalse(PaystackWebhookEvent.objects.filter(processed_at__isnull=False).exists())
+
+    def test_expired_lease_is_taken_over(self):
+        event = record_event(payload('charge.success', 'BUY-1'))
+        PaystackWebhookEvent.objects.filter(pk=event.pk).update(
+            lease_owner='worker-b', lease_expires_at=timezone.now() - timedelta(seconds=1),
+        )
+        self.assertEqual(process_events(owner='worker-a'), 1)
+
+    def test_lost_lease_is_not_applied(self):
+        event = record_event(payload('charge.success', 'BUY-1'))
+        [claimed] = claim_events('worker-a', 10)
+        PaystackWebhookEvent.objects.filter(pk=event.pk).update(lease_owner='worker-b')
+        self.assertFalse(apply_event(claimed, 'worker-a'))
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, 'pending')
+
+    @mock.patch.dict('payments.webhooks.EVENT_HANDLERS', {'test.fail': fail})
+    def test_failed_event_holds_back_its_reference_until_dead(self):
+        failing = record_event(payload('test.fail', 'BUY-1', subject='1'))
+        record_event(payload('charge.success', 'BUY-1', subject='2'))
+        other = record_event(payload('charge.success', 'BUY-2', subject='3'))
+        with self.assertLogs('payments.webhooks', 'ERROR'):
+            self.assertEqual(process_events(owner='worker-a'), 1)
+        failing.refresh_from_db()
+        other.refresh_from_db()
+        self.order.refresh_from_db()
+        self.assertEqual((failing.attempts, failing.lease_owner), (1, None))
+        self.assertIsNotNone(other.processed_at)
+        self.assertEqual(self.order.payment_status, 'pending')
+
+        PaystackWebhookEvent.objects.filter(pk=failing.pk).update(attempts=MAX_EVENT_ATTEMPTS)
+        self.assertEqual(process_events(owner='worker-a'), 1)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, 'paid')
+
+
+class TransferEventTests(TestCase):
+    def setUp(self):
+        vendor = Vendor.objects.create(name='V', email='v@example.com', password_hash='!', momo_number='0')
+        self.sell = Transaction.objects.create(
+            payment_id='S-1', type='sell', vendor=vendor, crypto_amount=10, network='TRC20', wallet_address='T',
+            fiat_amount=150, status='crypto_confirmed',
+        )
+        self.job, _ = enqueue(self.sell)
+        later = timezone.now() + timedelta(minutes=1)
+        PayoutJob.objects.filter(pk=self.job.pk).update(
+            status='submitted', submitted_at=timezone.now(), next_attempt_at=later,
+        )
+        Transaction.objects.filter(pk=self.sell.pk).update(payout_status='processing')
+
+    def transfer(self, event):
+        record_event({'event': event, 'data': {'id': 1, 'reference': self.job.reference, 'transfer_code': 'TRF_1'}})
+        return process_events(owner='worker-a')
+
+    def test_transfer_success_completes_sell_and_job(self):
+        self.assertEqual(self.transfer('transfer.success'), 1)
+        self.sell.refresh_from_db()
+        self.job.refresh_from_db()
+        self.assertEqual((self.sell.status, self.sell.payout_status), ('completed', 'success'))
+        self.assertEqual(self.job.status, 'succeeded')
+
+    def test_transfer_failed_wakes_the_job_instead_of_failing_the_sell(self):
+        self.assertEqual(self.transfer('transfer.failed'), 1)
+        self.sell.refresh_from_db()
+        self.job.refresh_from_db()
+        self.assertEqual(self.sell.payout_status, 'processing')
+        self.assertEqual(self.job.status, 'submitted')
+        self.assertLessEqual(self.job.next_attempt_at, timezone.now())
@@ -0,0 +1,98 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from api.models import BuyOrder, PaystackSyncCursor, Transaction, Vendor
+from learn_crypto.models import Membership, Payment
+from payments.reconcile import apply_charges, apply_transfers, sync_stream
+
+
+def charge(reference, email='vip@example.com', amount=500000, status='success'):
+    return {'reference': reference, 'status': status, 'amount': amount, 'customer': {'email': email}}
+
+
+class ApplyChargesTests(TestCase):
+    def setUp(self):
+        self.vendor = Vendor.objects.create(name='V', email='VIP@example.com', password_hash='!', momo_number='0')
+
+    def test_marks_unpaid_buy_order_paid(self):
+        BuyOrder.objects.create(
+            order_id='BUY-1', amount_ghs=100, rate_usd_to_ghs=15, usdt_amount=6, total_charge_ghs=100,
+            network='TRC20', recipient_address='T',
+        )
+        Transaction.objects.create(
+            payment_id='BUY-1', type='buy', vendor=self.vendor, crypto_amount=6, network='TRC20', wallet_address='T',
+        )
+        self.assertEqual(apply_charges([charge('BUY-1'), charge('BUY-2', status='abandoned')]), 1)
+        order = BuyOrder.objects.get(order_id='BUY-1')
+        self.assertEqual((order.payment_status, order.status), ('paid', 'processing'))
+        self.assertEqual(Transaction.objects.get(payment_id='BUY-1').status, 'processing')
+        # Re-reading the same page changes nothing.
+        self.assertEqual(apply_charges([charge('BUY-1')]), 0)
+
+    def test_unverified_vip_charge_creates_payment_by_customer_email(self):
+        self.assertEqual(apply_charges([charge('VIP_1_1')]), 1)
+        payment = Payment.objects.get(reference='VIP_1_1')
+        membership = Membership.objects.get(user=self.vendor)
+        self.assertEqual((payment.user, payment.status, payment.amount), (self.vendor, 'success', 5000))
+        self.assertEqual(payment.membership, membership)
+        self.assertTrue(membership.is_active())
+        self.assertEqual(apply_charges([charge('VIP_1_1')]), 0)
+
+    def test_vip_charge_for_unknown_email_is_skipped(self):
+        with self.assertLogs('payments.reconcile', 'WARNING'):
+            self.assertEqual(apply_charges([charge('VIP_2_1', email='nobody@example.com')]), 0)
+        self.assertFalse(Payment.objects.exists())
+
+    def test_failed_vip_payment_is_marked_successful(self):
+        Payment.objects.create(user=self.vendor, amount=5000, reference='VIP_3_1', status='failed')
+        self.assertEqual(apply_charges([charge('VIP_3_1')]), 1)
+        self.assertEqual(Payment.objects.get(reference='VIP_3_1').status, 'success')
+        self.assertTrue(Membership.objects.get(user=self.vendor).is_vip)
+
+
+class ApplyTransfersTests(TestCase):
+    def test_final_status_reaches_sell(self):
+        vendor = Vendor.objects.create(name='V', email='v@example.com', password_hash='!', momo_number='0')
+        sell = Transaction.objects.create(
+            payment_id='S-1', type='sell', vendor=vendor, crypto_amount=10, network='TRC20', wallet_address='T',
+            status='crypto_confirmed', payout_status='processing', payout_reference='payout-s-1000000',
+        )
+        records = [{'reference': 'payout-s-1000000', 'transfer_code': 'TRF_1', 'status': 'success'}]
+        self.assertEqual(apply_transfers(records), 1)
+        sell.refresh_from_db()
+        self.assertEqual((sell.payout_status, sell.status), ('success', 'completed'))
+        self.assertEqual(apply_transfers(records), 0)
+
+    def test_stale_transfer_of_a_retried_payout_is_ignored(self):
+        vendor = Vendor.objects.create(name='V', email='v@example.com', password_hash='!', momo_number='0')
+        sell = Transaction.objects.create(
+            payment_id='S-1', type='sell', vendor=vendor, crypto_amount=10, network='TRC20', wallet_address='T',
+            status='crypto_confirmed', payout_status='processing', payout_reference='payout-s-1-1',
+            transfer_code='TRF_OLD',
+        )
+        records = [{'reference': 'payout-s-1', 'transfer_code': 'TRF_OLD', 'status': 'failed'}]
+        self.assertEqual(apply_transfers(records), 0)
+        sell.refresh_from_db()
+        self.assertEqual(sell.payout_status, 'processing')
+
+
+class SyncStreamTests(TestCase):
+    def test_cursor_only_advances_when_every_page_was_read(self):
+        listing = (lambda params: (200, {'status': True, 'data': [], 'meta': {'pageCount': 1}}), apply_charges)
+        with mock.patch.dict('payments.reconcile.STREAMS', {'transactions': listing}):
+            report = sync_stream('transactions')
+        cursor = PaystackSyncCursor.objects.get(stream='transactions')
+        self.assertEqual(report.pages, 1)
+        self.assertGreater(cursor.synced_to, timezone.now() - timedelta(minutes=1))
+
+        synced_to = cursor.synced_to
+        failing = (lambda params: (500, {'status': False, 'message': 'down'}), apply_charges)
+        with mock.patch.dict('payments.reconcile.STREAMS', {'transactions': failing}), \
+                self.assertLogs('payments.reconcile', 'WARNING'):
+            report = sync_stream('transactions')
+        cursor.refresh_from_db()
+        self.assertEqual(len(report.errors), 1)
+        self.assertEqual(cursor.synced_to, synced_to)
@@ -0,0 +1,93 @@
+import threading
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from api.models import BuyOrder, Transaction, Vendor
+from payments.verification import FINAL_TTL, PENDING_TTL, VerificationCache, ttl_for
+
+
+class VerificationCacheTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_concurrent_requests_share_one_fetch(self):
+        cache = VerificationCache()
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            release.wait(5)
+            return True, FINAL_TTL
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get('REF-1', fetch))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [True] * 8)
+
+    def test_pending_outcome_expires_quickly(self):
+        cache = VerificationCache()
+        with mock.patch('time.time', return_value=1000.0):
+            cache.get('REF-1', lambda: (False, ttl_for('abandoned')))
+        with mock.patch('time.time', return_value=1000.0 + PENDING_TTL + 1):
+            self.assertTrue(cache.get('REF-1', lambda: (True, ttl_for('success'))))
+        self.assertEqual(cache.snapshot()['misses'], 2)
+
+    def test_outcome_is_shared_between_processes(self):
+        VerificationCache().get('REF-1', lambda: (True, FINAL_TTL))
+        other = VerificationCache()
+        self.assertTrue(other.get('REF-1', lambda: (False, FINAL_TTL)))
+        self.assertEqual(other.snapshot(), {'hits': 1, 'misses': 0})
+
+    def test_waits_for_a_verify_claimed_by_another_process(self):
+        store = caches['default']
+        store.add('paystack-verify:REF-1:lock', 1, 30)
+        threading.Timer(0.05, lambda: store.set('paystack-verify:REF-1', True, FINAL_TTL)).start()
+        fetch = mock.Mock(return_value=(False, FINAL_TTL))
+        with mock.patch('payments.verification.LOCK_POLL', 0.01):
+            self.assertTrue(VerificationCache().get('REF-1', fetch))
+        fetch.assert_not_called()
+
+
+def verify_response(status):
+    response = mock.Mock(status_code=200)
+    response.json.return_value = {'status': True, 'data': {'status': status, 'customer': {'email': 'c@example.com'}}}
+    return response
+
+
+@override_settings(PAYSTACK_SECRET_KEY='sk_test_callback')
+class PaystackCallbackTests(TestCase):
+    def setUp(self):
+        Vendor.objects.create(name='C', email='c@example.com', password_hash='!', momo_number='0')
+        self.order = BuyOrder.objects.create(
+            order_id='BUY-1', amount_ghs=100, rate_usd_to_ghs=15, usdt_amount=6, total_charge_ghs=100,
+            network='TRC20', recipient_address='T',
+        )
+        caches['default'].clear()
+        patcher = mock.patch('web.views.verification_cache', VerificationCache())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_paid_order_is_not_verified_again(self):
+        BuyOrder.objects.filter(pk=self.order.pk).update(payment_status='paid')
+        with mock.patch('web.views.http_client.get') as get:
+            response = self.client.get('/paystack/callback?reference=BUY-1')
+        get.assert_not_called()
+        self.assertTrue(response.context['success'])
+
+    def test_repeated_callbacks_share_one_verify(self):
+        with mock.patch('web.views.http_client.get', return_value=verify_response('success')) as get:
+            for _ in range(3):
+                response = self.client.get('/paystack/callback?reference=BUY-1')
+        get.assert_called_once()
+        self.assertTrue(response.context['success'])
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'completed')
+        self.assertEqual(Transaction.objects.get(payment_id='BUY-1').customer_email, 'c@example.com')
@@ -2,9 +2,10 @@ from django.urls import path
 from .transactions_views import (
     BuyQuoteView, BuyConfirmView, BuyGetView,
     SellQuoteView, SellConfirmView, SellGetView,
-    BuyPaystackInitView, PaystackWebhookView,
+    BuyPaystackInitView,
     BuyPaymentInstructionsView, BuyConfirmPaymentView,
 )
+from .paystack_webhook_views import PaystackWebhookView
 
 urlpatterns = [
     path('buy/quote', BuyQuoteView.as_view()),
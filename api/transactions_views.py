@@ -6,7 +6,7 @@ from django.conf import settings
 from .models import AdminSettings, BuyOrder, Transaction, Vendor
 from .vendor_views import get_vendor
 import secrets
-import requests
+from cvp_django import http_client
 
 def get_rates():
     s = AdminSettings.objects.order_by('-last_updated').first()
@@ -115,7 +115,7 @@ class BuyPaystackInitView(APIView):
                 'reference': b.order_id,
                 'callback_url': request.build_absolute_uri('/paystack/callback'),
             }
-            res = requests.post(f"{base}/transaction/initialize", json=payload, headers={
+            res = http_client.post(f"{base}/transaction/initialize", json=payload, headers={
                 'Authorization': f"Bearer {secret}",
                 'Content-Type': 'application/json',
             }, timeout=20)
@@ -126,38 +126,6 @@ class BuyPaystackInitView(APIView):
         except Exception as e:
             return Response({'detail': 'paystack_init_failed'}, status=502)
 
-class PaystackWebhookView(APIView):
-    def post(self, request):
-        raw = request.body
-        secret = getattr(settings, 'PAYSTACK_SECRET_KEY', '')
-        import hmac, hashlib
-        signature = request.META.get('HTTP_X_PAYSTACK_SIGNATURE')
-        if not signature or not secret:
-            return Response({'detail': 'unauthorized'}, status=401)
-        computed = hmac.new(secret.encode('utf-8'), raw, hashlib.sha512).hexdigest()
-        if not hmac.compare_digest(signature, computed):
-            return Response({'detail': 'invalid_signature'}, status=401)
-        try:
-            payload = request.data
-            event = payload.get('event')
-            data = payload.get('data') or {}
-            reference = data.get('reference')
-            if event == 'charge.success' and reference:
-                b = BuyOrder.objects.filter(order_id=reference).first()
-                if b:
-                    b.payment_status = 'paid'
-                    b.paid_at = timezone.now()
-                    b.status = 'processing'  # Move to processing, waiting for delivery
-                    b.paystack_reference = reference
-                    b.save()
-                t = Transaction.objects.filter(payment_id=reference, type='buy').first()
-                if t:
-                    t.status = 'processing'  # Don't mark completed until delivery
-                    t.save()
-            return Response({'success': True})
-        except Exception:
-            return Response({'detail': 'webhook_error'}, status=400)
-
 class BuyGetView(APIView):
     def get(self, request, order_id: str):
         b = BuyOrder.objects.filter(order_id=order_id).first()
@@ -0,0 +1,197 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Deque, Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+from django.conf import settings
+
+from .throttle import ProviderUnavailable, provider_request
+
+logger = logging.getLogger(__name__)
+
+
+def rpc_endpoints(config: dict) -> List[str]:
+    """RPC URLs for a network, from an 'rpc_urls' list or a comma-separated
+    'rpc_url' string."""
+    urls = config.get("rpc_urls") or (config.get("rpc_url") or "").split(",")
+    return [url.strip() for url in urls if url and url.strip()]
+
+
+class EndpointHealth:
+    """Recent latency and error rate for one RPC endpoint."""
+
+    def __init__(self, url: str, window: int = 100):
+        self.url = url
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.latency_ewma: Optional[float] = None
+        self.error_rate = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool):
+        with self._lock:
+            if ok:
+                self.samples.append(latency)
+                self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+            self.error_rate = 0.8 * self.error_rate + (0.0 if ok else 0.2)
+
+    def percentile(self, fraction: float, min_samples: int = 10) -> Optional[float]:
+        with self._lock:
+            if len(self.samples) < min_samples:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+    def score(self) -> float:
+        # Unknown endpoints rank as moderately fast so they get traffic and
+        # build up samples; errors push an endpoint towards the back.
+        latency = self.latency_ewma if self.latency_ewma is not None else 0.5
+        return latency * (1 + 4 * self.error_rate)
+
+    def snapshot(self) -> dict:
+        return {
+            "latency_ewma": round(self.latency_ewma, 4) if self.latency_ewma is not None else None,
+            "p95": self.percentile(0.95),
+            "error_rate": round(self.error_rate, 3),
+        }
+
+
+_health: Dict[str, EndpointHealth] = {}
+_health_lock = threading.Lock()
+_hedge_pools: Dict[str, ThreadPoolExecutor] = {}
+_hedge_pools_lock = threading.Lock()
+
+
+def endpoint_health(url: str) -> EndpointHealth:
+    with _health_lock:
+        health = _health.get(url)
+        if health is None:
+            health = _health[url] = EndpointHealth(url)
+        return health
+
+
+def hedge_workers(config: dict) -> int:
+    """Threads for a network's hedged calls: 'hedge_workers' if set, else
+    room for every watcher call the network allows in flight
+    ('max_concurrency' or BLOCKCHAIN_WATCHER_MAX_CONCURRENCY) plus its
+    'max_hedges'."""
+    if config.get("hedge_workers"):
+        return max(int(config["hedge_workers"]), 1)
+    concurrency = int(config.get("max_concurrency", getattr(settings, "BLOCKCHAIN_WATCHER_MAX_CONCURRENCY", 16)))
+    return max(concurrency, 1) * (1 + int(config.get("max_hedges", 1)))
+
+
+def hedge_pool(config: dict) -> ThreadPoolExecutor:
+    """The thread pool hedged calls to ``config``'s network run on, one per
+    network so a slow provider cannot queue up calls to the others."""
+    network = config.get("network", "")
+    with _hedge_pools_lock:
+        pool = _hedge_pools.get(network)
+        if pool is None:
+            pool = _hedge_pools[network] = ThreadPoolExecutor(
+                max_workers=hedge_workers(config),
+                thread_name_prefix=f"rpc-hedge-{network}" if network else "rpc-hedge",
+            )
+        return pool
+
+
+def ranked_endpoints(config: dict) -> List[str]:
+    urls = rpc_endpoints(config)
+    return sorted(urls, key=lambda url: endpoint_health(url).score())
+
+
+def hedge_delay(config: dict, url: str, timeout: float) -> float:
+    observed = endpoint_health(url).percentile(float(config.get("hedge_percentile", 0.9)))
+    delay = observed if observed is not None else float(config.get("hedge_delay", 1.0))
+    return min(max(delay, float(config.get("hedge_min_delay", 0.05))), timeout)
+
+
+def _post(config: dict, url: str, payload, timeout: float) -> requests.Response:
+    # Unless the network shares a named provider quota, each endpoint gets
+    # its own rate limiter and circuit breaker, so one failing node does not
+    # trip the breaker for the whole network.
+    provider = config.get("provider") or f"{config.get('network', '')}@{urlparse(url).netloc}"
+    endpoint_config = {**config, "provider": provider}
+    started = time.monotonic()
+    try:
+        resp = provider_request(endpoint_config, "post", url, json=payload, timeout=timeout)
+    except requests.RequestException:
+        endpoint_health(url).record(time.monotonic() - started, ok=False)
+        raise
+    ok = resp.status_code < 500 and resp.status_code != 429
+    endpoint_health(url).record(time.monotonic() - started, ok=ok)
+    return resp
+
+
+def rpc_post(config: dict, payload, timeout: float = 10) -> requests.Response:
+    """POST a JSON-RPC payload to the network's healthiest endpoint.
+
+    If it has not answered within the hedge delay (a percentile of its
+    recent latency, counted from when the request actually started rather
+    than from when it was queued on the pool), the same payload goes to the
+    next endpoint too and the first usable answer wins. Errors, 429s and 5xx fail over to the next
+    endpoint straight away. Only use this for read calls.
+    """
+    urls = ranked_endpoints(config)
+    if not urls:
+        raise ProviderUnavailable(f"No RPC endpoints configured for {config.get('network')}")
+    if len(urls) == 1:
+        return _post(config, urls[0], payload, timeout)
+
+    max_in_flight = 1 + int(config.get("max_hedges", 1))
+    in_flight = {}
+    last_error: Optional[Exception] = None
+    last_response: Optional[requests.Response] = None
+
+    pool = hedge_pool(config)
+
+    def launch():
+        url = urls.pop(0)
+        began: List[float] = []
+
+        def call():
+            began.append(time.monotonic())
+            return _post(config, url, payload, timeout)
+
+        in_flight[pool.submit(call)] = (url, began)
+
+    launch()
+    while in_flight:
+        can_hedge = bool(urls) and len(in_flight) < max_in_flight
+        first_url, began = next(iter(in_flight.values()))
+        wait_for = None
+        if can_hedge:
+            elapsed = time.monotonic() - began[0] if began else 0.0
+            wait_for = max(hedge_delay(config, first_url, timeout) - elapsed, 0.0)
+        done, _ = wait(list(in_flight), timeout=wait_for, return_when=FIRST_COMPLETED)
+        if not done:
+            if not began:
+                # Still queued for a pool thread; its clock has not started.
+                continue
+            logger.debug("Hedging RPC call to %s after slow answer from %s", urls[0], first_url)
+            launch()
+            continue
+        for future in done:
+            url, _ = in_flight.pop(future)
+            try:
+                resp = future.result()
+            except requests.RequestException as exc:
+                last_error = exc
+                logger.debug("RPC endpoint %s failed: %s", url, exc)
+            else:
+                if resp.status_code < 500 and resp.status_code != 429:
+                    return resp
+                last_response = resp
+        if urls and not in_flight:
+            launch()
+    if last_response is not None:
+        return last_response
+    raise last_error or ProviderUnavailable(f"All RPC endpoints failed for {config.get('network')}")
+
+
+def endpoint_snapshot() -> Dict[str, dict]:
+    with _health_lock:
+        return {url: health.snapshot() for url, health in _health.items()}
@@ -0,0 +1,176 @@
+"""Network fee oracle.
+
+Samples what one outgoing transfer currently costs on each configured
+network, smooths the samples with an EWMA in ``NetworkFeeEstimate`` and
+copies the result to ``Asset.network_fee_usd``. It runs from the
+``update_network_fees`` command; quotes only ever read the stored value.
+"""
+import logging
+import statistics
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+
+from api.models import Asset, NetworkFeeEstimate
+from .endpoints import rpc_endpoints, rpc_post
+from .tasks import get_network_config, normalize_network
+from .throttle import provider_request
+
+logger = logging.getLogger(__name__)
+
+
+def evm_transfer_fee(config: dict) -> Optional[float]:
+    """eth_gasPrice times the gas of a token transfer, in the native coin."""
+    if not rpc_endpoints(config):
+        return None
+    resp = rpc_post(config, {"jsonrpc": "2.0", "method": "eth_gasPrice", "params": [], "id": 1}, timeout=10)
+    gas_price_hex = resp.json().get("result")
+    if not gas_price_hex:
+        return None
+    return int(gas_price_hex, 16) * int(config.get("transfer_gas", 65000)) / 1e18
+
+
+def tron_transfer_fee(config: dict) -> Optional[float]:
+    """TRX burned by a TRC20 transfer from an account with no staked
+    energy or bandwidth."""
+    base_url = config.get("base_url", "https://api.trongrid.io")
+    headers = {"TRON-PRO-API-KEY": config["api_key"]} if config.get("api_key") else {}
+    resp = provider_request(config, "get", f"{base_url}/wallet/getchainparameters", headers=headers, timeout=10)
+    if resp.status_code != 200:
+        logger.warning("Tron fee lookup failed %s %s", resp.status_code, resp.text)
+        return None
+    params = {item.get("key"): item.get("value") for item in resp.json().get("chainParameter", [])}
+    energy_fee = params.get("getEnergyFee")
+    bandwidth_fee = params.get("getTransactionFee")
+    if energy_fee is None or bandwidth_fee is None:
+        return None
+    energy = int(config.get("transfer_energy", 65000))
+    bandwidth = int(config.get("transfer_bandwidth", 345))
+    return (energy * energy_fee + bandwidth * bandwidth_fee) / 1e6  # sun to TRX
+
+
+def blockcypher_transfer_fee(config: dict) -> Optional[float]:
+    """BlockCypher's medium fee rate (sat/vB) times a typical transfer size."""
+    base_url = config.get("base_url", "https://api.blockcypher.com/v1/btc/main")
+    params = {"token": config["token"]} if config.get("token") else {}
+    resp = provider_request(config, "get", base_url, params=params, timeout=10)
+    if resp.status_code != 200:
+        logger.warning("BlockCypher fee lookup failed %s %s", resp.status_code, resp.text)
+        return None
+    fee_per_kb = resp.json().get("medium_fee_per_kb")
+    if fee_per_kb is None:
+        return None
+    sat_per_vbyte = fee_per_kb / 1000
+    return sat_per_vbyte * int(config.get("transfer_vbytes", 140)) / 1e8  # satoshis to BTC
+
+
+def solana_transfer_fee(config: dict) -> Optional[float]:
+    """Base signature fee plus the median recent priority fee for a token
+    transfer's compute budget."""
+    if not rpc_endpoints(config):
+        return None
+    resp = rpc_post(
+        config,
+        {"jsonrpc": "2.0", "method": "getRecentPrioritizationFees", "params": [], "id": 1},
+        timeout=10,
+    )
+    fees = [entry.get("prioritizationFee", 0) for entry in resp.json().get("result") or []]
+    micro_lamports = statistics.median(fees) if fees else 0
+    priority = micro_lamports * int(config.get("transfer_compute_units", 200000)) / 1e6
+    return (int(config.get("lamports_per_signature", 5000)) + priority) / 1e9  # lamports to SOL
+
+
+FEE_SAMPLERS: Dict[str, Callable[[dict], Optional[float]]] = {
+    "evm": evm_transfer_fee,
+    "tron": tron_transfer_fee,
+    "blockcypher": blockcypher_transfer_fee,
+    "solana": solana_transfer_fee,
+}
+
+
+def native_price_usd(config: dict) -> Optional[float]:
+    """USD price of the network's fee coin from CoinGecko, falling back to a
+    fixed ``native_usd`` in the network config."""
+    price_id = config.get("native_price_id")
+    if price_id:
+        base_url = getattr(settings, "COINGECKO_API_BASE", "https://api.coingecko.com/api/v3")
+        try:
+            resp = provider_request(
+                {"provider": "coingecko", "rate_limit": 0.5, "burst": 5},
+                "get",
+                f"{base_url}/simple/price",
+                params={"ids": price_id, "vs_currencies": "usd"},
+                timeout=10,
+            )
+            if resp.status_code == 200:
+                price = (resp.json().get(price_id) or {}).get("usd")
+                if price:
+                    return float(price)
+            logger.warning("Price lookup for %s failed %s", price_id, resp.status_code)
+        except (requests.RequestException, ValueError) as exc:
+            logger.warning("Price lookup for %s failed: %s", price_id, exc)
+    return float(config["native_usd"]) if config.get("native_usd") else None
+
+
+@dataclass
+class FeeUpdate:
+    network: str
+    sample_native: float
+    fee_native: float
+    fee_usd: float
+    assets: int
+
+
+def smooth(previous: Optional[float], sample: float, alpha: float) -> float:
+    return sample if previous is None else alpha * sample + (1 - alpha) * previous
+
+
+def update_network_fee(network: str) -> Optional[FeeUpdate]:
+    watcher_type, config = get_network_config(network)
+    sampler = FEE_SAMPLERS.get(watcher_type)
+    if not sampler or not config.get("fee_oracle", True):
+        return None
+    try:
+        sample = sampler(config)
+    except requests.RequestException as exc:
+        logger.warning("Fee sample for %s failed: %s", network, exc)
+        return None
+    except Exception:
+        logger.exception("Fee sample for %s returned an unexpected response", network)
+        return None
+    if sample is None:
+        return None
+    price = native_price_usd(config)
+    if price is None:
+        logger.warning("No native coin price for %s; set native_price_id or native_usd", network)
+        return None
+
+    network = normalize_network(network)
+    estimate, _ = NetworkFeeEstimate.objects.get_or_create(network=network)
+    alpha = float(config.get("fee_ewma_alpha", getattr(settings, "NETWORK_FEE_EWMA_ALPHA", 0.3)))
+    estimate.fee_native = smooth(estimate.fee_native if estimate.samples else None, sample, alpha)
+    estimate.native_usd = price
+    estimate.fee_usd = estimate.fee_native * price * float(config.get("fee_markup", 1.0))
+    estimate.samples += 1
+    estimate.updated_at = timezone.now()
+    estimate.save()
+
+    fee = Decimal(str(round(estimate.fee_usd, 6)))
+    asset_ids = [
+        asset.id for asset in Asset.objects.only("id", "network") if normalize_network(asset.network) == network
+    ]
+    updated = Asset.objects.filter(id__in=asset_ids).update(network_fee_usd=fee)
+    return FeeUpdate(network, sample, estimate.fee_native, estimate.fee_usd, updated)
+
+
+def update_all_network_fees() -> List[FeeUpdate]:
+    updates = []
+    for network in getattr(settings, "BLOCKCHAIN_NETWORKS", {}):
+        update = update_network_fee(network)
+        if update:
+            updates.append(update)
+    return updates
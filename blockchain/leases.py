@@ -0,0 +1,113 @@
+import os
+import socket
+import time
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Set
+
+from django.conf import settings
+from django.db import connection, transaction as dbtx
+from django.db.models import Q
+from django.utils import timezone
+
+from api.models import BuyOrder, Transaction
+from .scheduler import due_filter, due_ordering, watched_deliveries, watched_sells
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def lease_seconds() -> int:
+    return int(getattr(settings, "BLOCKCHAIN_WATCHER_LEASE_SECONDS", 120))
+
+
+def _claim_due(qs, owner: str, limit: int, scope: Optional[Q] = None) -> list:
+    """Lease up to ``limit`` due rows of ``qs`` to ``owner`` and return them.
+
+    The claim is a conditional UPDATE that only touches rows with no live
+    lease, so two workers racing for the same candidates split them rather
+    than both polling them. ``scope`` narrows the candidates, e.g. to a
+    network shard. Leases expire on their own after
+    ``BLOCKCHAIN_WATCHER_LEASE_SECONDS``, which releases rows held by a
+    worker that died mid-cycle.
+    """
+    if limit <= 0:
+        return []
+    model = qs.model
+    now = timezone.now()
+    unleased = Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now)
+    qs = qs.filter(due_filter(now), unleased)
+    if scope is not None:
+        qs = qs.filter(scope)
+    with dbtx.atomic():
+        candidates = qs.order_by(*due_ordering())
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        ids = list(candidates.values_list("id", flat=True)[:limit])
+        model.objects.filter(unleased, id__in=ids).update(
+            lease_owner=owner,
+            lease_expires_at=now + timedelta(seconds=lease_seconds()),
+        )
+    return list(
+        model.objects.filter(id__in=ids, lease_owner=owner, lease_expires_at__gt=now).order_by(*due_ordering())
+    )
+
+
+def claim_due_transactions(owner: str, limit: int, scope: Optional[Q] = None) -> List[Transaction]:
+    """Lease due pending sells to ``owner``."""
+    return _claim_due(watched_sells(), owner, limit, scope)
+
+
+def claim_due_deliveries(owner: str, limit: int, scope: Optional[Q] = None) -> List[BuyOrder]:
+    """Lease due buy orders whose crypto was sent but not yet confirmed."""
+    return _claim_due(watched_deliveries(), owner, limit, scope)
+
+
+def lease_rows(owner: str, ids: Iterable[int], model=Transaction) -> Set[int]:
+    """Lease the given rows to ``owner`` where nobody else holds them, and
+    return the ids ``owner`` now holds. Used to apply pushed updates to rows
+    the watcher may be checking at the same time."""
+    ids = list(ids)
+    if not ids:
+        return set()
+    now = timezone.now()
+    free = Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now) | Q(lease_owner=owner)
+    model.objects.filter(free, id__in=ids).update(
+        lease_owner=owner,
+        lease_expires_at=now + timedelta(seconds=lease_seconds()),
+    )
+    return set(model.objects.filter(id__in=ids, lease_owner=owner).values_list("id", flat=True))
+
+
+def release_leases(owner: str, ids: Iterable[int], model=Transaction) -> int:
+    return model.objects.filter(id__in=list(ids), lease_owner=owner).update(
+        lease_owner=None,
+        lease_expires_at=None,
+    )
+
+
+def renew_leases(owner: str, ids: Iterable[int], model=Transaction) -> int:
+    """Push back the expiry of the given rows ``owner`` still holds. Rows
+    whose lease already lapsed to another worker are left to it."""
+    return model.objects.filter(id__in=list(ids), lease_owner=owner).update(
+        lease_expires_at=timezone.now() + timedelta(seconds=lease_seconds()),
+    )
+
+
+class LeaseKeeper:
+    """Keeps the leases of one watch cycle alive while its provider calls
+    run. ``renew`` is cheap to call after every job; it only touches the
+    database once a third of the lease time has passed since the last
+    renewal, so a cycle slower than one lease keeps its rows."""
+
+    def __init__(self, owner: str, rows: Dict[type, List[int]]):
+        self.owner = owner
+        self.rows = rows
+        self.renewed = time.monotonic()
+
+    def renew(self):
+        if time.monotonic() - self.renewed < lease_seconds() / 3:
+            return
+        for model, ids in self.rows.items():
+            renew_leases(self.owner, ids, model=model)
+        self.renewed = time.monotonic()
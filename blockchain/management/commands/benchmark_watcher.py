@@ -0,0 +1,218 @@
+import json
+import secrets
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from api.models import Transaction, Vendor
+from blockchain.scheduler import next_due_at
+from blockchain.standin import PREFIXES, StandinChain, StandinProvider
+from blockchain.tasks import check_pending_transactions, network_filter
+
+# Confirmations the synthetic chain needs before each watcher type reports
+# a transaction as confirmed.
+DEFAULT_MIN_CONFIRMATIONS = {"blockcypher": 1, "evm": 3, "tron": 19, "solana": 32}
+BASE58 = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+
+def synthetic_hash(watcher_type: str) -> str:
+    if watcher_type == "evm":
+        return f"0x{secrets.token_hex(32)}"
+    if watcher_type == "solana":
+        return "".join(secrets.choice(BASE58) for _ in range(88))
+    return secrets.token_hex(32)
+
+
+def synthetic_address(watcher_type: str) -> str:
+    if watcher_type == "evm":
+        return f"0x{secrets.token_hex(20)}"
+    if watcher_type == "tron":
+        return "T" + "".join(secrets.choice(BASE58) for _ in range(33))
+    if watcher_type == "solana":
+        return "".join(secrets.choice(BASE58) for _ in range(44))
+    return "bc1q" + secrets.token_hex(19)
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the transaction watcher against a local stand-in provider: seeds pending sells, "
+        "polls them to confirmation and reports throughput and time-to-confirm. Writes (and then "
+        "removes) rows in the configured database, so run it against a development database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--type", choices=sorted(PREFIXES), default="evm", help="Watcher type to benchmark")
+        parser.add_argument("--transactions", type=int, default=200, help="Pending sells to seed")
+        parser.add_argument("--limit", type=int, default=100, help="Transactions per watcher cycle")
+        parser.add_argument("--concurrency", type=int, default=8, help="Watcher --concurrency")
+        parser.add_argument("--batch-size", type=int, default=None, help="Override the network's batch_size")
+        parser.add_argument("--block-time", type=float, default=0.5, help="Synthetic block time, in seconds")
+        parser.add_argument(
+            "--mine-after",
+            type=float,
+            default=1.0,
+            help="Seconds each transaction spends in the mempool before it is mined",
+        )
+        parser.add_argument(
+            "--min-confirmations",
+            type=int,
+            default=None,
+            help="Confirmations required (defaults to what the watcher type needs on the stand-in chain)",
+        )
+        parser.add_argument("--latency", type=float, default=0.05, help="Mean provider latency, in seconds")
+        parser.add_argument("--jitter", type=float, default=0.02, help="Standard deviation of the latency")
+        parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+        parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+        parser.add_argument("--rate-limit", type=float, default=1000, help="Client-side requests per second")
+        parser.add_argument("--recordings", default=None, help="JSON file of recorded responses to replay")
+        parser.add_argument("--timeout", type=float, default=300, help="Give up after this many seconds")
+        parser.add_argument("--keep", action="store_true", help="Keep the seeded rows afterwards")
+
+    def network_config(self, provider: StandinProvider, options) -> dict:
+        watcher_type = options["type"]
+        block_time = options["block_time"]
+        config = {
+            "type": watcher_type,
+            "min_confirmations": options["min_confirmations"] or DEFAULT_MIN_CONFIRMATIONS[watcher_type],
+            "block_time": block_time,
+            "provider": f"standin-{watcher_type}",
+            "rate_limit": options["rate_limit"],
+            # Poll on the stand-in's time scale rather than mainnet's.
+            "retry_base": max(block_time, 0.1),
+            "retry_max": max(block_time * 8, 1),
+            "min_poll_interval": max(block_time / 2, 0.05),
+            "throttle_backoff": 1,
+        }
+        if watcher_type in ("evm", "solana"):
+            config["rpc_url"] = provider.base_url(watcher_type)
+            config["batch_size"] = 20 if watcher_type == "evm" else 256
+        else:
+            config["base_url"] = provider.base_url(watcher_type)
+        if options["batch_size"] is not None:
+            config["batch_size"] = options["batch_size"]
+        return config
+
+    def handle(self, *args, **options):
+        recordings = {}
+        if options["recordings"]:
+            try:
+                with open(options["recordings"]) as fh:
+                    recordings = json.load(fh)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Could not read recordings: {exc}")
+
+        watcher_type = options["type"]
+        network = f"STANDIN_{watcher_type.upper()}"
+        chain = StandinChain(block_time=options["block_time"], mine_after=options["mine_after"])
+        provider = StandinProvider(
+            chain,
+            latency=options["latency"],
+            jitter=options["jitter"],
+            error_rate=options["error_rate"],
+            throttle_rate=options["throttle_rate"],
+            recordings=recordings,
+        )
+        networks = {**getattr(settings, "BLOCKCHAIN_NETWORKS", {}), network: self.network_config(provider, options)}
+        run_id = uuid.uuid4().hex[:8]
+        prefix = f"BENCH-{run_id}-"
+        owner = f"benchmark:{run_id}"
+
+        with provider, override_settings(BLOCKCHAIN_NETWORKS=networks):
+            vendor = Vendor.objects.create(
+                name="Watcher benchmark",
+                email=f"benchmark-{run_id}@example.invalid",
+                password_hash="!",
+                momo_number="0",
+                is_active=False,
+            )
+            try:
+                self.run_benchmark(options, chain, provider, vendor, network, prefix, owner)
+            finally:
+                if not options["keep"]:
+                    vendor.delete()
+
+    def run_benchmark(self, options, chain, provider, vendor, network, prefix, owner):
+        watcher_type = options["type"]
+        count = options["transactions"]
+        sells = []
+        for index in range(count):
+            tx_hash = synthetic_hash(watcher_type)
+            address = synthetic_address(watcher_type)
+            chain.register(tx_hash, address)
+            sells.append(Transaction(
+                payment_id=f"{prefix}{index}",
+                type="sell",
+                vendor=vendor,
+                crypto_amount=1,
+                network=network,
+                wallet_address=address,
+                crypto_tx_hash=tx_hash,
+                status="pending",
+            ))
+        Transaction.objects.bulk_create(sells, batch_size=500)
+        self.stdout.write(
+            f"Seeded {count} sells on {network}: block time {options['block_time']}s, "
+            f"latency {options['latency']}s, errors {options['error_rate']:.0%}, 429s {options['throttle_rate']:.0%}."
+        )
+
+        seeded = Transaction.objects.filter(payment_id__startswith=prefix)
+        scope = network_filter([network])
+        started = time.monotonic()
+        cycles = checks = 0
+        while seeded.exclude(status="crypto_confirmed").exists():
+            if time.monotonic() - started > options["timeout"]:
+                self.stdout.write(self.style.WARNING("Timed out before every sell confirmed."))
+                break
+            checked, _, _ = check_pending_transactions(
+                limit=options["limit"],
+                concurrency=options["concurrency"],
+                owner=owner,
+                networks=[network],
+            )
+            cycles += 1
+            checks += checked
+            if checked < options["limit"]:
+                due = next_due_at(scope)
+                delay = 0.5
+                if due:
+                    delay = min(max((due - timezone.now()).total_seconds(), 0), delay)
+                time.sleep(delay)
+        elapsed = time.monotonic() - started
+
+        durations = sorted(
+            (tx.confirmed_at - tx.created_at).total_seconds()
+            for tx in seeded.filter(status="crypto_confirmed").only("created_at", "confirmed_at")
+        )
+        confirmed = len(durations)
+        stats = provider.snapshot()
+        per_confirmation = stats["requests"] / confirmed if confirmed else float("inf")
+        self.stdout.write(self.style.SUCCESS(
+            f"Confirmed {confirmed}/{count} in {elapsed:.1f}s: {confirmed / elapsed:.1f} tx/s, "
+            f"{checks} checks over {cycles} cycles."
+        ))
+        self.stdout.write(
+            f"Provider requests: {stats['requests']} ({per_confirmation:.2f} per confirmation) "
+            f"over {stats['connections']} connections; "
+            + ", ".join(f"{method}={calls}" for method, calls in sorted(stats["rpc_calls"].items()))
+        )
+        if stats["injected"]:
+            self.stdout.write(
+                "Injected faults: " + ", ".join(f"{status}={n}" for status, n in sorted(stats["injected"].items()))
+            )
+        if durations:
+            self.stdout.write(
+                f"Time to confirm: p50 {percentile(durations, 0.5):.2f}s, "
+                f"p95 {percentile(durations, 0.95):.2f}s, p99 {percentile(durations, 0.99):.2f}s."
+            )
+        if options["keep"]:
+            self.stdout.write(f"Kept seeded rows with payment_id prefix {prefix}")
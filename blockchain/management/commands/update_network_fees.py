@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from blockchain.fees import update_all_network_fees
+
+
+class Command(BaseCommand):
+    help = "Sample current transfer fees per network and update Asset.network_fee_usd."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--daemon",
+            action="store_true",
+            help="Keep running, sampling every --interval seconds",
+        )
+        parser.add_argument("--interval", type=float, default=300, help="Seconds between samples in daemon mode")
+
+    def run_once(self):
+        for update in update_all_network_fees():
+            self.stdout.write(
+                f"{update.network}: sample {update.sample_native:.8f}, smoothed {update.fee_native:.8f} "
+                f"native = ${update.fee_usd:.4f} ({update.assets} assets updated)"
+            )
+
+    def handle(self, *args, **options):
+        if not options["daemon"]:
+            self.run_once()
+            return
+        try:
+            while True:
+                close_old_connections()
+                self.run_once()
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Fee oracle stopped.")
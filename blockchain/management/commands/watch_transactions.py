@@ -1,16 +1,111 @@
+import time
+
 from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
 
-from blockchain.tasks import check_pending_transactions
+from blockchain.leases import default_worker_id
+from blockchain.scanner import scan_all_networks
+from blockchain.scheduler import next_due_at
+from blockchain.stats import publish_metrics
+from blockchain.tasks import check_pending_transactions, network_filter
+from blockchain.throttle import throttle_snapshot
+from blockchain.watchers import chain_head_cache
+from blockchain.webhooks import process_pending_events
 
 
 class Command(BaseCommand):
-    help = "Poll blockchain providers for pending sell transactions and update their status."
+    help = "Poll blockchain providers for pending sells and sent buy deliveries and update their status."
 
     def add_arguments(self, parser):
         parser.add_argument("--limit", type=int, default=25, help="Maximum transactions to check per run")
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=1,
+            help="Provider calls to run in parallel (per-network caps still apply)",
+        )
+        parser.add_argument(
+            "--scan",
+            action="store_true",
+            help="Scan new blocks for Transfer logs into monitored wallets before polling hashes",
+        )
+        parser.add_argument(
+            "--worker-id",
+            default=None,
+            help="Lease owner name for this worker (defaults to host:pid)",
+        )
+        parser.add_argument(
+            "--networks",
+            default="",
+            help="Comma-separated networks this worker owns, e.g. ERC20,BEP20 (default: all)",
+        )
+        parser.add_argument(
+            "--daemon",
+            action="store_true",
+            help="Keep running, sleeping until the next transaction is due",
+        )
+        parser.add_argument(
+            "--max-sleep",
+            type=float,
+            default=30,
+            help="Longest daemon sleep between cycles, in seconds (also bounds the scan interval)",
+        )
 
-    def handle(self, *args, **options):
+    def run_cycle(self, options):
+        if options["scan"]:
+            for report in scan_all_networks(owner=options["worker_id"]):
+                self.stdout.write(
+                    f"Scanned {report.network} blocks {report.from_block}-{report.to_block}: "
+                    f"{report.logs} logs, matched {report.matched}, confirmed {report.confirmed}."
+                )
+                if report.ambiguous:
+                    self.stdout.write(self.style.WARNING(
+                        f"  {report.ambiguous} deposits did not fit exactly one pending sell and were left unmatched."
+                    ))
+        retried = process_pending_events(owner=options["worker_id"])
+        if retried:
+            self.stdout.write(f"Applied {retried} updates from queued webhook events.")
         limit = options["limit"]
-        checked, confirmed = check_pending_transactions(limit=limit)
-        self.stdout.write(self.style.SUCCESS(f"Checked {checked} transactions, confirmed {confirmed}."))
+        checked, confirmed, delivered = check_pending_transactions(
+            limit=limit,
+            concurrency=options["concurrency"],
+            owner=options["worker_id"],
+            networks=options["networks"],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {checked} transactions, confirmed {confirmed} sells and {delivered} deliveries."
+        ))
+        self.stdout.write(
+            f"Chain head cache: {chain_head_cache.misses} eth_blockNumber calls, "
+            f"{chain_head_cache.hits} saved."
+        )
+        for provider, state in throttle_snapshot().items():
+            if state["circuit"] != "closed" or state["throttled"] or state["shed"] or state["paused_for"]:
+                self.stdout.write(self.style.WARNING(
+                    f"Provider {provider}: circuit {state['circuit']}, {state['throttled']} throttled, "
+                    f"{state['shed']} shed, paused {state['paused_for']}s."
+                ))
+        publish_metrics(options["worker_id"])
+        return checked
 
+    def handle(self, *args, **options):
+        options["networks"] = [n.strip() for n in options["networks"].split(",") if n.strip()]
+        options["worker_id"] = options["worker_id"] or default_worker_id()
+        if not options["daemon"]:
+            self.run_cycle(options)
+            return
+        try:
+            while True:
+                close_old_connections()
+                checked = self.run_cycle(options)
+                if checked >= options["limit"]:
+                    # A full batch means more work is already due.
+                    continue
+                due = next_due_at(network_filter(options["networks"]) if options["networks"] else None)
+                delay = options["max_sleep"]
+                if due:
+                    delay = min(max((due - timezone.now()).total_seconds(), 0), delay)
+                time.sleep(delay)
+        except KeyboardInterrupt:
+            self.stdout.write("Watcher stopped.")
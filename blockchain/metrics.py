@@ -0,0 +1,122 @@
+"""In-process counters and latency histograms for the watcher.
+
+Everything that talks to a provider records here; ``blockchain.stats``
+publishes the snapshot so the admin API can read it from another process.
+"""
+import bisect
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Upper bounds, in seconds, of the histogram buckets. Anything slower lands
+# in the implicit +Inf bucket.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONFIRM_BUCKETS = (30, 60, 120, 300, 600, 1800, 3600, 7200, 21600)
+LAG_BUCKETS = (1, 5, 15, 30, 60, 300, 900, 3600)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> dict:
+        return {"buckets": list(self.buckets), "counts": list(self.counts), "sum": self.sum, "count": self.count}
+
+
+def merge_histograms(a: dict, b: dict) -> dict:
+    """Add two histogram snapshots with the same buckets."""
+    return {
+        "buckets": a["buckets"],
+        "counts": [x + y for x, y in zip(a["counts"], b["counts"])],
+        "sum": a["sum"] + b["sum"],
+        "count": a["count"] + b["count"],
+    }
+
+
+def histogram_quantile(snapshot: dict, fraction: float) -> Optional[float]:
+    """Upper bound of the bucket holding the given quantile; ``None`` when
+    empty, ``inf`` when it falls past the last bucket."""
+    if not snapshot["count"]:
+        return None
+    target = fraction * snapshot["count"]
+    running = 0
+    for bound, count in zip(snapshot["buckets"] + [float("inf")], snapshot["counts"]):
+        running += count
+        if running >= target:
+            return bound
+    return float("inf")
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+
+    @staticmethod
+    def _labels(labels: dict) -> Labels:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def observe(self, name: str, value: float, buckets: Sequence[float] = LATENCY_BUCKETS, **labels):
+        key = (name, self._labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = (name, self._labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "histograms": [
+                    {"name": name, "labels": dict(labels), **histogram.snapshot()}
+                    for (name, labels), histogram in sorted(self._histograms.items())
+                ],
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._counters.items())
+                ],
+            }
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+metrics = MetricsRegistry()
+
+
+def merge_snapshots(snapshots: List[dict]) -> dict:
+    """Combine registry snapshots from several workers."""
+    histograms: Dict[Tuple[str, Labels], dict] = {}
+    counters: Dict[Tuple[str, Labels], float] = {}
+    for snapshot in snapshots:
+        for entry in snapshot.get("histograms", []):
+            key = (entry["name"], MetricsRegistry._labels(entry["labels"]))
+            histograms[key] = merge_histograms(histograms[key], entry) if key in histograms else dict(entry)
+        for entry in snapshot.get("counters", []):
+            key = (entry["name"], MetricsRegistry._labels(entry["labels"]))
+            counters[key] = counters.get(key, 0) + entry["value"]
+    return {
+        "histograms": [
+            {**entry, "name": name, "labels": dict(labels)} for (name, labels), entry in sorted(histograms.items())
+        ],
+        "counters": [
+            {"name": name, "labels": dict(labels), "value": value} for (name, labels), value in sorted(counters.items())
+        ],
+    }
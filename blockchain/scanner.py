@@ -0,0 +1,343 @@
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+import requests
+from django.conf import settings
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from api.models import Asset, ChainScanCursor, Transaction, Wallet
+from .tasks import WatchResultWriter, get_network_config, normalize_network
+from .endpoints import rpc_endpoints, rpc_post
+from .leases import default_worker_id, lease_rows, release_leases
+from .scheduler import WATCHING_STATUSES
+from .watchers import (
+    ERC20_TRANSFER_TOPIC,
+    WatcherResult,
+    chain_head_cache,
+    normalize_eth_address,
+    topic_to_address,
+)
+
+logger = logging.getLogger(__name__)
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+
+def tron_address_to_hex(address: Optional[str]) -> Optional[str]:
+    """Convert a base58 ``T...`` address to the 0x form used by TRON JSON-RPC."""
+    if not address:
+        return None
+    if address.startswith("0x") or address.startswith("41"):
+        return normalize_eth_address(address[-40:])
+    num = 0
+    for char in address:
+        index = BASE58_ALPHABET.find(char)
+        if index < 0:
+            return None
+        num = num * 58 + index
+    raw = num.to_bytes(25, "big")
+    # 0x41 prefix + 20 byte account + 4 byte checksum
+    return "0x" + raw[1:21].hex()
+
+
+ADDRESS_NORMALIZERS = {
+    "evm": normalize_eth_address,
+    "tron": tron_address_to_hex,
+}
+
+
+def normalize_tx_hash(watcher_type: str, tx_hash: Optional[str]) -> str:
+    tx_hash = (tx_hash or "").strip().lower()
+    if watcher_type == "tron" and tx_hash.startswith("0x"):
+        # TronGrid's REST API, and customers, use bare hex ids.
+        return tx_hash[2:]
+    return tx_hash
+
+
+@dataclass
+class ScanReport:
+    network: str
+    from_block: int = 0
+    to_block: int = 0
+    logs: int = 0
+    matched: int = 0
+    ambiguous: int = 0
+    confirmed: int = 0
+
+
+def _rpc(config: dict, method: str, params: list):
+    resp = rpc_post(config, {"jsonrpc": "2.0", "method": method, "params": params, "id": 1}, timeout=20)
+    data = resp.json()
+    if data.get("error"):
+        raise requests.RequestException(f"{method} failed: {data['error']}")
+    return data.get("result")
+
+
+def monitored_addresses(network: str, normalize) -> Set[str]:
+    """Deposit addresses on ``network``: monitored vendor wallets plus the
+    platform address configured on each asset."""
+    addresses = set()
+    for address, wallet_network in Wallet.objects.filter(is_monitored=True).values_list("address", "network"):
+        if normalize_network(wallet_network) == network:
+            addresses.add(normalize(address))
+    for address, asset_network in Asset.objects.exclude(wallet_address="").values_list("wallet_address", "network"):
+        if normalize_network(asset_network) == network:
+            addresses.add(normalize(address))
+    addresses.discard(None)
+    return addresses
+
+
+def pending_sells_by_address(network: str, normalize) -> Dict[str, List[Transaction]]:
+    index: Dict[str, List[Transaction]] = defaultdict(list)
+    qs = Transaction.objects.filter(type="sell", status__in=WATCHING_STATUSES).order_by("created_at")
+    for tx in qs:
+        if normalize_network(tx.network) != network:
+            continue
+        address = normalize(tx.wallet_address)
+        if address:
+            index[address].append(tx)
+    return index
+
+
+def scan_token_map(config: dict, normalize) -> Dict[str, Tuple[Optional[str], int]]:
+    """``scan_tokens`` as normalized contract -> (symbol, decimals). A bare
+    int is taken as decimals with no symbol; deposits of such a token only
+    ever match sells by hash."""
+    tokens = {}
+    for contract, spec in config.get("scan_tokens", {}).items():
+        if isinstance(spec, dict):
+            tokens[normalize(contract)] = ((spec.get("symbol") or "").upper() or None, int(spec["decimals"]))
+        else:
+            tokens[normalize(contract)] = (None, int(spec))
+    return tokens
+
+
+def claimed_tx_hashes(watcher_type: str, hashes: Set[str]) -> Set[str]:
+    """The normalized ``hashes`` some transaction already carries, whatever
+    case (or, on TRON, prefix) they were stored in."""
+    variants = set(hashes)
+    if watcher_type == "tron":
+        variants |= {f"0x{h}" for h in hashes}
+    stored = (
+        Transaction.objects.annotate(hash_lower=Lower("crypto_tx_hash"))
+        .filter(hash_lower__in=variants)
+        .values_list("crypto_tx_hash", flat=True)
+    )
+    return {normalize_tx_hash(watcher_type, h) for h in stored}
+
+
+def _pick_transaction(
+    candidates: List[Transaction],
+    watcher_type: str,
+    tx_hash: str,
+    symbol: Optional[str],
+    amount: Optional[float],
+    tolerance: float,
+    mined_at: Optional[datetime] = None,
+) -> Tuple[Optional[Transaction], bool]:
+    """The sell a deposit log pays, and whether it was left unmatched
+    although hash-less sells fit its amount.
+
+    Only sells of the log's token are considered. Without a hash, a deposit
+    is matched on amount alone, and the platform address is shared by every
+    sell of an asset, so it is only attached when exactly one sell fits and
+    the log was mined after that sell was created. A log whose block time
+    is unknown, or that predates every fitting sell, is left unmatched too.
+    """
+    if symbol is None:
+        return None, False
+    candidates = [tx for tx in candidates if (tx.crypto_symbol or "").upper() == symbol]
+    for tx in candidates:
+        if tx.crypto_tx_hash and normalize_tx_hash(watcher_type, tx.crypto_tx_hash) == tx_hash:
+            return tx, False
+    if amount is None:
+        return None, False
+    fits = [tx for tx in candidates if not tx.crypto_tx_hash and abs((tx.crypto_amount or 0) - amount) <= tolerance]
+    paid = [tx for tx in fits if mined_at and mined_at > tx.created_at]
+    if len(paid) == 1:
+        return paid[0], False
+    return None, bool(fits)
+
+
+def log_mined_at(config: dict, log: dict, cache: Dict[int, Optional[datetime]]) -> Optional[datetime]:
+    """When the block holding ``log`` was mined, from the log itself where
+    the node includes ``blockTimestamp``, else from the block header.
+    ``cache`` maps block numbers already looked up in this scan."""
+    if log.get("blockTimestamp"):
+        return datetime.fromtimestamp(int(log["blockTimestamp"], 16), tz=dt_timezone.utc)
+    number = int(log["blockNumber"], 16)
+    if number not in cache:
+        try:
+            block = _rpc(config, "eth_getBlockByNumber", [hex(number), False]) or {}
+            cache[number] = datetime.fromtimestamp(int(block["timestamp"], 16), tz=dt_timezone.utc)
+        except (requests.RequestException, ValueError, TypeError, KeyError) as exc:
+            logger.warning("Scanner could not read block %s time: %s", number, exc)
+            cache[number] = None
+    return cache[number]
+
+
+def apply_matches(matches: List[Tuple[Transaction, str, WatcherResult]], config: dict, owner: str) -> int:
+    """Write scanner matches through the watcher's result writer under a
+    lease and return how many sells they confirmed.
+
+    Sells are re-read under the lease, and skipped if they settled, or got
+    another hash, since the scan loaded them. Only sells that already carry
+    a hash are ever leased by the watcher, and it polls those itself, so a
+    sell it holds can be skipped here without losing the deposit.
+    """
+    sell_ids = lease_rows(owner, {tx.id for tx, _, _ in matches})
+    try:
+        fresh = Transaction.objects.in_bulk(sell_ids)
+        writer = WatchResultWriter(owner)
+        for tx, tx_hash, result in matches:
+            row = fresh.get(tx.id)
+            if row is None or row.status not in WATCHING_STATUSES:
+                continue
+            if not row.crypto_tx_hash:
+                attached = Transaction.objects.filter(
+                    pk=row.pk, crypto_tx_hash__isnull=True, lease_owner=owner
+                ).update(crypto_tx_hash=tx_hash)
+                if not attached:
+                    continue
+                row.crypto_tx_hash = tx_hash
+            elif normalize_tx_hash(config.get("type", ""), row.crypto_tx_hash) != tx_hash:
+                continue
+            writer.add(row, result, config)
+        writer.flush()
+        return writer.confirmed
+    finally:
+        release_leases(owner, sell_ids)
+
+
+def scan_network(network: str, max_windows: int = 10, owner: Optional[str] = None) -> Optional[ScanReport]:
+    """Pull Transfer logs into our deposit addresses for the next block
+    windows on ``network`` and match them against pending sells.
+
+    Matching prefers a sell of the log's token that already carries the
+    log's hash, then the one hash-less sell of that token to the same
+    address with a matching amount that was created before the log was
+    mined; when several or none fit, the log is left for the customer to
+    claim by hash. The matched sell gets the hash attached and its
+    confirmation count set, under a lease held by ``owner``, so hash
+    polling only has to finish off shallow deposits.
+    """
+    owner = owner or default_worker_id()
+    watcher_type, config = get_network_config(network)
+    normalize = ADDRESS_NORMALIZERS.get(watcher_type)
+    if config.get("scan_rpc_url"):
+        config = {**config, "rpc_urls": [config["scan_rpc_url"]]}
+    if not normalize or not rpc_endpoints(config):
+        return None
+    network = normalize_network(network)
+    addresses = monitored_addresses(network, normalize)
+    if not addresses:
+        return None
+    tokens = scan_token_map(config, normalize)
+    window = int(config.get("scan_block_window", 500))
+    min_conf = int(config.get("min_confirmations", 1))
+    tolerance = float(config.get("scan_amount_tolerance", 0.01))
+
+    report = ScanReport(network=network)
+    try:
+        head = int(_rpc(config, "eth_blockNumber", []), 16)
+    except (requests.RequestException, ValueError, TypeError) as exc:
+        logger.error("Scanner could not read head for %s: %s", network, exc)
+        return report
+    chain_head_cache.put(network, head)
+    cursor, _ = ChainScanCursor.objects.get_or_create(network=network, defaults={"last_block": max(head - window, 0)})
+    report.from_block = cursor.last_block + 1
+    report.to_block = cursor.last_block
+
+    index = pending_sells_by_address(network, normalize)
+    topic_addresses = ["0x" + "0" * 24 + address[2:] for address in sorted(addresses)]
+    claimed_hashes: Set[str] = set()
+    block_times: Dict[int, Optional[datetime]] = {}
+
+    for _ in range(max_windows):
+        start = cursor.last_block + 1
+        if start > head:
+            break
+        end = min(start + window - 1, head)
+        log_filter = {
+            "fromBlock": hex(start),
+            "toBlock": hex(end),
+            "topics": [ERC20_TRANSFER_TOPIC, None, topic_addresses],
+        }
+        if tokens:
+            log_filter["address"] = sorted(tokens)
+        try:
+            logs = _rpc(config, "eth_getLogs", [log_filter]) or []
+        except (requests.RequestException, ValueError) as exc:
+            logger.error("Scanner eth_getLogs failed for %s blocks %s-%s: %s", network, start, end, exc)
+            break
+
+        matches: List[Tuple[Transaction, str, WatcherResult]] = []
+        hashes = {normalize_tx_hash(watcher_type, log.get("transactionHash")) for log in logs}
+        claimed_hashes |= claimed_tx_hashes(watcher_type, hashes)
+        for log in logs:
+            report.logs += 1
+            topics = log.get("topics") or []
+            if len(topics) < 3 or log.get("removed"):
+                continue
+            to_address = topic_to_address(topics[2])
+            tx_hash = normalize_tx_hash(watcher_type, log.get("transactionHash"))
+            symbol, decimals = tokens.get(normalize_eth_address(log.get("address")), (None, None))
+            amount = int(log["data"], 16) / 10 ** decimals if decimals is not None and log.get("data") else None
+            candidates = index.get(to_address) or []
+            # Block times are only needed to match hash-less sells.
+            mined_at = log_mined_at(config, log, block_times) if any(
+                not tx.crypto_tx_hash for tx in candidates
+            ) else None
+            tx, ambiguous = _pick_transaction(candidates, watcher_type, tx_hash, symbol, amount, tolerance, mined_at)
+            if ambiguous:
+                report.ambiguous += 1
+                logger.warning(
+                    "Scanner left %s on %s unmatched: it fits %s %s to %s, "
+                    "but not exactly one sell created before it was mined",
+                    tx_hash, network, amount, symbol, to_address,
+                )
+            if not tx:
+                continue
+            if not tx.crypto_tx_hash and tx_hash in claimed_hashes:
+                continue
+            claimed_hashes.add(tx_hash)
+            candidates.remove(tx)
+            block_number = int(log["blockNumber"], 16)
+            confirmations = max(head - block_number, 0)
+            result = WatcherResult(
+                confirmed=confirmations >= min_conf,
+                confirmations=confirmations,
+                amount=amount,
+                meta={"log": log},
+                block_number=block_number,
+                status="success",
+                matched_output={
+                    "to": to_address,
+                    "contract": normalize_eth_address(log.get("address")),
+                    "log_index": log.get("logIndex"),
+                    "value": log.get("data"),
+                },
+            )
+            report.matched += 1
+            matches.append((tx, tx_hash, result))
+
+        if matches:
+            report.confirmed += apply_matches(matches, config, owner)
+        cursor.last_block = end
+        cursor.updated_at = timezone.now()
+        cursor.save(update_fields=["last_block", "updated_at"])
+        report.to_block = end
+    return report
+
+
+def scan_all_networks(max_windows: int = 10, owner: Optional[str] = None) -> List[ScanReport]:
+    reports = []
+    for network in getattr(settings, "BLOCKCHAIN_NETWORKS", {}):
+        report = scan_network(network, max_windows=max_windows, owner=owner)
+        if report:
+            reports.append(report)
+    return reports
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+from typing import Optional, Union
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+from api.models import BuyOrder, Transaction
+from .watchers import WatcherResult
+
+
+# Sell statuses the watcher still polls: "pending" until the hash is seen on
+# the network, then "detected" until it reaches min_confirmations.
+WATCHING_STATUSES = ("pending", "detected")
+
+# Rows the watcher tracks: incoming sells and outgoing buy deliveries.
+Watched = Union[Transaction, BuyOrder]
+
+
+def watched_sells():
+    """Sells the watcher polls until they reach min_confirmations."""
+    return Transaction.objects.filter(type="sell", status__in=WATCHING_STATUSES, crypto_tx_hash__isnull=False)
+
+
+def watched_deliveries():
+    """Buy orders whose crypto an admin has sent but nobody has confirmed."""
+    return BuyOrder.objects.filter(delivery_status="sent", tx_hash__isnull=False).exclude(tx_hash="")
+
+
+def _block_time(config: dict) -> float:
+    return float(config.get("block_time", 15))
+
+
+def next_check_delay(transaction: Watched, result: Optional[WatcherResult], config: dict) -> Optional[float]:
+    """Seconds until ``transaction`` is worth polling again.
+
+    Hashes the provider could not find, or that failed on chain, back off
+    exponentially from ``retry_base`` up to ``retry_max``; once a hash has
+    been detected the backoff starts from one block time instead, since it
+    is usually just waiting to be mined. Networks fed by provider webhooks
+    can set ``webhook_poll_interval`` to poll unseen hashes less often.
+    Seen transactions are polled roughly when the missing confirmations
+    should have landed, so a sell one block short of ``min_confirmations``
+    is checked again after one block time. Returns ``None`` once the transaction is confirmed.
+    """
+    if result and result.confirmed and result.matched_address:
+        return None
+    if not result or not result.matched_address:
+        ceiling = float(config.get("retry_max", 1800))
+        # Buy deliveries were broadcast by us, so they count as detected.
+        if getattr(transaction, "detected_at", None) or getattr(transaction, "delivered_at", None):
+            base = max(_block_time(config), float(config.get("min_poll_interval", 2)))
+            return min(base * 2 ** max(transaction.check_failures - 1, 0), ceiling)
+        base = float(config.get("retry_base", 30))
+        delay = min(base * 2 ** max(transaction.check_failures - 1, 0), ceiling)
+        # With provider webhooks in place, unseen hashes are announced by
+        # push and polling them is only a safety net.
+        return max(delay, float(config.get("webhook_poll_interval", 0)))
+    block_time = _block_time(config)
+    remaining = max(int(config.get("min_confirmations", 1)) - result.confirmations, 1)
+    floor = float(config.get("min_poll_interval", 2))
+    ceiling = float(config.get("max_poll_interval", 300))
+    return min(max(remaining * block_time, floor), ceiling)
+
+
+def schedule_next_check(transaction: Watched, result: Optional[WatcherResult], config: dict):
+    """Update the backoff counter and ``next_check_at`` in memory; the
+    caller saves ``check_failures`` and ``next_check_at``."""
+    if not result or not result.matched_address:
+        transaction.check_failures += 1
+    else:
+        transaction.check_failures = 0
+    delay = next_check_delay(transaction, result, config)
+    transaction.next_check_at = timezone.now() + timedelta(seconds=delay) if delay is not None else None
+
+
+def due_filter(now: Optional[datetime] = None) -> Q:
+    now = now or timezone.now()
+    return Q(next_check_at__isnull=True) | Q(next_check_at__lte=now)
+
+
+def due_ordering():
+    return (F("next_check_at").asc(nulls_first=True), "created_at")
+
+
+def next_due_at(scope: Optional[Q] = None) -> Optional[datetime]:
+    """When the earliest scheduled sell or delivery check becomes due, or
+    ``None`` if nothing is waiting on a hash. Rows another worker holds a
+    lease on are left out: they are being worked, and counting them as due
+    would keep an idle daemon from sleeping."""
+    now = timezone.now()
+    unleased = Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now)
+    due = []
+    for qs in (watched_sells(), watched_deliveries()):
+        qs = qs.filter(unleased)
+        if scope is not None:
+            qs = qs.filter(scope)
+        if qs.filter(next_check_at__isnull=True).exists():
+            return now
+        first = qs.order_by("next_check_at").values_list("next_check_at", flat=True).first()
+        if first:
+            due.append(first)
+    return min(due) if due else None
@@ -0,0 +1,350 @@
+"""Local stand-in for the blockchain providers the watchers talk to.
+
+Serves BlockCypher, TronGrid, EVM JSON-RPC and Solana JSON-RPC endpoints
+from one threaded HTTP server, backed by a synthetic chain that mines every
+registered hash a fixed delay after it was broadcast. Responses can also be
+replayed from recordings. Latency, 5xx errors and 429s are injected at
+configurable rates so the watcher loop can be load-tested without touching
+real providers.
+"""
+import json
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+# URL prefix for each watcher type, relative to the server root.
+PREFIXES = {
+    "blockcypher": "/blockcypher",
+    "tron": "/trongrid",
+    "evm": "/evm",
+    "solana": "/solana",
+}
+
+
+@dataclass
+class StandinTransaction:
+    address: str
+    amount: float
+    broadcast_at: float
+
+
+class StandinChain:
+    """A chain whose head advances every ``block_time`` seconds. A
+    registered hash sits in the mempool for ``mine_after`` seconds and is
+    then included in the next block."""
+
+    def __init__(self, block_time: float = 1.0, mine_after: float = 1.0, start_block: int = 1_000_000):
+        self.block_time = block_time
+        self.mine_after = mine_after
+        self.start_block = start_block
+        self.started = time.monotonic()
+        self.transactions: Dict[str, StandinTransaction] = {}
+        # Heights replaced by reorg(), with how many times each was.
+        self.reorgs: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def _block_at(self, moment: float) -> int:
+        return self.start_block + int((moment - self.started) / self.block_time)
+
+    def head(self) -> int:
+        return self._block_at(time.monotonic())
+
+    def block_hash(self, number: int) -> str:
+        return f"0x{self.reorgs[number]:08x}{number:056x}"
+
+    def reorg(self, number: int):
+        """Replace the block at ``number`` with a sibling that has a new hash."""
+        with self._lock:
+            self.reorgs[number] += 1
+
+    def register(self, tx_hash: str, address: str, amount: float = 1.0):
+        with self._lock:
+            self.transactions[tx_hash.lower()] = StandinTransaction(address, amount, time.monotonic())
+
+    def lookup(self, tx_hash: str) -> Tuple[Optional[StandinTransaction], Optional[int], int]:
+        """The transaction, the block it was mined in (``None`` while it is
+        in the mempool) and its confirmation count."""
+        tx = self.transactions.get((tx_hash or "").lower())
+        if tx is None:
+            return None, None, 0
+        mined_at = tx.broadcast_at + self.mine_after
+        if time.monotonic() < mined_at:
+            return tx, None, 0
+        block = self._block_at(mined_at) + 1
+        return tx, block, max(self.head() - block, 0)
+
+
+class StandinProvider:
+    """Threaded HTTP server answering as every supported provider type.
+
+    ``latency`` and ``jitter`` are seconds; ``error_rate`` and
+    ``throttle_rate`` are the fractions of requests answered with a 500 or a
+    429. ``recordings`` maps ``"GET <path>"`` to a REST body, or
+    ``"<rpc method> <first param>"`` to a JSON-RPC result, and takes
+    precedence over the synthetic chain.
+    """
+
+    def __init__(
+        self,
+        chain: Optional[StandinChain] = None,
+        latency: float = 0.05,
+        jitter: float = 0.02,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        recordings: Optional[dict] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.chain = chain or StandinChain()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.recordings = recordings or {}
+        self.requests = 0
+        self.connections = 0
+        self.rpc_calls: Counter = Counter()
+        self.injected: Counter = Counter()
+        self._stats_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def base_url(self, watcher_type: str) -> str:
+        return f"{self.url}{PREFIXES[watcher_type]}"
+
+    def start(self) -> "StandinProvider":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="standin-provider", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # -- request handling --------------------------------------------------
+
+    def _count(self, counter: Counter, key: str, amount: int = 1):
+        with self._stats_lock:
+            counter[key] += amount
+
+    def _fault(self) -> Optional[int]:
+        """Sleep for the simulated latency and maybe pick an injected status."""
+        delay = random.gauss(self.latency, self.jitter) if self.jitter else self.latency
+        if delay > 0:
+            time.sleep(delay)
+        roll = random.random()
+        if roll < self.error_rate:
+            return 500
+        if roll < self.error_rate + self.throttle_rate:
+            return 429
+        return None
+
+    def _handler_class(self):
+        provider = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, like the real providers, so clients can pool.
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with provider._stats_lock:
+                    provider.connections += 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body, headers: Optional[dict] = None):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _begin(self) -> bool:
+                with provider._stats_lock:
+                    provider.requests += 1
+                status = provider._fault()
+                if status is None:
+                    return True
+                provider._count(provider.injected, str(status))
+                if status == 429:
+                    self._send(429, {"error": "rate limited"}, {"Retry-After": "1"})
+                else:
+                    self._send(500, {"error": "injected failure"})
+                return False
+
+            def do_GET(self):
+                if not self._begin():
+                    return
+                path = self.path.split("?", 1)[0]
+                status, body = provider.handle_rest(path)
+                self._send(status, body)
+
+            def do_POST(self):
+                if not self._begin():
+                    return
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    payload = json.loads(self.rfile.read(length) or b"null")
+                except ValueError:
+                    self._send(400, {"error": "invalid json"})
+                    return
+                path = self.path.split("?", 1)[0].rstrip("/")
+                if isinstance(payload, list):
+                    self._send(200, [provider.handle_rpc(path, call) for call in payload])
+                elif isinstance(payload, dict):
+                    self._send(200, provider.handle_rpc(path, payload))
+                else:
+                    self._send(400, {"error": "invalid request"})
+
+        return Handler
+
+    def handle_rest(self, path: str) -> Tuple[int, dict]:
+        recorded = self.recordings.get(f"GET {path}")
+        if recorded is not None:
+            return 200, recorded
+        if path.startswith(f"{PREFIXES['blockcypher']}/txs/"):
+            self._count(self.rpc_calls, "blockcypher.txs")
+            return self._blockcypher_tx(path.rsplit("/", 1)[-1])
+        if path.startswith(f"{PREFIXES['tron']}/v1/transactions/"):
+            self._count(self.rpc_calls, "trongrid.transactions")
+            return 200, self._tron_tx(path.rsplit("/", 1)[-1])
+        return 404, {"error": "not found"}
+
+    def handle_rpc(self, path: str, call: dict) -> dict:
+        method = call.get("method", "")
+        params = call.get("params") or []
+        self._count(self.rpc_calls, method)
+        key = f"{method} {params[0]}" if params and isinstance(params[0], str) else method
+        if key in self.recordings:
+            result = self.recordings[key]
+        elif path == PREFIXES["evm"]:
+            result = self._evm(method, params)
+        elif path == PREFIXES["solana"]:
+            result = self._solana(method, params)
+        else:
+            return {"jsonrpc": "2.0", "id": call.get("id"), "error": {"code": -32601, "message": "unknown endpoint"}}
+        return {"jsonrpc": "2.0", "id": call.get("id"), "result": result}
+
+    # -- synthetic providers -------------------------------------------------
+
+    def _blockcypher_tx(self, tx_hash: str) -> Tuple[int, dict]:
+        tx, block, confirmations = self.chain.lookup(tx_hash)
+        if tx is None:
+            return 404, {"error": f"Transaction {tx_hash} not found."}
+        return 200, {
+            "hash": tx_hash,
+            "block_height": block if block is not None else -1,
+            "confirmations": confirmations,
+            "double_spend": False,
+            "outputs": [{"addresses": [tx.address], "value": int(tx.amount * 1e8)}],
+        }
+
+    def _tron_tx(self, tx_hash: str) -> dict:
+        tx, block, confirmations = self.chain.lookup(tx_hash)
+        if tx is None:
+            return {"data": [], "success": True}
+        return {
+            "data": [
+                {
+                    "txID": tx_hash,
+                    "ret": [{"contractRet": "SUCCESS"}],
+                    "blockNumber": block,
+                    # TronGrid marks transactions confirmed once solidified.
+                    "confirmed": block is not None and confirmations >= 19,
+                }
+            ],
+            "success": True,
+        }
+
+    def _evm(self, method: str, params: list):
+        if method == "eth_blockNumber":
+            return hex(self.chain.head())
+        if method in ("eth_getBlockByNumber", "eth_getHeaderByNumber"):
+            number = int(params[0], 16)
+            if number > self.chain.head():
+                return None
+            return {"number": hex(number), "hash": self.chain.block_hash(number), "transactions": []}
+        tx_hash = params[0] if params else ""
+        tx, block, _ = self.chain.lookup(tx_hash)
+        if tx is None:
+            return None
+        if method == "eth_getTransactionByHash":
+            return {"hash": tx_hash, "to": tx.address, "blockNumber": hex(block) if block is not None else None}
+        if method == "eth_getTransactionReceipt":
+            if block is None:
+                return None
+            return {
+                "transactionHash": tx_hash,
+                "blockNumber": hex(block),
+                "blockHash": self.chain.block_hash(block),
+                "status": "0x1",
+                "to": tx.address,
+                "logs": [],
+            }
+        return None
+
+    def _solana(self, method: str, params: list):
+        if method == "getSignatureStatuses":
+            statuses = []
+            for signature in params[0] if params else []:
+                tx, block, confirmations = self.chain.lookup(signature)
+                if tx is None:
+                    statuses.append(None)
+                    continue
+                finalized = block is not None and confirmations >= 32
+                statuses.append({
+                    "slot": block or self.chain.head(),
+                    "confirmations": None if finalized else confirmations,
+                    "err": None,
+                    "confirmationStatus": (
+                        "finalized" if finalized else ("confirmed" if block is not None else "processed")
+                    ),
+                })
+            return {"context": {"slot": self.chain.head()}, "value": statuses}
+        if method == "getTransaction":
+            tx, block, _ = self.chain.lookup(params[0] if params else "")
+            if tx is None or block is None:
+                return None
+            lamports = int(tx.amount * 1e9)
+            return {
+                "slot": block,
+                "transaction": {"message": {"accountKeys": [{"pubkey": "StandinSender"}, {"pubkey": tx.address}]}},
+                "meta": {
+                    "err": None,
+                    "preBalances": [lamports * 2, 0],
+                    "postBalances": [lamports, lamports],
+                    "preTokenBalances": [],
+                    "postTokenBalances": [],
+                },
+            }
+        return None
+
+    def snapshot(self) -> dict:
+        with self._stats_lock:
+            return {
+                "requests": self.requests,
+                "connections": self.connections,
+                "rpc_calls": dict(self.rpc_calls),
+                "injected": dict(self.injected),
+            }
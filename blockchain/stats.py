@@ -0,0 +1,222 @@
+"""Watcher health snapshot for the admin API.
+
+Workers publish their in-process metrics (``blockchain.metrics``) together
+with provider and endpoint state after every cycle. ``watcher_stats`` merges
+the recent snapshots and adds queue figures read straight from the
+database: pending backlog by age, overdue checks, and created-to-confirmed
+times.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from django.utils import timezone
+
+from api.models import BuyOrder, Transaction, WatcherMetricsSnapshot
+from cvp_django.http_client import host_snapshot
+from .endpoints import endpoint_snapshot
+from .metrics import histogram_quantile, merge_snapshots, metrics
+from .scheduler import due_filter, watched_deliveries, watched_sells
+from .tasks import normalize_network
+from .throttle import throttle_snapshot
+from .watchers import chain_head_cache
+
+# (upper bound in seconds, label) for the backlog age buckets.
+BACKLOG_AGES = [(300, "5m"), (1800, "30m"), (7200, "2h"), (86400, "24h"), (None, "older")]
+
+# Snapshots from workers that have been silent longer than this are left
+# out; ones older than WORKER_STALE_AFTER are reported but flagged.
+WORKER_SNAPSHOT_TTL = timedelta(hours=1)
+WORKER_STALE_AFTER = timedelta(minutes=5)
+
+
+def publish_metrics(worker: str):
+    WatcherMetricsSnapshot.objects.update_or_create(
+        worker=worker,
+        defaults={
+            "snapshot": {
+                **metrics.snapshot(),
+                "providers": throttle_snapshot(),
+                "endpoints": endpoint_snapshot(),
+                "hosts": host_snapshot(),
+                "head_cache": {"hits": chain_head_cache.hits, "misses": chain_head_cache.misses},
+            },
+            "updated_at": timezone.now(),
+        },
+    )
+
+
+def _age_label(seconds: float) -> str:
+    for bound, label in BACKLOG_AGES:
+        if bound is None or seconds < bound:
+            return label
+    return BACKLOG_AGES[-1][1]
+
+
+def backlog_by_age(now=None) -> Dict[str, Dict[str, Dict[str, int]]]:
+    """Watched sells and deliveries per kind, network and age bucket."""
+    now = now or timezone.now()
+    backlog: Dict[str, Dict[str, Dict[str, int]]] = {"sell": {}, "delivery": {}}
+    for kind, qs in (("sell", watched_sells()), ("delivery", watched_deliveries())):
+        for network, created_at in qs.values_list("network", "created_at"):
+            buckets = backlog[kind].setdefault(normalize_network(network), {label: 0 for _, label in BACKLOG_AGES})
+            buckets[_age_label((now - created_at).total_seconds())] += 1
+    return backlog
+
+
+def overdue_checks(now=None) -> Dict[str, dict]:
+    """Rows already due per network, how many were never checked, and how
+    long the oldest has waited. A growing lag with healthy provider latency
+    points at scheduling rather than the providers."""
+    now = now or timezone.now()
+    overdue: Dict[str, dict] = defaultdict(lambda: {"due": 0, "never_checked": 0, "max_lag_seconds": 0.0})
+    for qs in (watched_sells(), watched_deliveries()):
+        for network, next_check_at, last_check, created_at in qs.filter(due_filter(now)).values_list(
+            "network", "next_check_at", "last_chain_check", "created_at"
+        ):
+            entry = overdue[normalize_network(network)]
+            entry["due"] += 1
+            if last_check is None:
+                entry["never_checked"] += 1
+            lag = (now - (next_check_at or created_at)).total_seconds()
+            entry["max_lag_seconds"] = round(max(entry["max_lag_seconds"], lag), 1)
+    return dict(overdue)
+
+
+def _percentiles(values: List[float]) -> dict:
+    ordered = sorted(values)
+
+    def pick(fraction: float) -> Optional[float]:
+        if not ordered:
+            return None
+        return round(ordered[min(int(fraction * len(ordered)), len(ordered) - 1)], 1)
+
+    return {"count": len(ordered), "p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99)}
+
+
+def confirm_times(window: timedelta = timedelta(hours=24)) -> Dict[str, Dict[str, dict]]:
+    """Created-to-confirmed seconds per network for recent sells, and
+    created-to-completed for recent buy deliveries."""
+    since = timezone.now() - window
+    sells: Dict[str, List[float]] = defaultdict(list)
+    for network, created_at, confirmed_at in Transaction.objects.filter(
+        type="sell", confirmed_at__gte=since
+    ).values_list("network", "created_at", "confirmed_at"):
+        sells[normalize_network(network)].append((confirmed_at - created_at).total_seconds())
+    deliveries: Dict[str, List[float]] = defaultdict(list)
+    for network, created_at, completed_at in BuyOrder.objects.filter(
+        delivery_status="confirmed", completed_at__gte=since
+    ).values_list("network", "created_at", "completed_at"):
+        deliveries[normalize_network(network)].append((completed_at - created_at).total_seconds())
+    return {
+        "sell": {network: _percentiles(values) for network, values in sells.items()},
+        "delivery": {network: _percentiles(values) for network, values in deliveries.items()},
+    }
+
+
+def watcher_stats() -> dict:
+    now = timezone.now()
+    snapshots = list(WatcherMetricsSnapshot.objects.filter(updated_at__gte=now - WORKER_SNAPSHOT_TTL))
+    merged = merge_snapshots([snapshot.snapshot for snapshot in snapshots])
+    for histogram in merged["histograms"]:
+        for label, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+            value = histogram_quantile(histogram, fraction)
+            # JSON has no infinity; use the Prometheus spelling instead.
+            histogram[label] = "+Inf" if value == float("inf") else value
+    return {
+        "generated_at": now.isoformat(),
+        "workers": [
+            {
+                "worker": snapshot.worker,
+                "updated_at": snapshot.updated_at.isoformat(),
+                "stale": now - snapshot.updated_at > WORKER_STALE_AFTER,
+                "providers": snapshot.snapshot.get("providers", {}),
+                "endpoints": snapshot.snapshot.get("endpoints", {}),
+                "hosts": snapshot.snapshot.get("hosts", {}),
+                "head_cache": snapshot.snapshot.get("head_cache", {}),
+            }
+            for snapshot in snapshots
+        ],
+        "metrics": merged,
+        "backlog": backlog_by_age(now),
+        "overdue": overdue_checks(now),
+        "time_to_confirm": confirm_times(),
+    }
+
+
+# HELP text for each exposed family, by name without the ``blockchain_``
+# prefix. Families missing here still get a generic line.
+PROMETHEUS_HELP = {
+    "provider_request_seconds": "Latency of calls to blockchain providers.",
+    "provider_requests_total": "Calls to blockchain providers by outcome.",
+    "watcher_call_seconds": "Duration of one watcher job, single or batched.",
+    "watcher_results_total": "Hashes looked up by watcher jobs, by outcome.",
+    "time_to_detect_seconds": "Time from sell creation until its hash was seen on chain.",
+    "time_to_confirm_seconds": "Time from creation until a sell or delivery reached its confirmations.",
+    "poll_lag_seconds": "How late checks ran compared to their next_check_at.",
+    "watch_cycle_seconds": "Duration of one watcher cycle.",
+    "watch_checks_total": "Sells and deliveries checked by the watcher.",
+    "watch_reorgs_total": "Watched transactions whose block was reorganised away.",
+    "watch_backlog": "Watched sells and deliveries by age.",
+    "watch_overdue": "Watched rows whose next check is due.",
+    "watch_never_checked": "Due watched rows that were never checked.",
+    "watch_overdue_max_lag_seconds": "How long the most overdue watched row has waited.",
+    "provider_circuit_open": "Whether a provider's circuit breaker is open.",
+}
+
+
+def _prom_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    body = ",".join(f'{key}="{str(value)}"' for key, value in sorted(labels.items()))
+    return "{" + body + "}"
+
+
+class _Exposition:
+    """Collects sample lines, writing ``# HELP`` and ``# TYPE`` once ahead
+    of each family's first sample. Callers add a family's samples together."""
+
+    def __init__(self):
+        self.lines: List[str] = []
+        self.families = set()
+
+    def sample(self, family: str, kind: str, sample: str, labels: dict, value):
+        name = f"blockchain_{family}"
+        if name not in self.families:
+            self.families.add(name)
+            self.lines.append(f"# HELP {name} {PROMETHEUS_HELP.get(family, f'Watcher metric {family}.')}")
+            self.lines.append(f"# TYPE {name} {kind}")
+        self.lines.append(f"{name}{sample}{_prom_labels(labels)} {value}")
+
+
+def prometheus_text(stats: dict) -> str:
+    """Render ``watcher_stats()`` in the Prometheus text exposition format.
+    Counters are exposed with the ``_total`` suffix the format expects."""
+    out = _Exposition()
+    for histogram in stats["metrics"]["histograms"]:
+        name, labels = histogram["name"], histogram["labels"]
+        running = 0
+        for bound, count in zip(histogram["buckets"] + ["+Inf"], histogram["counts"]):
+            running += count
+            out.sample(name, "histogram", "_bucket", {**labels, "le": bound}, running)
+        out.sample(name, "histogram", "_sum", labels, histogram["sum"])
+        out.sample(name, "histogram", "_count", labels, histogram["count"])
+    for counter in stats["metrics"]["counters"]:
+        name = counter["name"] if counter["name"].endswith("_total") else f"{counter['name']}_total"
+        out.sample(name, "counter", "", counter["labels"], counter["value"])
+    for kind, networks in stats["backlog"].items():
+        for network, ages in networks.items():
+            for age, count in ages.items():
+                out.sample("watch_backlog", "gauge", "", {"kind": kind, "network": network, "age": age}, count)
+    for family, field in (
+        ("watch_overdue", "due"),
+        ("watch_never_checked", "never_checked"),
+        ("watch_overdue_max_lag_seconds", "max_lag_seconds"),
+    ):
+        for network, entry in stats["overdue"].items():
+            out.sample(family, "gauge", "", {"network": network}, entry[field])
+    for worker in stats["workers"]:
+        for provider, state in worker["providers"].items():
+            labels = {"worker": worker["worker"], "provider": provider}
+            out.sample("provider_circuit_open", "gauge", "", labels, int(state["circuit"] != "closed"))
+    return "\n".join(out.lines) + "\n"
@@ -1,11 +1,32 @@
+import json
 import logging
-from typing import Tuple
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from functools import reduce
+from operator import or_
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple, Union
 
 from django.conf import settings
+from django.db import connection, transaction as dbtx
+from django.db.models import Q
 from django.utils import timezone
 
-from api.models import Transaction
-from .watchers import WATCHER_MAP, WatcherResult
+from api.models import BuyOrder, ChainPayload, Transaction
+from .metrics import CONFIRM_BUCKETS, LAG_BUCKETS, metrics
+from .leases import LeaseKeeper, claim_due_deliveries, claim_due_transactions, default_worker_id, release_leases
+from .scheduler import WATCHING_STATUSES, Watched, schedule_next_check
+from .watchers import (
+    BATCH_WATCHER_MAP,
+    DETECTOR_MAP,
+    TRACKER_MAP,
+    WATCHER_MAP,
+    BatchWatcher,
+    Tracker,
+    WatcherResult,
+    chain_head_cache,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -35,62 +56,581 @@ def normalize_network(network: str) -> str:
     return NETWORK_ALIASES.get(key, key)
 
 
+def network_filter(networks: Iterable[str]) -> Q:
+    """Match every stored spelling of the given networks, since
+    ``Transaction.network`` keeps whatever alias the customer picked."""
+    wanted = {normalize_network(network) for network in networks}
+    aliases = {alias for alias, target in NETWORK_ALIASES.items() if target in wanted} | wanted
+    return reduce(or_, (Q(network__iexact=alias) for alias in aliases))
+
+
 def get_network_config(network: str) -> Tuple[str, dict]:
     normalized = normalize_network(network)
     configs = getattr(settings, "BLOCKCHAIN_NETWORKS", {})
     config = configs.get(normalized)
     if not config:
         return "", {}
-    return config.get("type", ""), config
+    return config.get("type", ""), {**config, "network": normalized}
 
 
-def apply_watcher_result(transaction: Transaction, result: WatcherResult) -> bool:
-    transaction.last_chain_check = timezone.now()
-    transaction.blockchain_confirmations = result.confirmations
-    if result.meta:
-        transaction.chain_metadata = result.meta
-    changed_fields = ["last_chain_check", "blockchain_confirmations", "chain_metadata"]
+# Bump when the compact chain_metadata layout changes.
+CHAIN_METADATA_VERSION = 2
+MAX_MATCHED_OUTPUT_CHARS = 512
+
+
+def compact_chain_metadata(result: WatcherResult) -> dict:
+    """The bounded summary stored on ``Transaction.chain_metadata``."""
+    matched_output = result.matched_output
+    if matched_output and len(json.dumps(matched_output, default=str)) > MAX_MATCHED_OUTPUT_CHARS:
+        matched_output = {"truncated": True}
+    return {
+        "v": CHAIN_METADATA_VERSION,
+        "block_number": result.block_number,
+        "block_hash": result.block_hash,
+        "confirmations": result.confirmations,
+        "matched_output": matched_output,
+        "amount": result.amount,
+        "status": result.status,
+    }
+
+
+def raw_payload_for(transaction: Transaction, result: WatcherResult, previous: dict) -> Optional[ChainPayload]:
+    """Unsaved archive row for ``result.meta``, when archiving is on and the
+    compact summary actually changed."""
+    if not result.meta or not getattr(settings, "BLOCKCHAIN_STORE_RAW_PAYLOADS", False):
+        return None
+    if previous == transaction.chain_metadata:
+        return None
+    return ChainPayload(
+        transaction=transaction,
+        network=normalize_network(transaction.network),
+        payload=result.meta,
+    )
+
+
+# Fields every chain check may touch; written together by WatchResultWriter.
+WATCH_FIELDS = ["last_chain_check", "blockchain_confirmations", "chain_metadata", "check_failures", "next_check_at"]
 
+
+def is_detection(transaction: Transaction, result: Optional[WatcherResult]) -> bool:
+    """Whether ``result`` is the first sighting of the sell's hash."""
+    return bool(
+        result
+        and result.matched_address
+        and result.status != "failed"
+        and not transaction.detected_at
+    )
+
+
+def is_reorg(result: Optional[WatcherResult]) -> bool:
+    """Whether ``result`` reports that the block holding the hash was orphaned."""
+    return bool(result and result.status == "reorged")
+
+
+def stage_watcher_result(
+    transaction: Transaction,
+    result: Optional[WatcherResult],
+    config: dict,
+) -> Tuple[bool, Optional[ChainPayload]]:
+    """Apply a check outcome to ``transaction`` in memory only.
+
+    Returns whether the transaction is now confirmed and the raw payload row
+    to archive, if any. ``result`` is ``None`` when the provider had nothing.
+    The first result that sees the hash stamps ``detected_at`` and moves a
+    pending sell to "detected". A reorg undoes that: the sell goes back to
+    "pending" with ``detected_at`` and ``confirmed_at`` cleared, and is
+    detected again once the hash lands in a canonical block.
+    """
+    now = timezone.now()
+    transaction.last_chain_check = now
+    if is_reorg(result):
+        transaction.detected_at = None
+        transaction.confirmed_at = None
+        if transaction.status == "detected":
+            transaction.status = "pending"
+    elif is_detection(transaction, result):
+        transaction.detected_at = now
+        if transaction.status == "pending":
+            transaction.status = "detected"
+    schedule_next_check(transaction, result, config)
+    if not result:
+        return False, None
+    transaction.blockchain_confirmations = result.confirmations
+    previous_metadata = transaction.chain_metadata
+    transaction.chain_metadata = compact_chain_metadata(result)
+    payload = raw_payload_for(transaction, result, previous_metadata)
     if result.confirmed and result.matched_address:
         if not transaction.confirmed_at:
             transaction.confirmed_at = timezone.now()
-            changed_fields.append("confirmed_at")
         transaction.status = "crypto_confirmed"
-        changed_fields.append("status")
-        transaction.save(update_fields=changed_fields)
-        return True
+        return True, payload
+    return False, payload
 
+
+def apply_watcher_result(transaction: Transaction, result: WatcherResult, config: Optional[dict] = None) -> bool:
+    if config is None:
+        _, config = get_network_config(transaction.network)
+    detected = is_detection(transaction, result)
+    confirmed, payload = stage_watcher_result(transaction, result, config)
+    changed_fields = list(WATCH_FIELDS)
+    if is_reorg(result):
+        changed_fields += ["detected_at", "confirmed_at", "status"]
+    if detected:
+        changed_fields += ["detected_at", "status"]
+    if confirmed:
+        changed_fields += ["confirmed_at", "status"]
     transaction.save(update_fields=changed_fields)
-    return False
-
-
-def check_pending_transactions(limit: int = 25) -> Tuple[int, int]:
-    qs = Transaction.objects.filter(
-        type="sell",
-        status="pending",
-        crypto_tx_hash__isnull=False,
-    ).order_by("last_chain_check", "created_at")[:limit]
-    checked = 0
-    confirmed = 0
-    for tx in qs:
-        if not tx.wallet_address:
+    if payload:
+        payload.save()
+    return confirmed
+
+
+# Buy-order counterpart of WATCH_FIELDS.
+DELIVERY_WATCH_FIELDS = [
+    "last_chain_check",
+    "delivery_confirmations",
+    "chain_metadata",
+    "check_failures",
+    "next_check_at",
+]
+
+
+def stage_delivery_result(order: BuyOrder, result: Optional[WatcherResult], config: dict) -> bool:
+    """Apply a check of an outgoing buy delivery to ``order`` in memory and
+    return whether the transfer to ``recipient_address`` is now confirmed."""
+    order.last_chain_check = timezone.now()
+    schedule_next_check(order, result, config)
+    if not result:
+        return False
+    order.delivery_confirmations = result.confirmations
+    order.chain_metadata = compact_chain_metadata(result)
+    return bool(result.confirmed and result.matched_address)
+
+
+def mark_deliveries_confirmed(orders: List[BuyOrder], now):
+    """Complete confirmed deliveries the way AdminBuyOrderUpdateView does:
+    the order and its buy Transaction both become completed."""
+    ids = [order.id for order in orders]
+    BuyOrder.objects.filter(id__in=ids).update(delivery_status="confirmed", status="completed", completed_at=now)
+    BuyOrder.objects.filter(id__in=ids, delivered_at__isnull=True).update(delivered_at=now)
+    Transaction.objects.filter(type="buy", payment_id__in=[order.order_id for order in orders]).update(
+        status="completed",
+        completed_at=now,
+    )
+
+
+def notify_delivery_confirmed(order: BuyOrder):
+    from api.email_service import send_order_status_email
+
+    tx = Transaction.objects.filter(payment_id=order.order_id, type="buy").first()
+    if not tx or not tx.customer_email:
+        return
+    try:
+        send_order_status_email(
+            tx.customer_email,
+            {"id": order.order_id, "status": "completed", "admin_notes": order.admin_notes},
+            "Buy",
+        )
+    except Exception:
+        logger.exception("Could not send delivery email for order %s", order.order_id)
+
+
+class WatchResultWriter:
+    """Collects staged results and writes them in chunks.
+
+    Each flush is one transaction holding ``bulk_update``s of the watch
+    fields, grouped UPDATEs for sells that were detected, reorged or became
+    confirmed and for deliveries that became confirmed, and a ``bulk_create`` of
+    archived payloads, so the SQLite write lock is taken once per chunk
+    instead of once per row.
+
+    A flush only writes sells still in a watching status and deliveries
+    still marked sent, so a result that lands after an admin settled the
+    row cannot undo that. With an ``owner``, it also skips rows whose lease
+    lapsed to another worker, since that worker may already have written
+    newer results.
+    """
+
+    def __init__(self, owner: Optional[str] = None, chunk_size: Optional[int] = None):
+        self.owner = owner
+        self.chunk_size = chunk_size or int(getattr(settings, "BLOCKCHAIN_WATCHER_WRITE_CHUNK", 200))
+        self.pending: List[Transaction] = []
+        self.detected_ids: List[int] = []
+        self.reorged_ids: List[int] = []
+        self.confirmed_ids: List[int] = []
+        self.payloads: List[ChainPayload] = []
+        self.deliveries: List[BuyOrder] = []
+        self.delivered_orders: List[BuyOrder] = []
+        self.detected = 0
+        self.confirmed = 0
+        self.delivered = 0
+
+    def add(self, item: Watched, result: Optional[WatcherResult], config: dict):
+        if result and result.status == "reorged":
+            metrics.inc("watch_reorgs_total", network=normalize_network(item.network))
+        if isinstance(item, BuyOrder):
+            self.deliveries.append(item)
+            if stage_delivery_result(item, result, config):
+                self.delivered_orders.append(item)
+                self.delivered += 1
+                metrics.observe(
+                    "time_to_confirm_seconds",
+                    (timezone.now() - item.created_at).total_seconds(),
+                    CONFIRM_BUCKETS,
+                    network=normalize_network(item.network),
+                    kind="delivery",
+                )
+        else:
+            self._add_sell(item, result, config)
+        if len(self.pending) + len(self.deliveries) >= self.chunk_size:
+            self.flush()
+
+    def _add_sell(self, transaction: Transaction, result: Optional[WatcherResult], config: dict):
+        network = normalize_network(transaction.network)
+        if is_reorg(result):
+            self.reorged_ids.append(transaction.id)
+        elif is_detection(transaction, result):
+            self.detected_ids.append(transaction.id)
+            self.detected += 1
+            metrics.observe(
+                "time_to_detect_seconds",
+                (timezone.now() - transaction.created_at).total_seconds(),
+                CONFIRM_BUCKETS,
+                network=network,
+            )
+        was_confirmed = transaction.status == "crypto_confirmed"
+        confirmed, payload = stage_watcher_result(transaction, result, config)
+        self.pending.append(transaction)
+        if confirmed:
+            self.confirmed_ids.append(transaction.id)
+            self.confirmed += 1
+            if not was_confirmed:
+                metrics.observe(
+                    "time_to_confirm_seconds",
+                    (transaction.confirmed_at - transaction.created_at).total_seconds(),
+                    CONFIRM_BUCKETS,
+                    network=network,
+                    kind="sell",
+                )
+        if payload:
+            self.payloads.append(payload)
+
+    def _held(self, model, items: list) -> Set[int]:
+        if not items:
+            return set()
+        qs = model.objects.filter(id__in=[item.id for item in items])
+        if model is Transaction:
+            qs = qs.filter(status__in=WATCHING_STATUSES)
+        else:
+            qs = qs.filter(delivery_status="sent")
+        if self.owner:
+            qs = qs.filter(lease_owner=self.owner)
+        if connection.features.has_select_for_update:
+            qs = qs.select_for_update()
+        return set(qs.values_list("id", flat=True))
+
+    def _drop_unheld(self, sells: Set[int], orders: Set[int]):
+        """Forget staged results for rows outside ``sells`` and ``orders``."""
+        confirmed = [i for i in self.confirmed_ids if i in sells]
+        detected = [i for i in self.detected_ids if i in sells]
+        delivered = [order for order in self.delivered_orders if order.id in orders]
+        self.confirmed -= len(self.confirmed_ids) - len(confirmed)
+        self.detected -= len(self.detected_ids) - len(detected)
+        self.delivered -= len(self.delivered_orders) - len(delivered)
+        self.confirmed_ids, self.detected_ids, self.delivered_orders = confirmed, detected, delivered
+        self.reorged_ids = [i for i in self.reorged_ids if i in sells]
+        self.pending = [tx for tx in self.pending if tx.id in sells]
+        self.deliveries = [order for order in self.deliveries if order.id in orders]
+        self.payloads = [payload for payload in self.payloads if payload.transaction_id in sells]
+
+    def flush(self):
+        if not self.pending and not self.deliveries:
+            return
+        now = timezone.now()
+        with dbtx.atomic():
+            self._drop_unheld(self._held(Transaction, self.pending), self._held(BuyOrder, self.deliveries))
+            if self.pending:
+                Transaction.objects.bulk_update(self.pending, WATCH_FIELDS, batch_size=self.chunk_size)
+            if self.reorged_ids:
+                Transaction.objects.filter(id__in=self.reorged_ids).update(detected_at=None, confirmed_at=None)
+                Transaction.objects.filter(id__in=self.reorged_ids, status="detected").update(status="pending")
+            if self.detected_ids:
+                Transaction.objects.filter(id__in=self.detected_ids, detected_at__isnull=True).update(
+                    detected_at=now
+                )
+                Transaction.objects.filter(id__in=self.detected_ids, status="pending").update(status="detected")
+            if self.confirmed_ids:
+                watching = Transaction.objects.filter(id__in=self.confirmed_ids, status__in=WATCHING_STATUSES)
+                watching.filter(confirmed_at__isnull=True).update(confirmed_at=now)
+                watching.update(status="crypto_confirmed")
+            if self.payloads:
+                ChainPayload.objects.bulk_create(self.payloads, batch_size=self.chunk_size)
+            if self.deliveries:
+                BuyOrder.objects.bulk_update(self.deliveries, DELIVERY_WATCH_FIELDS, batch_size=self.chunk_size)
+            if self.delivered_orders:
+                mark_deliveries_confirmed(self.delivered_orders, now)
+        delivered_orders = self.delivered_orders
+        self.pending = []
+        self.detected_ids = []
+        self.reorged_ids = []
+        self.confirmed_ids = []
+        self.payloads = []
+        self.deliveries = []
+        self.delivered_orders = []
+        for order in delivered_orders:
+            notify_delivery_confirmed(order)
+
+
+@dataclass
+class WatchJob:
+    """One unit of provider work: a single sell or buy delivery, or a batch
+    of them on the same network when the watcher type supports it."""
+
+    transactions: List[Watched]
+    network: str
+    config: dict
+    watcher: Optional[Callable[[str, str, dict], Optional[WatcherResult]]] = None
+    batch_watcher: Optional[Union[BatchWatcher, Tracker]] = None
+    # "detect", "track", "batch" or "single". Tracker batches are fed
+    # (hash, chain_metadata) pairs instead of (hash, address).
+    kind: str = "single"
+
+
+def watch_target(item: Watched) -> Tuple[Optional[str], str]:
+    """The hash to look up and the address it must pay."""
+    if isinstance(item, BuyOrder):
+        return item.tx_hash, item.recipient_address
+    return item.crypto_tx_hash, item.wallet_address
+
+
+def watch_label(item: Watched) -> str:
+    return item.order_id if isinstance(item, BuyOrder) else item.payment_id
+
+
+def resolve_watcher(tx: Watched) -> Optional[Tuple[str, str, dict]]:
+    if not all(watch_target(tx)):
+        return None
+    watcher_type, config = get_network_config(tx.network)
+    if not watcher_type:
+        logger.debug("No watcher configured for network %s", tx.network)
+        return None
+    if watcher_type not in WATCHER_MAP:
+        logger.warning("Unknown watcher type %s for network %s", watcher_type, tx.network)
+        return None
+    return normalize_network(tx.network), watcher_type, config
+
+
+def is_tracked(item: Watched) -> bool:
+    """Whether a matched receipt, and the hash of its block, is on record."""
+    metadata = item.chain_metadata or {}
+    return bool(
+        metadata.get("status") == "success"
+        and metadata.get("block_number") is not None
+        and metadata.get("block_hash")
+        and metadata.get("matched_output")
+    )
+
+
+def awaits_detection(item: Watched) -> bool:
+    """Whether a sell's hash is still to be seen. One the detector already
+    saw mined without a payment it could recognise, such as a token sent
+    through a router contract, is left to the receipt instead."""
+    if not isinstance(item, Transaction) or item.detected_at:
+        return False
+    return (item.chain_metadata or {}).get("block_number") is None
+
+
+def build_watch_jobs(transactions: Iterable[Watched]) -> List[WatchJob]:
+    """Group due sells and buy deliveries into provider calls.
+
+    Both kinds share batches on the same network. Sells whose hash has not
+    been seen yet go to the network's detector, when it has one, instead of
+    the receipt watcher (see ``awaits_detection``); rows whose receipt is already on record go to the
+    network's tracker, which only checks that their block is still canonical.
+    """
+    jobs: List[WatchJob] = []
+    batches: Dict[Tuple[str, str], Tuple[BatchWatcher, dict, List[Watched]]] = {}
+    for tx in transactions:
+        resolved = resolve_watcher(tx)
+        if not resolved:
             continue
-        watcher_type, config = get_network_config(tx.network)
-        if not watcher_type:
-            logger.debug("No watcher configured for network %s", tx.network)
+        network, watcher_type, config = resolved
+        if awaits_detection(tx) and watcher_type in DETECTOR_MAP:
+            kind, batch_watcher = "detect", DETECTOR_MAP[watcher_type]
+        elif watcher_type in TRACKER_MAP and is_tracked(tx):
+            kind, batch_watcher = "track", TRACKER_MAP[watcher_type]
+        elif watcher_type in BATCH_WATCHER_MAP and int(config.get("batch_size", 1)) > 1:
+            kind, batch_watcher = "batch", BATCH_WATCHER_MAP[watcher_type]
+        else:
+            jobs.append(WatchJob([tx], network, config, watcher=WATCHER_MAP[watcher_type]))
             continue
-        watcher = WATCHER_MAP.get(watcher_type)
-        if not watcher:
-            logger.warning("Unknown watcher type %s for network %s", watcher_type, tx.network)
+        batches.setdefault((network, kind), (batch_watcher, config, []))[2].append(tx)
+    for (network, kind), (batch_watcher, config, pending) in batches.items():
+        size = max(int(config.get("batch_size", 1)), 1)
+        for start in range(0, len(pending), size):
+            jobs.append(
+                WatchJob(
+                    pending[start:start + size],
+                    network,
+                    config,
+                    batch_watcher=batch_watcher,
+                    kind=kind,
+                )
+            )
+    return jobs
+
+
+def park_unresolved(items: Iterable[Watched], jobs: List[WatchJob], writer: "WatchResultWriter") -> int:
+    """Back off rows no watcher can check (a network without a watcher, no
+    address or hash) the way a hash the provider cannot find is backed off.
+    Left unscheduled they would sort first and fill every claim. Returns
+    how many were parked."""
+    in_jobs = {(type(tx), tx.id) for job in jobs for tx in job.transactions}
+    parked = 0
+    for item in items:
+        if (type(item), item.id) in in_jobs:
             continue
-        checked += 1
-        result = watcher(tx.crypto_tx_hash, tx.wallet_address, config)
-        if result:
-            if apply_watcher_result(tx, result):
-                confirmed += 1
+        _, config = get_network_config(item.network)
+        writer.add(item, None, config or {})
+        parked += 1
+    return parked
+
+
+def _call_watcher(job: WatchJob) -> List[Tuple[Watched, Optional[WatcherResult]]]:
+    if job.batch_watcher:
+        if job.kind == "track":
+            targets = [(watch_target(tx)[0], tx.chain_metadata) for tx in job.transactions]
         else:
-            tx.last_chain_check = timezone.now()
-            tx.save(update_fields=["last_chain_check"])
-    return checked, confirmed
+            targets = [watch_target(tx) for tx in job.transactions]
+        results = job.batch_watcher(targets, job.config)
+        return [(tx, results.get(tx_hash)) for tx, (tx_hash, _) in zip(job.transactions, targets)]
+    tx = job.transactions[0]
+    return [(tx, job.watcher(*watch_target(tx), job.config))]
+
+
+def run_watch_job(job: WatchJob) -> List[Tuple[Watched, Optional[WatcherResult]]]:
+    started = time.monotonic()
+    try:
+        pairs = _call_watcher(job)
+    except Exception:
+        logger.exception(
+            "Watcher crashed for %s on %s",
+            ", ".join(watch_label(tx) for tx in job.transactions),
+            job.network,
+        )
+        metrics.inc("watcher_results_total", len(job.transactions), network=job.network, outcome="crashed")
+        return [(tx, None) for tx in job.transactions]
+    finally:
+        metrics.observe("watcher_call_seconds", time.monotonic() - started, network=job.network, kind=job.kind)
+    found = sum(1 for _, result in pairs if result is not None)
+    metrics.inc("watcher_results_total", found, network=job.network, outcome="found")
+    metrics.inc("watcher_results_total", len(pairs) - found, network=job.network, outcome="missing")
+    return pairs
+
 
+def network_concurrency_limit(config: dict) -> int:
+    default = getattr(settings, "BLOCKCHAIN_WATCHER_MAX_CONCURRENCY", 16)
+    return max(int(config.get("max_concurrency", default)), 1)
 
+
+def run_jobs_concurrently(
+    jobs: List[WatchJob],
+    concurrency: int,
+    writer: WatchResultWriter,
+    renew: Optional[Callable[[], None]] = None,
+):
+    """Fan watcher calls out over a thread pool, at most ``max_concurrency``
+    in flight per network, and apply each result on this thread as it lands.
+
+    Watchers only do network I/O, so database writes stay on the calling
+    thread (through ``writer``) and keep using its connection. ``renew`` is
+    called as jobs finish to keep the cycle's leases alive.
+    """
+    queues: Dict[str, Deque[WatchJob]] = defaultdict(deque)
+    limits: Dict[str, int] = {}
+    for job in jobs:
+        queues[job.network].append(job)
+        limits.setdefault(job.network, network_concurrency_limit(job.config))
+    running: Dict[str, int] = defaultdict(int)
+    in_flight: Dict[Future, WatchJob] = {}
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="chain-watcher") as pool:
+
+        def fill():
+            # Round-robin across networks so one slow provider cannot occupy
+            # every worker while other networks have due work.
+            submitted = True
+            while submitted and len(in_flight) < concurrency:
+                submitted = False
+                for network, queue in queues.items():
+                    if not queue or running[network] >= limits[network]:
+                        continue
+                    if len(in_flight) >= concurrency:
+                        break
+                    job = queue.popleft()
+                    in_flight[pool.submit(run_watch_job, job)] = job
+                    running[network] += 1
+                    submitted = True
+
+        fill()
+        while in_flight:
+            done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+            for future in done:
+                job = in_flight.pop(future)
+                running[job.network] -= 1
+                for tx, result in future.result():
+                    writer.add(tx, result, job.config)
+            if renew:
+                renew()
+            fill()
+
+
+def check_pending_transactions(
+    limit: int = 25,
+    concurrency: int = 1,
+    owner: Optional[str] = None,
+    networks: Optional[Iterable[str]] = None,
+) -> Tuple[int, int, int]:
+    """Lease the sells and buy deliveries whose ``next_check_at`` has come
+    due and poll them together. ``networks`` restricts this worker to a
+    shard of networks. Returns how many were checked, how many sells were
+    confirmed and how many deliveries were confirmed.
+    """
+    owner = owner or default_worker_id()
+    scope = network_filter(networks) if networks else None
+    claimed = claim_due_transactions(owner, limit, scope)
+    # Deliveries fill the rest of the cycle, but always get at least one
+    # slot so a sell backlog cannot starve them.
+    deliveries = claim_due_deliveries(owner, max(limit - len(claimed), 1), scope)
+    chain_head_cache.reset_stats()
+    started = time.monotonic()
+    now = timezone.now()
+    for item in claimed + deliveries:
+        # How late each check runs compared to when it was scheduled.
+        if item.next_check_at:
+            metrics.observe(
+                "poll_lag_seconds",
+                max((now - item.next_check_at).total_seconds(), 0),
+                LAG_BUCKETS,
+                network=normalize_network(item.network),
+            )
+    try:
+        jobs = build_watch_jobs(claimed + deliveries)
+        checked = sum(len(job.transactions) for job in jobs)
+        writer = WatchResultWriter(owner)
+        leases = LeaseKeeper(owner, {Transaction: [tx.id for tx in claimed], BuyOrder: [o.id for o in deliveries]})
+        park_unresolved(claimed + deliveries, jobs, writer)
+        if concurrency > 1 and len(jobs) > 1:
+            run_jobs_concurrently(jobs, concurrency, writer, renew=leases.renew)
+        else:
+            for job in jobs:
+                for tx, result in run_watch_job(job):
+                    writer.add(tx, result, job.config)
+                leases.renew()
+        writer.flush()
+        metrics.observe("watch_cycle_seconds", time.monotonic() - started)
+        metrics.inc("watch_checks_total", checked)
+        return checked, writer.confirmed, writer.delivered
+    finally:
+        release_leases(owner, [tx.id for tx in claimed])
+        release_leases(owner, [order.id for order in deliveries], model=BuyOrder)
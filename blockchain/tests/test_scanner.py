@@ -0,0 +1,152 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.models import Asset, Transaction, Vendor
+from blockchain.scanner import _pick_transaction, scan_network
+from blockchain.watchers import ERC20_TRANSFER_TOPIC
+
+USDT = "0x" + "1" * 40
+USDC = "0x" + "2" * 40
+PLATFORM = "0x" + "a" * 40
+NETWORKS = {
+    "TESTNET": {
+        "type": "evm",
+        "rpc_url": "http://rpc.invalid",
+        "min_confirmations": 3,
+        "scan_tokens": {
+            USDT: {"symbol": "USDT", "decimals": 6},
+            USDC: {"symbol": "USDC", "decimals": 6},
+        },
+    },
+}
+
+
+def transfer_log(tx_hash, contract, amount, block=95):
+    return {
+        "address": contract,
+        "topics": [ERC20_TRANSFER_TOPIC, "0x" + "0" * 24 + "b" * 40, "0x" + "0" * 24 + PLATFORM[2:]],
+        "data": hex(int(amount * 10 ** 6)),
+        "blockNumber": hex(block),
+        "transactionHash": tx_hash,
+        "logIndex": "0x0",
+    }
+
+
+@override_settings(BLOCKCHAIN_NETWORKS=NETWORKS)
+class ScanNetworkTests(TestCase):
+    def setUp(self):
+        Asset.objects.create(symbol="USDT", asset_name="Tether", network="TESTNET", wallet_address=PLATFORM)
+        self.vendor = Vendor.objects.create(name="V", email="v@example.com", password_hash="!", momo_number="0")
+
+    def sell(self, payment_id, amount, symbol="USDT", **fields):
+        return Transaction.objects.create(
+            payment_id=payment_id,
+            type="sell",
+            vendor=self.vendor,
+            crypto_amount=amount,
+            crypto_symbol=symbol,
+            network="TESTNET",
+            wallet_address=PLATFORM,
+            status=fields.pop("status", "pending"),
+            **fields,
+        )
+
+    def scan(self, logs, mined_at=None):
+        mined_at = mined_at or timezone.now() + timedelta(minutes=1)
+
+        def rpc(config, method, params):
+            if method == "eth_blockNumber":
+                return hex(100)
+            if method == "eth_getBlockByNumber":
+                return {"number": params[0], "timestamp": hex(int(mined_at.timestamp()))}
+            return logs
+
+        with mock.patch("blockchain.scanner._rpc", side_effect=rpc):
+            return scan_network("TESTNET", owner="scanner-a")
+
+    def test_unique_amount_match_confirms(self):
+        sell = self.sell("S-1", 25)
+        report = self.scan([transfer_log("0xAAA1", USDT, 25)])
+        sell.refresh_from_db()
+        self.assertEqual(report.confirmed, 1)
+        self.assertEqual(sell.status, "crypto_confirmed")
+        self.assertEqual(sell.crypto_tx_hash, "0xaaa1")
+        self.assertIsNone(sell.lease_owner)
+
+    def test_deposit_mined_before_the_sell_is_left_alone(self):
+        sell = self.sell("S-1", 25)
+        with self.assertLogs("blockchain.scanner", "WARNING"):
+            report = self.scan([transfer_log("0xaaa1", USDT, 25)], mined_at=timezone.now() - timedelta(hours=1))
+        sell.refresh_from_db()
+        self.assertEqual((report.matched, report.ambiguous), (0, 1))
+        self.assertEqual(sell.status, "pending")
+        self.assertIsNone(sell.crypto_tx_hash)
+
+    def test_sell_settled_during_the_scan_is_not_written(self):
+        sell = self.sell("S-1", 25)
+
+        def settle(*args):
+            Transaction.objects.filter(pk=sell.pk).update(status="failed")
+            return set(args[1])
+
+        with mock.patch("blockchain.scanner.lease_rows", side_effect=settle):
+            report = self.scan([transfer_log("0xaaa1", USDT, 25)])
+        sell.refresh_from_db()
+        self.assertEqual(report.confirmed, 0)
+        self.assertEqual(sell.status, "failed")
+        self.assertIsNone(sell.crypto_tx_hash)
+
+    def test_ambiguous_amount_match_is_left_alone(self):
+        first, second = self.sell("S-1", 25), self.sell("S-2", 25)
+        with self.assertLogs("blockchain.scanner", "WARNING"):
+            report = self.scan([transfer_log("0xaaa1", USDT, 25)])
+        self.assertEqual(report.ambiguous, 1)
+        self.assertEqual(report.matched, 0)
+        for sell in (first, second):
+            sell.refresh_from_db()
+            self.assertEqual(sell.status, "pending")
+            self.assertIsNone(sell.crypto_tx_hash)
+
+    def test_other_token_does_not_match(self):
+        sell = self.sell("S-1", 25, symbol="USDT")
+        report = self.scan([transfer_log("0xaaa1", USDC, 25)])
+        sell.refresh_from_db()
+        self.assertEqual(report.matched, 0)
+        self.assertEqual(sell.status, "pending")
+
+    def test_sells_of_other_tokens_do_not_make_a_match_ambiguous(self):
+        usdt = self.sell("S-1", 25, symbol="USDT")
+        self.sell("S-2", 25, symbol="USDC")
+        report = self.scan([transfer_log("0xaaa1", USDT, 25)])
+        usdt.refresh_from_db()
+        self.assertEqual(report.ambiguous, 0)
+        self.assertEqual(usdt.status, "crypto_confirmed")
+
+    def test_hash_claimed_in_other_case_is_not_reattached(self):
+        self.sell("S-OLD", 25, status="crypto_confirmed", crypto_tx_hash="0xAAA1")
+        sell = self.sell("S-1", 25)
+        self.scan([transfer_log("0xaaa1", USDT, 25)])
+        sell.refresh_from_db()
+        self.assertIsNone(sell.crypto_tx_hash)
+        self.assertEqual(sell.status, "pending")
+
+
+class PickTransactionTests(TestCase):
+    def test_hash_match_wins_over_amount(self):
+        vendor = Vendor.objects.create(name="V", email="v@example.com", password_hash="!", momo_number="0")
+        common = {"type": "sell", "vendor": vendor, "network": "TESTNET", "wallet_address": PLATFORM}
+        by_hash = Transaction(payment_id="S-1", crypto_amount=10, crypto_tx_hash="0xABC", **common)
+        by_amount = Transaction(payment_id="S-2", crypto_amount=25, **common)
+        tx, ambiguous = _pick_transaction([by_amount, by_hash], "evm", "0xabc", "USDT", 25, 0.01)
+        self.assertIs(tx, by_hash)
+        self.assertFalse(ambiguous)
+
+    def test_token_without_symbol_only_matches_by_hash(self):
+        vendor = Vendor.objects.create(name="V", email="v@example.com", password_hash="!", momo_number="0")
+        sell = Transaction(
+            payment_id="S-1", type="sell", vendor=vendor, crypto_amount=25, network="TESTNET", wallet_address=PLATFORM
+        )
+        self.assertEqual(_pick_transaction([sell], "evm", "0xabc", None, 25, 0.01), (None, False))
@@ -0,0 +1,41 @@
+from django.test import SimpleTestCase
+
+from blockchain.stats import prometheus_text
+
+
+class PrometheusTextTests(SimpleTestCase):
+    stats = {
+        "metrics": {
+            "histograms": [
+                {"name": "watch_cycle_seconds", "labels": {}, "buckets": [1.0], "counts": [2, 1], "sum": 3.5, "count": 3},
+            ],
+            "counters": [
+                {"name": "watch_checks_total", "labels": {}, "value": 7},
+                {"name": "cache_hits", "labels": {"network": "ERC20"}, "value": 2},
+            ],
+        },
+        "backlog": {"sell": {"ERC20": {"5m": 1}}, "delivery": {}},
+        "overdue": {
+            "ERC20": {"due": 2, "never_checked": 1, "max_lag_seconds": 4.0},
+            "TRC20": {"due": 1, "never_checked": 0, "max_lag_seconds": 1.0},
+        },
+        "workers": [],
+    }
+
+    def test_every_family_is_typed_once_ahead_of_its_samples(self):
+        lines = prometheus_text(self.stats).splitlines()
+        self.assertEqual(lines[:3], [
+            "# HELP blockchain_watch_cycle_seconds Duration of one watcher cycle.",
+            "# TYPE blockchain_watch_cycle_seconds histogram",
+            'blockchain_watch_cycle_seconds_bucket{le="1.0"} 2',
+        ])
+        self.assertIn("# TYPE blockchain_watch_checks_total counter", lines)
+        self.assertIn("# TYPE blockchain_watch_overdue gauge", lines)
+        self.assertEqual(sum(line.startswith("# TYPE ") for line in lines), 7)
+        overdue = [line for line in lines if line.startswith("blockchain_watch_overdue{")]
+        self.assertEqual(lines.index(overdue[1]), lines.index(overdue[0]) + 1)
+
+    def test_counters_get_the_total_suffix(self):
+        text = prometheus_text(self.stats)
+        self.assertIn('blockchain_cache_hits_total{network="ERC20"} 2', text)
+        self.assertIn("# TYPE blockchain_cache_hits_total counter", text)
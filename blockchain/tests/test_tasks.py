@@ -0,0 +1,86 @@
+from django.test import TestCase
+from django.utils import timezone
+
+from api.models import Transaction, Vendor
+from blockchain.tasks import WatchResultWriter, apply_watcher_result
+from blockchain.watchers import WatcherResult
+
+CONFIG = {"type": "evm", "min_confirmations": 3, "block_time": 12}
+
+
+def reorged():
+    return WatcherResult(
+        confirmed=False,
+        matched_address=False,
+        meta={"orphaned_block": "0xold", "canonical_block": "0xnew"},
+        status="reorged",
+    )
+
+
+def mined(confirmations):
+    return WatcherResult(
+        confirmed=confirmations >= 3,
+        confirmations=confirmations,
+        matched_address=True,
+        meta={"blockNumber": "0x10"},
+        block_number=16,
+        status="success",
+        block_hash="0xnew",
+    )
+
+
+class ReorgTests(TestCase):
+    def setUp(self):
+        vendor = Vendor.objects.create(name="V", email="v@example.com", password_hash="!", momo_number="0")
+        self.sell = Transaction.objects.create(
+            payment_id="S-1",
+            type="sell",
+            vendor=vendor,
+            crypto_amount=25,
+            network="ERC20",
+            wallet_address="0x" + "a" * 40,
+            crypto_tx_hash="0x" + "1" * 64,
+            status="detected",
+            detected_at=timezone.now(),
+            blockchain_confirmations=2,
+            chain_metadata={"v": 1, "block_number": 15, "block_hash": "0xold"},
+        )
+
+    def assert_reset(self):
+        self.sell.refresh_from_db()
+        self.assertEqual(self.sell.status, "pending")
+        self.assertIsNone(self.sell.detected_at)
+        self.assertIsNone(self.sell.confirmed_at)
+        self.assertEqual(self.sell.blockchain_confirmations, 0)
+
+    def test_writer_resets_a_reorged_sell(self):
+        writer = WatchResultWriter()
+        writer.add(self.sell, reorged(), CONFIG)
+        writer.flush()
+        self.assert_reset()
+
+    def test_apply_watcher_result_resets_a_reorged_sell(self):
+        self.assertFalse(apply_watcher_result(self.sell, reorged(), CONFIG))
+        self.assert_reset()
+
+    def test_sell_is_detected_again_after_a_reorg(self):
+        apply_watcher_result(self.sell, reorged(), CONFIG)
+        self.sell.refresh_from_db()
+        writer = WatchResultWriter()
+        writer.add(self.sell, mined(1), CONFIG)
+        writer.flush()
+        self.sell.refresh_from_db()
+        self.assertEqual(self.sell.status, "detected")
+        self.assertIsNotNone(self.sell.detected_at)
+        self.assertEqual(writer.detected, 1)
+
+    def test_writer_leaves_a_sell_settled_meanwhile_alone(self):
+        writer = WatchResultWriter()
+        writer.add(self.sell, mined(5), CONFIG)
+        Transaction.objects.filter(pk=self.sell.pk).update(status="failed")
+        writer.flush()
+        self.sell.refresh_from_db()
+        self.assertEqual(self.sell.status, "failed")
+        self.assertIsNone(self.sell.confirmed_at)
+        self.assertEqual(self.sell.blockchain_confirmations, 2)
+        self.assertEqual(writer.confirmed, 0)
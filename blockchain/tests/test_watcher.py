@@ -0,0 +1,204 @@
+import itertools
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.models import Transaction, Vendor
+from blockchain.scheduler import next_due_at
+from blockchain.tasks import check_pending_transactions
+from blockchain.watchers import (
+    ERC20_TRANSFER_SELECTOR,
+    blockcypher_result_from_tx,
+    evm_detect_batch,
+    evm_track_batch,
+    tron_watcher,
+)
+
+ADDRESS = "bc1qwatchedaddress"
+NETWORKS = {
+    "BITCOIN": {"type": "blockcypher", "min_confirmations": 2, "block_time": 600},
+    "TRC20": {"type": "tron", "min_confirmations": 19, "block_time": 3},
+}
+
+
+def blockcypher(confirmations):
+    def watcher(tx_hash, wallet_address, config):
+        return blockcypher_result_from_tx(
+            {"hash": tx_hash, "confirmations": confirmations, "block_height": 800000,
+             "outputs": [{"addresses": [ADDRESS], "value": 150000}]},
+            wallet_address,
+            int(config["min_confirmations"]),
+        )
+
+    return mock.Mock(side_effect=watcher)
+
+
+@override_settings(BLOCKCHAIN_NETWORKS=NETWORKS)
+class CheckPendingTransactionsTests(TestCase):
+    def setUp(self):
+        self.vendor = Vendor.objects.create(name="V", email="v@example.com", password_hash="!", momo_number="0")
+        self.sell = self.make_sell("S-1")
+
+    def make_sell(self, payment_id, network="BITCOIN", **fields):
+        return Transaction.objects.create(
+            payment_id=payment_id,
+            type="sell",
+            vendor=self.vendor,
+            crypto_amount=0.0015,
+            network=network,
+            wallet_address=ADDRESS,
+            crypto_tx_hash=f"{payment_id}-hash",
+            **fields,
+        )
+
+    def test_confirms_due_sell_and_releases_its_lease(self):
+        watcher = blockcypher(3)
+        with mock.patch.dict("blockchain.watchers.WATCHER_MAP", {"blockcypher": watcher}):
+            checked, confirmed, delivered = check_pending_transactions(owner="watcher-a")
+        self.sell.refresh_from_db()
+        self.assertEqual((checked, confirmed, delivered), (1, 1, 0))
+        self.assertEqual(self.sell.status, "crypto_confirmed")
+        self.assertIsNotNone(self.sell.detected_at)
+        self.assertIsNotNone(self.sell.confirmed_at)
+        self.assertIsNone(self.sell.lease_owner)
+
+    def test_concurrent_cycle_checks_every_sell_once(self):
+        for n in range(2, 6):
+            self.make_sell(f"S-{n}")
+        watcher = blockcypher(3)
+        with mock.patch.dict("blockchain.watchers.WATCHER_MAP", {"blockcypher": watcher}):
+            checked, confirmed, _ = check_pending_transactions(owner="watcher-a", concurrency=4)
+        self.assertEqual((checked, confirmed), (5, 5))
+        self.assertEqual(sorted(call.args[0] for call in watcher.call_args_list), [f"S-{n}-hash" for n in range(1, 6)])
+        self.assertFalse(Transaction.objects.exclude(status="crypto_confirmed").exists())
+
+    def test_unconfirmed_sell_is_detected_and_rescheduled(self):
+        with mock.patch.dict("blockchain.watchers.WATCHER_MAP", {"blockcypher": blockcypher(1)}):
+            check_pending_transactions(owner="watcher-a")
+        self.sell.refresh_from_db()
+        self.assertEqual(self.sell.status, "detected")
+        self.assertGreater(self.sell.next_check_at, timezone.now())
+
+    def test_sell_leased_by_another_worker_is_skipped(self):
+        Transaction.objects.filter(pk=self.sell.pk).update(
+            lease_owner="watcher-b", lease_expires_at=timezone.now() + timedelta(minutes=1)
+        )
+        watcher = blockcypher(3)
+        with mock.patch.dict("blockchain.watchers.WATCHER_MAP", {"blockcypher": watcher}):
+            self.assertEqual(check_pending_transactions(owner="watcher-a"), (0, 0, 0))
+        watcher.assert_not_called()
+        self.sell.refresh_from_db()
+        self.assertEqual((self.sell.status, self.sell.lease_owner), ("pending", "watcher-b"))
+
+    def test_worker_only_checks_its_network_shard(self):
+        self.make_sell("S-2", network="TRC20")
+        watcher = blockcypher(3)
+        with mock.patch.dict("blockchain.watchers.WATCHER_MAP", {"blockcypher": watcher, "tron": mock.Mock()}):
+            checked, _, _ = check_pending_transactions(owner="watcher-a", networks=["BTC"])
+        self.assertEqual(checked, 1)
+        self.assertEqual(Transaction.objects.get(payment_id="S-2").status, "pending")
+
+    def test_provider_crash_leaves_sell_pending_and_unleased(self):
+        crashing = mock.Mock(side_effect=RuntimeError("provider down"))
+        with mock.patch.dict("blockchain.watchers.WATCHER_MAP", {"blockcypher": crashing}), \
+                self.assertLogs("blockchain.tasks", "ERROR"):
+            check_pending_transactions(owner="watcher-a")
+        self.sell.refresh_from_db()
+        self.assertEqual(self.sell.status, "pending")
+        self.assertIsNone(self.sell.lease_owner)
+        self.assertIsNotNone(self.sell.next_check_at)
+
+    def test_sells_without_a_watcher_do_not_starve_the_queue(self):
+        for n in range(2, 5):
+            self.make_sell(f"L-{n}", network="LITECOIN")
+        Transaction.objects.filter(network="LITECOIN").update(created_at=timezone.now() - timedelta(days=1))
+        watcher = blockcypher(3)
+        with mock.patch.dict("blockchain.watchers.WATCHER_MAP", {"blockcypher": watcher}):
+            self.assertEqual(check_pending_transactions(owner="watcher-a", limit=3), (0, 0, 0))
+            self.assertEqual(check_pending_transactions(owner="watcher-a", limit=3), (1, 1, 0))
+        parked = Transaction.objects.filter(network="LITECOIN")
+        self.assertFalse(parked.filter(next_check_at__isnull=True).exists())
+        self.assertEqual(set(parked.values_list("check_failures", flat=True)), {1})
+        self.assertGreater(next_due_at(), timezone.now())
+
+    def test_result_for_a_lease_lost_mid_cycle_is_dropped(self):
+        def steal(tx_hash, wallet_address, config):
+            Transaction.objects.filter(pk=self.sell.pk).update(lease_owner="watcher-b")
+            return blockcypher(3)(tx_hash, wallet_address, config)
+
+        with mock.patch.dict("blockchain.watchers.WATCHER_MAP", {"blockcypher": mock.Mock(side_effect=steal)}):
+            checked, confirmed, _ = check_pending_transactions(owner="watcher-a")
+        self.sell.refresh_from_db()
+        self.assertEqual((checked, confirmed), (1, 0))
+        self.assertEqual((self.sell.status, self.sell.lease_owner), ("pending", "watcher-b"))
+
+    def test_slow_cycle_renews_its_leases(self):
+        self.make_sell("S-2")
+        expiries = []
+
+        def slow(tx_hash, wallet_address, config):
+            expiries.append(Transaction.objects.get(payment_id="S-2").lease_expires_at)
+            return None
+
+        with mock.patch.dict("blockchain.watchers.WATCHER_MAP", {"blockcypher": mock.Mock(side_effect=slow)}), \
+                mock.patch("blockchain.leases.time") as clock:
+            clock.monotonic.side_effect = itertools.count(0, 100)
+            check_pending_transactions(owner="watcher-a")
+        self.assertEqual(len(expiries), 2)
+        self.assertGreater(expiries[1], expiries[0])
+
+
+EVM_WALLET = "0x" + "a" * 40
+
+
+class DetectorTests(TestCase):
+    config = {"rpc_url": "http://rpc.invalid", "network": "ERC20"}
+
+    def detect(self, tx):
+        response = mock.Mock(json=mock.Mock(return_value=[{"id": 0, "result": tx}]))
+        with mock.patch("blockchain.watchers.rpc_post", return_value=response):
+            return evm_detect_batch([("0xhash", EVM_WALLET)], self.config)["0xhash"]
+
+    def test_token_transfer_to_the_wallet_is_a_match(self):
+        data = ERC20_TRANSFER_SELECTOR + "0" * 24 + EVM_WALLET[2:] + hex(25 * 10 ** 6)[2:].zfill(64)
+        result = self.detect({"hash": "0xhash", "to": "0x" + "1" * 40, "input": data})
+        self.assertTrue(result.matched_address)
+        self.assertEqual(result.matched_output["contract"], "0x" + "1" * 40)
+
+    def test_transaction_paying_someone_else_is_not_a_match(self):
+        data = ERC20_TRANSFER_SELECTOR + "0" * 24 + "b" * 40 + "0" * 64
+        result = self.detect({"hash": "0xhash", "to": "0x" + "1" * 40, "input": data})
+        self.assertFalse(result.matched_address)
+
+    def test_reverted_tron_transfer_is_not_a_detection(self):
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {"data": [{"ret": [{"contractRet": "REVERT"}], "confirmed": True}]}
+        with mock.patch("blockchain.watchers.provider_request", return_value=response):
+            result = tron_watcher("abc", "Twallet", {})
+        self.assertEqual((result.status, result.matched_address, result.confirmed), ("failed", False, False))
+
+
+class TrackerTests(TestCase):
+    config = {"rpc_url": "http://rpc.invalid", "network": "HEADERLESS", "min_confirmations": 3}
+
+    def test_falls_back_to_full_blocks_when_headers_are_not_served(self):
+        methods = []
+
+        def rpc(config, payload, timeout):
+            methods.append(payload[0]["method"])
+            if payload[0]["method"] == "eth_getHeaderByNumber":
+                entries = [{"id": 16, "error": {"code": -32601, "message": "the method does not exist"}}]
+            else:
+                entries = [{"id": 16, "result": {"number": "0x10", "hash": "0xabc"}}]
+            return mock.Mock(json=mock.Mock(return_value=entries + [{"id": "head", "result": "0x20"}]))
+
+        items = [("0xhash", {"block_number": 16, "block_hash": "0xabc"})]
+        with mock.patch("blockchain.watchers.rpc_post", side_effect=rpc), \
+                mock.patch("blockchain.watchers._headerless_networks", set()), \
+                self.assertLogs("blockchain.watchers", "INFO"):
+            first = evm_track_batch(items, self.config)
+            evm_track_batch(items, self.config)
+        self.assertEqual(first["0xhash"].confirmations, 16)
+        self.assertEqual(methods, ["eth_getHeaderByNumber", "eth_getBlockByNumber", "eth_getBlockByNumber"])
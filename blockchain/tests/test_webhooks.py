@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.models import ChainWebhookEvent, Transaction, Vendor
+from blockchain.webhooks import process_pending_events
+
+ADDRESS = "bc1qwatchedaddress"
+NETWORKS = {"BITCOIN": {"type": "blockcypher", "min_confirmations": 1, "block_time": 600}}
+
+
+def confirmation(confirmations=2):
+    return {
+        "hash": "abc123",
+        "confirmations": confirmations,
+        "block_height": 800000,
+        "outputs": [{"addresses": [ADDRESS], "value": 150000}],
+    }
+
+
+@override_settings(BLOCKCHAIN_NETWORKS=NETWORKS, BLOCKCHAIN_WEBHOOK_SECRETS={"blockcypher": "s3cret"})
+class ChainWebhookTests(TestCase):
+    def setUp(self):
+        vendor = Vendor.objects.create(name="V", email="v@example.com", password_hash="!", momo_number="0")
+        self.sell = Transaction.objects.create(
+            payment_id="S-1",
+            type="sell",
+            vendor=vendor,
+            crypto_amount=0.0015,
+            crypto_symbol="BTC",
+            network="BITCOIN",
+            wallet_address=ADDRESS,
+            crypto_tx_hash="abc123",
+        )
+
+    def post(self, body, secret="s3cret"):
+        return self.client.post(
+            f"/api/chain/webhooks/blockcypher?secret={secret}", body, content_type="application/json"
+        )
+
+    def test_view_only_stores_the_event(self):
+        response = self.post(confirmation())
+        self.assertEqual(response.json(), {"success": True, "duplicate": False})
+        self.assertEqual(self.post(confirmation()).json(), {"success": True, "duplicate": True})
+        self.assertEqual(self.post(confirmation(), secret="wrong").status_code, 401)
+        self.sell.refresh_from_db()
+        self.assertEqual(self.sell.status, "pending")
+        self.assertTrue(ChainWebhookEvent.objects.get().processed_at is None)
+
+    def test_pending_event_is_applied_under_the_row_lease(self):
+        self.post(confirmation())
+        self.assertEqual(process_pending_events(owner="watcher-a"), 1)
+        self.sell.refresh_from_db()
+        event = ChainWebhookEvent.objects.get()
+        self.assertEqual(self.sell.status, "crypto_confirmed")
+        self.assertIsNone(self.sell.lease_owner)
+        self.assertIsNotNone(event.processed_at)
+        self.assertEqual(process_pending_events(owner="watcher-a"), 0)
+
+    def test_event_waits_while_another_worker_holds_the_row(self):
+        self.post(confirmation())
+        Transaction.objects.filter(pk=self.sell.pk).update(
+            lease_owner="watcher-b", lease_expires_at=timezone.now() + timedelta(minutes=1)
+        )
+        self.assertEqual(process_pending_events(owner="watcher-a"), 0)
+        self.sell.refresh_from_db()
+        event = ChainWebhookEvent.objects.get()
+        self.assertEqual((self.sell.status, self.sell.lease_owner), ("pending", "watcher-b"))
+        self.assertEqual((event.processed_at, event.attempts), (None, 0))
+
+        Transaction.objects.filter(pk=self.sell.pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(process_pending_events(owner="watcher-a"), 1)
@@ -0,0 +1,219 @@
+import logging
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+import requests
+from django.utils import timezone
+
+from cvp_django import http_client
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderUnavailable(requests.RequestException):
+    """Raised instead of calling a provider whose circuit is open or whose
+    rate limit would make the caller wait longer than ``max_wait``."""
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Take a token and return how long the caller must wait before
+        using it. The token is owed even if the bucket is empty."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            wait = max(self.paused_until - now, 0.0)
+            if self.tokens < 0:
+                wait = max(wait, -self.tokens / self.rate)
+            return wait
+
+    def refund(self):
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def paused_for(self) -> float:
+        return max(self.paused_until - time.monotonic(), 0.0)
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, threshold: int, cooldown: float):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.cooldown:
+                    return False
+                self.state = self.HALF_OPEN
+                logger.info("Provider %s circuit half-open, sending a trial call", self.name)
+            if self.state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def release_trial(self):
+        """Give back a half-open trial slot that was granted but not used."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Provider %s circuit closed", self.name)
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.threshold):
+                logger.warning("Provider %s circuit opened after %s failures", self.name, self.failures)
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - timezone.now()).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class ProviderGuard:
+    """Rate limit and circuit breaker for one provider."""
+
+    def __init__(self, name: str, config: dict):
+        self.name = name
+        self.bucket = TokenBucket(
+            float(config.get("rate_limit", 10)),
+            float(config.get("burst", config.get("rate_limit", 10))),
+        )
+        self.breaker = CircuitBreaker(
+            name,
+            int(config.get("breaker_threshold", 5)),
+            float(config.get("breaker_cooldown", 60)),
+        )
+        self.max_wait = float(config.get("max_wait", 5))
+        self.default_backoff = float(config.get("throttle_backoff", 10))
+        self.calls = 0
+        self.throttled = 0
+        self.shed = 0
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        if not self.breaker.allow():
+            self.shed += 1
+            metrics.inc("provider_requests_total", provider=self.name, outcome="shed")
+            raise ProviderUnavailable(f"{self.name} circuit is open")
+        wait = self.bucket.reserve()
+        if wait > self.max_wait:
+            self.bucket.refund()
+            self.breaker.release_trial()
+            self.shed += 1
+            metrics.inc("provider_requests_total", provider=self.name, outcome="shed")
+            raise ProviderUnavailable(f"{self.name} rate limited for another {wait:.1f}s")
+        if wait:
+            time.sleep(wait)
+        self.calls += 1
+        started = time.monotonic()
+        try:
+            # No client-level retries: the breaker, the 429 pause and the
+            # watcher's own backoff already decide when to try again.
+            resp = http_client.request(method, url, retries=0, **kwargs)
+        except requests.RequestException as exc:
+            self.breaker.record_failure()
+            outcome = "timeout" if isinstance(exc, requests.Timeout) else "error"
+            metrics.observe("provider_request_seconds", time.monotonic() - started, provider=self.name)
+            metrics.inc("provider_requests_total", provider=self.name, outcome=outcome)
+            raise
+        metrics.observe("provider_request_seconds", time.monotonic() - started, provider=self.name)
+        outcome = "throttled" if resp.status_code == 429 else f"{resp.status_code // 100}xx"
+        metrics.inc("provider_requests_total", provider=self.name, outcome=outcome)
+        if resp.status_code == 429:
+            # The provider is up but we are over quota: stop sending until
+            # it says we may, without counting it towards an outage.
+            self.throttled += 1
+            backoff = parse_retry_after(resp.headers.get("Retry-After")) or self.default_backoff
+            self.bucket.pause(backoff)
+            self.breaker.record_success()
+            logger.warning("Provider %s returned 429, pausing for %.1fs", self.name, backoff)
+        elif resp.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return resp
+
+    def snapshot(self) -> dict:
+        return {
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "tokens": round(self.bucket.tokens, 2),
+            "rate_limit": self.bucket.rate,
+            "paused_for": round(self.bucket.paused_for(), 2),
+            "calls": self.calls,
+            "throttled": self.throttled,
+            "shed": self.shed,
+        }
+
+
+_guards: Dict[str, ProviderGuard] = {}
+_guards_lock = threading.Lock()
+
+
+def provider_guard(config: dict) -> ProviderGuard:
+    """Guard shared by every network whose config names the same provider.
+    Networks without a ``provider`` key each get their own."""
+    name = config.get("provider") or config.get("network") or config.get("type", "default")
+    with _guards_lock:
+        guard = _guards.get(name)
+        if guard is None:
+            guard = _guards[name] = ProviderGuard(name, config)
+        return guard
+
+
+def provider_request(config: dict, method: str, url: str, **kwargs) -> requests.Response:
+    return provider_guard(config).request(method, url, **kwargs)
+
+
+def throttle_snapshot() -> Dict[str, dict]:
+    with _guards_lock:
+        return {name: guard.snapshot() for name, guard in _guards.items()}
@@ -1,13 +1,19 @@
 import logging
+import threading
 import time
 from dataclasses import dataclass
-from typing import Callable, Dict, Optional
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 import requests
 
+from .endpoints import rpc_endpoints, rpc_post
+from .throttle import provider_request
+
 logger = logging.getLogger(__name__)
 
 ERC20_TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+# Selector of ERC-20 transfer(address,uint256).
+ERC20_TRANSFER_SELECTOR = "0xa9059cbb"
 
 
 def normalize_eth_address(address: Optional[str]) -> Optional[str]:
@@ -19,13 +25,122 @@ def normalize_eth_address(address: Optional[str]) -> Optional[str]:
     return addr
 
 
+def topic_to_address(topic: Optional[str]) -> Optional[str]:
+    """Take the address out of a 32-byte, left-padded log topic."""
+    if not topic:
+        return None
+    return f"0x{topic[-40:].lower()}"
+
+
 @dataclass
 class WatcherResult:
     confirmed: bool
     confirmations: int = 0
     amount: Optional[float] = None
     matched_address: bool = True
+    # Raw provider payload; only kept when raw payload archiving is on.
     meta: Optional[dict] = None
+    block_number: Optional[int] = None
+    # Execution outcome reported by the chain: success, failed or pending.
+    status: Optional[str] = None
+    # The output/log that paid our address, trimmed to a few scalar fields.
+    matched_output: Optional[dict] = None
+    # Hash of the block that included the transaction, where the chain can
+    # reorganise and the tracker needs it to spot an orphaned block.
+    block_hash: Optional[str] = None
+
+
+class ChainHeadCache:
+    """Latest block number per network, shared by every watcher call.
+
+    Entries live for roughly one block time, so a polling cycle asks each
+    network for its head once and reuses it for every receipt. A stale head
+    can only under-count confirmations, never over-count them.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[int, float]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get(self, key: str, ttl: float, fetch: Callable[[], Optional[int]]) -> Optional[int]:
+        # One lock per network so concurrent watchers wait for a single
+        # in-flight fetch instead of each sending their own.
+        with self._lock_for(key):
+            entry = self._entries.get(key)
+            now = time.monotonic()
+            if entry and now - entry[1] < ttl:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            head = fetch()
+            if head is not None:
+                self._entries[key] = (head, now)
+            return head
+
+    def peek(self, key: str, ttl: float) -> Optional[int]:
+        with self._lock_for(key):
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry[1] < ttl:
+                self.hits += 1
+                return entry[0]
+            return None
+
+    def put(self, key: str, head: int):
+        with self._lock_for(key):
+            self.misses += 1
+            self._entries[key] = (head, time.monotonic())
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+
+chain_head_cache = ChainHeadCache()
+
+
+def head_cache_ttl(config: dict) -> float:
+    return float(config.get("head_cache_ttl", config.get("block_time", 3)))
+
+
+def blockcypher_result_from_tx(data: dict, wallet_address: str, min_conf: int) -> WatcherResult:
+    """Build a result from a BlockCypher TX object, as returned by /txs or
+    pushed by a confirmation webhook."""
+    confirmations = data.get("confirmations", 0)
+    confirmed = confirmations >= min_conf
+    matched_output = None
+    matched_index = None
+    for index, output in enumerate(data.get("outputs", [])):
+        if wallet_address in output.get("addresses", []):
+            matched_output = output
+            matched_index = index
+            break
+    value = None
+    if matched_output:
+        value = matched_output.get("value")
+        if value is not None:
+            value = value / 1e8  # satoshis to BTC
+    block_height = data.get("block_height")
+    return WatcherResult(
+        confirmed=confirmed,
+        confirmations=confirmations,
+        amount=value,
+        matched_address=matched_output is not None,
+        meta=data,
+        block_number=block_height if block_height is not None and block_height >= 0 else None,
+        status="failed" if data.get("double_spend") else ("success" if confirmations else "pending"),
+        matched_output=(
+            {"index": matched_index, "address": wallet_address, "value": matched_output.get("value")}
+            if matched_output
+            else None
+        ),
+    )
 
 
 def blockcypher_watcher(tx_hash: str, wallet_address: str, config: dict) -> Optional[WatcherResult]:
@@ -36,98 +151,340 @@ def blockcypher_watcher(tx_hash: str, wallet_address: str, config: dict) -> Opti
     if token:
         params["token"] = token
     try:
-        resp = requests.get(f"{base_url}/txs/{tx_hash}", params=params, timeout=10)
+        resp = provider_request(config, "get", f"{base_url}/txs/{tx_hash}", params=params, timeout=10)
         if resp.status_code != 200:
             logger.warning("BlockCypher watcher failed %s %s", resp.status_code, resp.text)
             return None
-        data = resp.json()
-        confirmations = data.get("confirmations", 0)
-        confirmed = confirmations >= min_conf
-        matched_output = None
-        for output in data.get("outputs", []):
-            if wallet_address in output.get("addresses", []):
-                matched_output = output
-                break
-        value = None
-        if matched_output:
-            value = matched_output.get("value")
-            if value is not None:
-                value = value / 1e8  # satoshis to BTC
-        return WatcherResult(
-            confirmed=confirmed,
-            confirmations=confirmations,
-            amount=value,
-            matched_address=matched_output is not None,
-            meta=data,
-        )
+        return blockcypher_result_from_tx(resp.json(), wallet_address, min_conf)
     except requests.RequestException as exc:
         logger.error("BlockCypher watcher error: %s", exc)
         return None
 
 
+def head_cache_key(config: dict) -> str:
+    return config.get("network") or ",".join(rpc_endpoints(config))
+
+
+def fetch_chain_head(config: dict) -> Optional[int]:
+    def fetch():
+        latest_resp = rpc_post(
+            config,
+            {"jsonrpc": "2.0", "method": "eth_blockNumber", "params": [], "id": 2},
+            timeout=10,
+        )
+        latest_block_hex = latest_resp.json().get("result")
+        return int(latest_block_hex, 16) if latest_block_hex else None
+
+    return chain_head_cache.get(head_cache_key(config), head_cache_ttl(config), fetch)
+
+
+def evm_result_from_receipt(
+    receipt_data: dict,
+    wallet_address: str,
+    latest_block: Optional[int],
+    min_conf: int,
+) -> Optional[WatcherResult]:
+    receipt = receipt_data.get("result")
+    if not receipt:
+        return None
+    block_hex = receipt.get("blockNumber")
+    block_number = int(block_hex, 16) if block_hex else None
+    status_hex = receipt.get("status")
+    if status_hex is None or int(status_hex, 16) != 1:
+        return WatcherResult(
+            confirmed=False,
+            confirmations=0,
+            matched_address=False,
+            meta=receipt_data,
+            block_number=block_number,
+            status="failed",
+            block_hash=receipt.get("blockHash"),
+        )
+    tx_to = receipt.get("to")
+    matched_output = None
+    normalized_wallet = normalize_eth_address(wallet_address)
+    if normalized_wallet:
+        if tx_to and normalize_eth_address(tx_to) == normalized_wallet:
+            matched_output = {"to": normalized_wallet}
+        else:
+            for log in receipt.get("logs", []):
+                topics = log.get("topics") or []
+                if topics and topics[0].lower() == ERC20_TRANSFER_TOPIC:
+                    if len(topics) >= 3:
+                        to_candidate = topic_to_address(topics[2])
+                        if to_candidate == normalized_wallet:
+                            matched_output = {
+                                "to": normalized_wallet,
+                                "contract": normalize_eth_address(log.get("address")),
+                                "log_index": log.get("logIndex"),
+                                "value": log.get("data"),
+                            }
+                            break
+    confirmations = 0
+    if block_number is not None and latest_block is not None:
+        confirmations = max(latest_block - block_number, 0)
+    confirmed = confirmations >= min_conf
+    return WatcherResult(
+        confirmed=confirmed,
+        confirmations=confirmations,
+        matched_address=matched_output is not None,
+        meta={"receipt": receipt},
+        block_number=block_number,
+        status="success",
+        matched_output=matched_output,
+        block_hash=receipt.get("blockHash"),
+    )
+
+
 def evm_watcher(tx_hash: str, wallet_address: str, config: dict) -> Optional[WatcherResult]:
-    rpc_url = config.get("rpc_url")
-    if not rpc_url:
+    if not rpc_endpoints(config):
         logger.debug("EVM watcher skipped due to missing rpc_url")
         return None
     min_conf = int(config.get("min_confirmations", 3))
     try:
-        receipt_resp = requests.post(
-            rpc_url,
-            json={"jsonrpc": "2.0", "method": "eth_getTransactionReceipt", "params": [tx_hash], "id": 1},
+        receipt_resp = rpc_post(
+            config,
+            {"jsonrpc": "2.0", "method": "eth_getTransactionReceipt", "params": [tx_hash], "id": 1},
             timeout=10,
         )
         receipt_data = receipt_resp.json()
         receipt = receipt_data.get("result")
         if not receipt:
             return None
-        status_hex = receipt.get("status")
-        if status_hex is None or int(status_hex, 16) != 1:
-            return WatcherResult(
+        latest_block = None
+        if receipt.get("blockNumber"):
+            latest_block = fetch_chain_head(config)
+        return evm_result_from_receipt(receipt_data, wallet_address, latest_block, min_conf)
+    except requests.RequestException as exc:
+        logger.error("EVM watcher error: %s", exc)
+        return None
+
+
+def evm_batch_watcher(items: List[Tuple[str, str]], config: dict) -> Dict[str, Optional[WatcherResult]]:
+    """Check many receipts with one JSON-RPC batch POST.
+
+    ``items`` is a list of ``(tx_hash, wallet_address)`` pairs. The batch
+    carries one eth_getTransactionReceipt per hash, plus a single
+    eth_blockNumber unless the chain-head cache is still fresh. Hashes the
+    node did not answer for map to ``None``.
+    """
+    if not rpc_endpoints(config):
+        logger.debug("EVM batch watcher skipped due to missing rpc_url")
+        return {}
+    min_conf = int(config.get("min_confirmations", 3))
+    head_key = head_cache_key(config)
+    latest_block = chain_head_cache.peek(head_key, head_cache_ttl(config))
+    payload = [
+        {"jsonrpc": "2.0", "method": "eth_getTransactionReceipt", "params": [tx_hash], "id": index}
+        for index, (tx_hash, _) in enumerate(items)
+    ]
+    if latest_block is None:
+        payload.append({"jsonrpc": "2.0", "method": "eth_blockNumber", "params": [], "id": "head"})
+    try:
+        resp = rpc_post(config, payload, timeout=10)
+        data = resp.json()
+    except (requests.RequestException, ValueError) as exc:
+        logger.error("EVM batch watcher error: %s", exc)
+        return {}
+    if not isinstance(data, list):
+        # Some public nodes reject batches with a single error object.
+        logger.warning("EVM batch watcher got a non-batch response: %s", data)
+        return {}
+    responses = {entry.get("id"): entry for entry in data if isinstance(entry, dict)}
+    head_hex = (responses.get("head") or {}).get("result")
+    if head_hex:
+        latest_block = int(head_hex, 16)
+        chain_head_cache.put(head_key, latest_block)
+    results: Dict[str, Optional[WatcherResult]] = {}
+    for index, (tx_hash, wallet_address) in enumerate(items):
+        receipt_data = responses.get(index)
+        results[tx_hash] = (
+            evm_result_from_receipt(receipt_data, wallet_address, latest_block, min_conf)
+            if receipt_data
+            else None
+        )
+    return results
+
+
+def evm_transfer_target(tx: dict, wallet_address: str) -> Optional[dict]:
+    """The payment to ``wallet_address`` a transaction object makes, judged
+    from its ``to`` (a native transfer) or its ERC-20 ``transfer`` input."""
+    wallet = normalize_eth_address(wallet_address)
+    if not wallet:
+        return None
+    tx_to = normalize_eth_address(tx.get("to"))
+    if tx_to == wallet:
+        return {"to": wallet}
+    data = (tx.get("input") or "").lower()
+    # 4-byte selector, then the recipient and the amount as 32-byte words.
+    if data.startswith(ERC20_TRANSFER_SELECTOR) and len(data) >= 138 and topic_to_address(data[10:74]) == wallet:
+        return {"to": wallet, "contract": tx_to, "value": "0x" + data[74:138]}
+    return None
+
+
+def evm_detect_batch(items: List[Tuple[str, str]], config: dict) -> Dict[str, Optional[WatcherResult]]:
+    """Look hashes up with eth_getTransactionByHash before any receipt exists.
+
+    A node returns the transaction as soon as it is in its mempool, so this
+    tells us a sell was broadcast long before it is mined. Found hashes come
+    back as unconfirmed, ``status="pending"`` results; unknown ones as
+    ``None``. A result only counts as paying the sell's address when the
+    transaction sends to it directly or calls an ERC-20 ``transfer`` to it;
+    anything else is left for the receipt to settle.
+    """
+    if not rpc_endpoints(config):
+        logger.debug("EVM detector skipped due to missing rpc_url")
+        return {}
+    latest_block = chain_head_cache.peek(head_cache_key(config), head_cache_ttl(config))
+    payload = [
+        {"jsonrpc": "2.0", "method": "eth_getTransactionByHash", "params": [tx_hash], "id": index}
+        for index, (tx_hash, _) in enumerate(items)
+    ]
+    try:
+        data = rpc_post(config, payload, timeout=10).json()
+    except (requests.RequestException, ValueError) as exc:
+        logger.error("EVM detector error: %s", exc)
+        return {}
+    if not isinstance(data, list):
+        logger.warning("EVM detector got a non-batch response: %s", data)
+        return {}
+    responses = {entry.get("id"): entry for entry in data if isinstance(entry, dict)}
+    results: Dict[str, Optional[WatcherResult]] = {}
+    for index, (tx_hash, wallet_address) in enumerate(items):
+        tx = (responses.get(index) or {}).get("result")
+        if not tx:
+            results[tx_hash] = None
+            continue
+        block_hex = tx.get("blockNumber")
+        block_number = int(block_hex, 16) if block_hex else None
+        confirmations = 0
+        if block_number is not None and latest_block is not None:
+            confirmations = max(latest_block - block_number, 0)
+        matched_output = evm_transfer_target(tx, wallet_address)
+        results[tx_hash] = WatcherResult(
+            confirmed=False,
+            confirmations=confirmations,
+            matched_address=matched_output is not None,
+            block_number=block_number,
+            status="pending",
+            matched_output=matched_output,
+            block_hash=tx.get("blockHash"),
+        )
+    return results
+
+
+# Networks whose node turned eth_getHeaderByNumber down; the tracker asks
+# them for eth_getBlockByNumber instead for the rest of the process.
+_headerless_networks: Set[str] = set()
+
+
+def block_hash_method(config: dict) -> str:
+    """The call the tracker fetches block hashes with: 'block_hash_method'
+    if set, else the header-only eth_getHeaderByNumber, unless the node has
+    already turned it down."""
+    if config.get("block_hash_method"):
+        return config["block_hash_method"]
+    if head_cache_key(config) in _headerless_networks:
+        return "eth_getBlockByNumber"
+    return "eth_getHeaderByNumber"
+
+
+def method_unsupported(entry: Optional[dict]) -> bool:
+    error = (entry or {}).get("error") or {}
+    return error.get("code") == -32601 or "method" in str(error.get("message", "")).lower()
+
+
+def _track_request(config: dict, method: str, heights: List[int], with_head: bool) -> Optional[Dict]:
+    params_tail = [False] if method == "eth_getBlockByNumber" else []
+    payload = [
+        {"jsonrpc": "2.0", "method": method, "params": [hex(height), *params_tail], "id": height}
+        for height in heights
+    ]
+    if with_head:
+        payload.append({"jsonrpc": "2.0", "method": "eth_blockNumber", "params": [], "id": "head"})
+    try:
+        data = rpc_post(config, payload, timeout=10).json()
+    except (requests.RequestException, ValueError) as exc:
+        logger.error("EVM tracker error: %s", exc)
+        return None
+    if not isinstance(data, list):
+        logger.warning("EVM tracker got a non-batch response: %s", data)
+        return None
+    return {entry.get("id"): entry for entry in data if isinstance(entry, dict)}
+
+
+def evm_track_batch(items: List[Tuple[str, dict]], config: dict) -> Dict[str, Optional[WatcherResult]]:
+    """Count confirmations for transactions whose receipt was already seen.
+
+    ``items`` pairs each hash with its stored ``chain_metadata``. Instead of
+    refetching receipts, the batch asks for the canonical block at each
+    known height (once per distinct height) plus the chain head when the
+    cache is stale. A height whose block hash no longer matches means the
+    receipt's block was orphaned: the transaction comes back as a
+    ``status="reorged"`` result so it is looked up from scratch again.
+
+    Blocks are fetched with eth_getHeaderByNumber, which leaves out the
+    transaction hash list a full block carries. A node that does not serve
+    it gets the batch again as eth_getBlockByNumber(..., false), and keeps
+    getting that for the rest of the process.
+    """
+    if not rpc_endpoints(config):
+        logger.debug("EVM tracker skipped due to missing rpc_url")
+        return {}
+    min_conf = int(config.get("min_confirmations", 3))
+    head_key = head_cache_key(config)
+    latest_block = chain_head_cache.peek(head_key, head_cache_ttl(config))
+    method = block_hash_method(config)
+    heights = sorted({int(metadata["block_number"]) for _, metadata in items})
+    responses = _track_request(config, method, heights, latest_block is None)
+    if responses is None:
+        return {}
+    if method == "eth_getHeaderByNumber" and heights and all(
+        method_unsupported(responses.get(height)) for height in heights
+    ):
+        logger.info("%s does not serve eth_getHeaderByNumber; using eth_getBlockByNumber", head_key)
+        _headerless_networks.add(head_key)
+        responses = _track_request(config, "eth_getBlockByNumber", heights, latest_block is None)
+        if responses is None:
+            return {}
+    head_hex = (responses.get("head") or {}).get("result")
+    if head_hex:
+        latest_block = int(head_hex, 16)
+        chain_head_cache.put(head_key, latest_block)
+    results: Dict[str, Optional[WatcherResult]] = {}
+    for tx_hash, metadata in items:
+        block_number = int(metadata["block_number"])
+        block = (responses.get(block_number) or {}).get("result")
+        if not block or not block.get("hash") or latest_block is None:
+            results[tx_hash] = None
+            continue
+        if block["hash"].lower() != metadata["block_hash"].lower():
+            logger.warning(
+                "Block %s on %s was reorganised (%s is now %s); re-checking %s",
+                block_number,
+                config.get("network"),
+                metadata["block_hash"],
+                block["hash"],
+                tx_hash,
+            )
+            results[tx_hash] = WatcherResult(
                 confirmed=False,
-                confirmations=0,
                 matched_address=False,
-                meta=receipt_data,
+                meta={"orphaned_block": metadata["block_hash"], "canonical_block": block["hash"]},
+                status="reorged",
             )
-        tx_to = receipt.get("to")
-        matched = False
-        normalized_wallet = normalize_eth_address(wallet_address)
-        if normalized_wallet:
-            if tx_to and normalize_eth_address(tx_to) == normalized_wallet:
-                matched = True
-            else:
-                for log in receipt.get("logs", []):
-                    topics = log.get("topics") or []
-                    if topics and topics[0].lower() == ERC20_TRANSFER_TOPIC:
-                        if len(topics) >= 3:
-                            to_candidate = normalize_eth_address(topics[2])
-                            if to_candidate == normalized_wallet:
-                                matched = True
-                                break
-        block_hex = receipt.get("blockNumber")
-        confirmations = 0
-        if block_hex:
-            latest_resp = requests.post(
-                rpc_url,
-                json={"jsonrpc": "2.0", "method": "eth_blockNumber", "params": [], "id": 2},
-                timeout=10,
-            )
-            latest_data = latest_resp.json()
-            latest_block_hex = latest_data.get("result")
-            if latest_block_hex:
-                latest_block = int(latest_block_hex, 16)
-                tx_block = int(block_hex, 16)
-                confirmations = max(latest_block - tx_block, 0)
-        confirmed = confirmations >= min_conf
-        return WatcherResult(
-            confirmed=confirmed,
+            continue
+        confirmations = max(latest_block - block_number, 0)
+        results[tx_hash] = WatcherResult(
+            confirmed=confirmations >= min_conf,
             confirmations=confirmations,
-            matched_address=matched,
-            meta={"receipt": receipt},
+            amount=metadata.get("amount"),
+            block_number=block_number,
+            status="success",
+            matched_output=metadata.get("matched_output"),
+            block_hash=metadata["block_hash"],
         )
-    except requests.RequestException as exc:
-        logger.error("EVM watcher error: %s", exc)
-        return None
+    return results
 
 
 def tron_watcher(tx_hash: str, wallet_address: str, config: dict) -> Optional[WatcherResult]:
@@ -137,7 +494,7 @@ def tron_watcher(tx_hash: str, wallet_address: str, config: dict) -> Optional[Wa
     if api_key:
         headers["TRON-PRO-API-KEY"] = api_key
     try:
-        resp = requests.get(f"{base_url}/v1/transactions/{tx_hash}", headers=headers, timeout=10)
+        resp = provider_request(config, "get", f"{base_url}/v1/transactions/{tx_hash}", headers=headers, timeout=10)
         if resp.status_code != 200:
             logger.warning("Tron watcher failed %s %s", resp.status_code, resp.text)
             return None
@@ -146,24 +503,201 @@ def tron_watcher(tx_hash: str, wallet_address: str, config: dict) -> Optional[Wa
             return None
         tx = data["data"][0]
         ret = tx.get("ret") or []
-        success = ret and ret[0].get("contractRet") == "SUCCESS"
+        contract_ret = ret[0].get("contractRet") if ret else None
+        success = contract_ret == "SUCCESS"
+        # REVERT, OUT_OF_ENERGY and the like: the transfer never happened,
+        # so it is reported like a failed EVM receipt, not as a detection.
+        failed = contract_ret is not None and not success
         confirmations = 1 if tx.get("confirmed") else 0
         confirmed = success and tx.get("confirmed")
         return WatcherResult(
             confirmed=confirmed,
             confirmations=confirmations,
-            matched_address=True,
+            matched_address=not failed,
             meta=tx,
+            block_number=tx.get("blockNumber"),
+            status="success" if success else ("failed" if failed else "pending"),
         )
     except requests.RequestException as exc:
         logger.error("Tron watcher error: %s", exc)
         return None
 
 
+# getSignatureStatuses accepts at most this many signatures per call.
+SOLANA_MAX_SIGNATURES = 256
+# Slots in Solana's finality window; reported once a signature is finalized,
+# since the node stops counting confirmations at that point.
+SOLANA_FINALIZED_CONFIRMATIONS = 32
+
+
+def solana_token_transfer(tx: dict, wallet_address: str, mints: Optional[set]) -> Optional[dict]:
+    """Find the credit to ``wallet_address`` in a jsonParsed transaction.
+
+    The wallet may be the owner of the receiving token account or the token
+    account itself. SPL token balances are checked first (optionally only
+    for ``mints``), then plain SOL transfers to the wallet.
+    """
+    meta = tx.get("meta") or {}
+    keys = [
+        key.get("pubkey") if isinstance(key, dict) else key
+        for key in ((tx.get("transaction") or {}).get("message") or {}).get("accountKeys", [])
+    ]
+    pre_balances = {
+        (entry.get("accountIndex"), entry.get("mint")): entry
+        for entry in meta.get("preTokenBalances") or []
+    }
+    for entry in meta.get("postTokenBalances") or []:
+        index = entry.get("accountIndex")
+        mint = entry.get("mint")
+        account = keys[index] if index is not None and index < len(keys) else None
+        if wallet_address not in (account, entry.get("owner")):
+            continue
+        if mints and mint not in mints:
+            continue
+        post = float((entry.get("uiTokenAmount") or {}).get("uiAmountString") or 0)
+        pre_entry = pre_balances.get((index, mint)) or {}
+        pre = float((pre_entry.get("uiTokenAmount") or {}).get("uiAmountString") or 0)
+        if post > pre:
+            return {"account": account, "owner": entry.get("owner"), "mint": mint, "amount": post - pre}
+    if not mints and wallet_address in keys:
+        index = keys.index(wallet_address)
+        pre, post = meta.get("preBalances") or [], meta.get("postBalances") or []
+        if index < len(pre) and index < len(post) and post[index] > pre[index]:
+            return {"account": wallet_address, "mint": None, "amount": (post[index] - pre[index]) / 1e9}
+    return None
+
+
+def solana_batch_watcher(items: List[Tuple[str, str]], config: dict) -> Dict[str, Optional[WatcherResult]]:
+    """Check Solana signatures, up to 256 per getSignatureStatuses call.
+
+    Only signatures that are finalized without error are fetched in full
+    (one JSON-RPC batch per chunk) to check that the transfer credited the
+    expected token account. Signatures the node does not know map to
+    ``None``.
+    """
+    if not rpc_endpoints(config):
+        logger.debug("Solana watcher skipped due to missing rpc_url")
+        return {}
+    mints = set(config.get("token_mints") or []) or None
+    results: Dict[str, Optional[WatcherResult]] = {}
+    size = min(int(config.get("batch_size", SOLANA_MAX_SIGNATURES)), SOLANA_MAX_SIGNATURES)
+    for start in range(0, len(items), max(size, 1)):
+        chunk = items[start:start + size]
+        signatures = [signature for signature, _ in chunk]
+        try:
+            resp = rpc_post(
+                config,
+                {
+                    "jsonrpc": "2.0",
+                    "method": "getSignatureStatuses",
+                    "params": [signatures, {"searchTransactionHistory": True}],
+                    "id": 1,
+                },
+                timeout=10,
+            )
+            statuses = ((resp.json().get("result") or {}).get("value")) or []
+        except (requests.RequestException, ValueError) as exc:
+            logger.error("Solana watcher error: %s", exc)
+            continue
+
+        finalized = []
+        for index, (signature, wallet_address) in enumerate(chunk):
+            status = statuses[index] if index < len(statuses) else None
+            if not status:
+                results[signature] = None
+            elif status.get("err") is not None:
+                results[signature] = WatcherResult(
+                    confirmed=False,
+                    matched_address=False,
+                    block_number=status.get("slot"),
+                    status="failed",
+                )
+            elif status.get("confirmationStatus") == "finalized":
+                finalized.append((signature, wallet_address, status))
+            else:
+                results[signature] = WatcherResult(
+                    confirmed=False,
+                    confirmations=status.get("confirmations") or 0,
+                    block_number=status.get("slot"),
+                    status="pending",
+                )
+        if not finalized:
+            continue
+
+        payload = [
+            {
+                "jsonrpc": "2.0",
+                "method": "getTransaction",
+                "params": [
+                    signature,
+                    {"encoding": "jsonParsed", "commitment": "finalized", "maxSupportedTransactionVersion": 0},
+                ],
+                "id": index,
+            }
+            for index, (signature, _, _) in enumerate(finalized)
+        ]
+        try:
+            data = rpc_post(config, payload, timeout=10).json()
+        except (requests.RequestException, ValueError) as exc:
+            logger.error("Solana watcher error: %s", exc)
+            continue
+        if not isinstance(data, list):
+            logger.warning("Solana watcher got a non-batch response: %s", data)
+            continue
+        responses = {entry.get("id"): entry for entry in data if isinstance(entry, dict)}
+        for index, (signature, wallet_address, status) in enumerate(finalized):
+            tx = (responses.get(index) or {}).get("result")
+            if not tx:
+                results[signature] = None
+                continue
+            transfer = solana_token_transfer(tx, wallet_address, mints)
+            results[signature] = WatcherResult(
+                confirmed=transfer is not None,
+                confirmations=SOLANA_FINALIZED_CONFIRMATIONS,
+                amount=transfer["amount"] if transfer else None,
+                matched_address=transfer is not None,
+                meta=tx,
+                block_number=tx.get("slot", status.get("slot")),
+                status="success",
+                matched_output=transfer,
+            )
+    return results
+
+
+def solana_watcher(tx_hash: str, wallet_address: str, config: dict) -> Optional[WatcherResult]:
+    return solana_batch_watcher([(tx_hash, wallet_address)], config).get(tx_hash)
+
+
 WATCHER_MAP: Dict[str, Callable[[str, str, dict], Optional[WatcherResult]]] = {
     "blockcypher": blockcypher_watcher,
     "evm": evm_watcher,
     "tron": tron_watcher,
+    "solana": solana_watcher,
+}
+
+BatchWatcher = Callable[[List[Tuple[str, str]], dict], Dict[str, Optional[WatcherResult]]]
+
+# Watcher types that can check many transactions per provider round-trip.
+# Used when the network's config sets batch_size > 1.
+BATCH_WATCHER_MAP: Dict[str, BatchWatcher] = {
+    "evm": evm_batch_watcher,
+    "solana": solana_batch_watcher,
+}
+
+# Cheaper lookups for sells whose hash has not been seen yet. Watcher types
+# without one detect with their normal watcher, which already reports
+# unconfirmed (mempool) transactions.
+DETECTOR_MAP: Dict[str, BatchWatcher] = {
+    "evm": evm_detect_batch,
+}
+
+Tracker = Callable[[List[Tuple[str, dict]], dict], Dict[str, Optional[WatcherResult]]]
+
+# Confirmation counters for transactions with a matched receipt, fed the
+# stored chain_metadata instead of the wallet address. Watcher types
+# without one keep polling their normal watcher.
+TRACKER_MAP: Dict[str, Tracker] = {
+    "evm": evm_track_batch,
 }
 
 
@@ -0,0 +1,224 @@
+"""Push-based chain updates from provider webhooks.
+
+Providers call ``/api/chain/webhooks/<provider>``. The view checks the
+signature, stores the event as a ``ChainWebhookEvent`` and answers at once.
+The watcher applies stored events each cycle through
+``process_pending_events``: ``process_event`` leases the sells and buy
+deliveries an event is about, like a watcher check would, and turns the
+event into watcher results for them. An event whose rows are leased by
+another worker waits for the next cycle; one that fails is retried until
+MAX_EVENT_ATTEMPTS.
+"""
+import hashlib
+import hmac
+import logging
+from typing import Callable, Dict, List, Mapping, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction as dbtx
+from django.db.models import F, Q
+from django.utils import timezone
+
+from api.models import BuyOrder, ChainWebhookEvent, Transaction
+from .leases import default_worker_id, lease_rows, release_leases
+from .scheduler import Watched, watched_deliveries, watched_sells
+from .tasks import WatchResultWriter, get_network_config, normalize_network, watch_target
+from .watchers import (
+    WatcherResult,
+    blockcypher_result_from_tx,
+    fetch_chain_head,
+    normalize_eth_address,
+)
+
+logger = logging.getLogger(__name__)
+
+# Alchemy network ids for the EVM networks in BLOCKCHAIN_NETWORKS.
+ALCHEMY_NETWORKS = {
+    "ETH_MAINNET": "ERC20",
+    "MATIC_MAINNET": "POLYGON",
+    "ARB_MAINNET": "ARBITRUM",
+    "BNB_MAINNET": "BEP20",
+    "AVAX_MAINNET": "AVALANCHE",
+}
+
+# Give up retrying an event after this many failed attempts.
+MAX_EVENT_ATTEMPTS = 5
+
+
+def webhook_secret(provider: str) -> str:
+    return (getattr(settings, "BLOCKCHAIN_WEBHOOK_SECRETS", {}) or {}).get(provider, "")
+
+
+def verify_blockcypher(raw: bytes, headers: Mapping[str, str], params: Mapping[str, str]) -> bool:
+    # BlockCypher does not sign callbacks, so the hook is registered with
+    # the shared secret in its callback URL (?secret=...).
+    secret = webhook_secret("blockcypher")
+    return bool(secret) and hmac.compare_digest(params.get("secret", ""), secret)
+
+
+def verify_alchemy(raw: bytes, headers: Mapping[str, str], params: Mapping[str, str]) -> bool:
+    secret = webhook_secret("alchemy")
+    signature = headers.get("X-Alchemy-Signature", "")
+    if not secret or not signature:
+        return False
+    computed = hmac.new(secret.encode("utf-8"), raw, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature, computed)
+
+
+# A parsed notification: (tx_hash, network or None, result builder). The
+# builder gets the matched row's address and network config.
+ChainUpdate = Tuple[str, Optional[str], Callable[[str, dict], WatcherResult]]
+
+
+def parse_blockcypher(payload: dict) -> List[ChainUpdate]:
+    """A tx-confirmation hook posts the full TX object, once per new
+    confirmation up to the number the hook was registered with."""
+    tx_hash = payload.get("hash")
+    if not tx_hash:
+        return []
+
+    def build(wallet_address: str, config: dict) -> WatcherResult:
+        return blockcypher_result_from_tx(payload, wallet_address, int(config.get("min_confirmations", 1)))
+
+    return [(tx_hash, None, build)]
+
+
+def parse_alchemy(payload: dict) -> List[ChainUpdate]:
+    """Address-activity hooks list transfers into watched addresses once
+    they are mined. Confirmations are counted against the cached chain
+    head; polling picks up the rest."""
+    event = payload.get("event") or {}
+    network = ALCHEMY_NETWORKS.get(event.get("network", ""))
+    updates: List[ChainUpdate] = []
+    for activity in event.get("activity") or []:
+        tx_hash = activity.get("hash")
+        if not tx_hash:
+            continue
+
+        def build(wallet_address: str, config: dict, activity=activity) -> WatcherResult:
+            block_hex = activity.get("blockNum")
+            block_number = int(block_hex, 16) if block_hex else None
+            latest_block = fetch_chain_head(config) if block_number is not None else None
+            confirmations = 0
+            if block_number is not None and latest_block is not None:
+                confirmations = max(latest_block - block_number, 0)
+            to_address = normalize_eth_address(activity.get("toAddress"))
+            matched = to_address is not None and to_address == normalize_eth_address(wallet_address)
+            return WatcherResult(
+                confirmed=matched and confirmations >= int(config.get("min_confirmations", 3)),
+                confirmations=confirmations,
+                amount=activity.get("value"),
+                matched_address=matched,
+                meta=activity,
+                block_number=block_number,
+                status="success" if block_number is not None else "pending",
+                matched_output={
+                    "to": to_address,
+                    "contract": normalize_eth_address((activity.get("rawContract") or {}).get("address")),
+                    "asset": activity.get("asset"),
+                } if matched else None,
+                block_hash=(activity.get("log") or {}).get("blockHash"),
+            )
+
+        updates.append((tx_hash, network, build))
+    return updates
+
+
+def blockcypher_event_key(payload: dict) -> str:
+    return f"{payload.get('hash', '')}:{payload.get('confirmations', 0)}"
+
+
+def alchemy_event_key(payload: dict) -> str:
+    return str(payload.get("id", ""))
+
+
+WEBHOOK_PROVIDERS: Dict[str, dict] = {
+    "blockcypher": {"verify": verify_blockcypher, "parse": parse_blockcypher, "key": blockcypher_event_key},
+    "alchemy": {"verify": verify_alchemy, "parse": parse_alchemy, "key": alchemy_event_key},
+}
+
+
+def record_event(provider: str, payload: dict) -> Optional[ChainWebhookEvent]:
+    """Store a verified event, or return ``None`` if it was already
+    received (providers retry until they get a 2xx)."""
+    key = WEBHOOK_PROVIDERS[provider]["key"](payload)
+    try:
+        with dbtx.atomic():
+            return ChainWebhookEvent.objects.create(provider=provider, event_key=key[:128], payload=payload)
+    except IntegrityError:
+        return None
+
+
+def rows_for_hash(tx_hash: str, network: Optional[str]) -> List[Watched]:
+    # Tron ids are stored with or without the 0x prefix.
+    bare = tx_hash[2:] if tx_hash.lower().startswith("0x") else tx_hash
+    sells = watched_sells().filter(Q(crypto_tx_hash__iexact=tx_hash) | Q(crypto_tx_hash__iexact=bare))
+    deliveries = watched_deliveries().filter(Q(tx_hash__iexact=tx_hash) | Q(tx_hash__iexact=bare))
+    rows = list(sells) + list(deliveries)
+    if network:
+        rows = [row for row in rows if normalize_network(row.network) == network]
+    return rows
+
+
+def process_event(event: ChainWebhookEvent, owner: str) -> Optional[int]:
+    """Apply one event through the watcher's result writer and return how
+    many sells or deliveries it updated, or ``None`` if a row it is about
+    is leased by another worker and the event should wait."""
+    sell_ids: Set[int] = set()
+    order_ids: Set[int] = set()
+    try:
+        matches = [
+            (row, build)
+            for tx_hash, network, build in WEBHOOK_PROVIDERS[event.provider]["parse"](event.payload)
+            for row in rows_for_hash(tx_hash, network)
+        ]
+        wanted_sells = {row.id for row, _ in matches if isinstance(row, Transaction)}
+        wanted_orders = {row.id for row, _ in matches if isinstance(row, BuyOrder)}
+        sell_ids = lease_rows(owner, wanted_sells)
+        order_ids = lease_rows(owner, wanted_orders, model=BuyOrder)
+        if sell_ids != wanted_sells or order_ids != wanted_orders:
+            return None
+        if not ChainWebhookEvent.objects.filter(pk=event.pk, processed_at__isnull=True).exists():
+            # Another worker applied it while this one was leasing.
+            return 0
+        # Re-read under the lease so the result lands on current state.
+        fresh: Dict[tuple, Watched] = {
+            **{(Transaction, row.id): row for row in Transaction.objects.filter(id__in=sell_ids)},
+            **{(BuyOrder, row.id): row for row in BuyOrder.objects.filter(id__in=order_ids)},
+        }
+        writer = WatchResultWriter(owner)
+        updated = 0
+        for row, build in matches:
+            row = fresh[(type(row), row.id)]
+            _, config = get_network_config(row.network)
+            if not config:
+                continue
+            writer.add(row, build(watch_target(row)[1], config), config)
+            updated += 1
+        writer.flush()
+    except Exception as exc:
+        logger.exception("Chain webhook %s failed", event.pk)
+        ChainWebhookEvent.objects.filter(pk=event.pk).update(
+            attempts=F("attempts") + 1,
+            last_error=str(exc)[:1000],
+        )
+        return 0
+    finally:
+        release_leases(owner, sell_ids)
+        release_leases(owner, order_ids, model=BuyOrder)
+    ChainWebhookEvent.objects.filter(pk=event.pk, processed_at__isnull=True).update(
+        attempts=F("attempts") + 1,
+        processed_at=timezone.now(),
+    )
+    return updated
+
+
+def process_pending_events(limit: int = 100, owner: Optional[str] = None) -> int:
+    """Apply stored events, oldest first, and return how many sells or
+    deliveries they updated."""
+    owner = owner or default_worker_id()
+    events = ChainWebhookEvent.objects.filter(
+        processed_at__isnull=True,
+        attempts__lt=MAX_EVENT_ATTEMPTS,
+    ).order_by("received_at")[:limit]
+    return sum(process_event(event, owner) or 0 for event in events)
@@ -0,0 +1,144 @@
+"""Shared outbound HTTP client.
+
+Every call to Paystack or a blockchain provider goes through ``request``,
+which keeps one keep-alive ``requests.Session`` per host so repeat calls
+reuse the TCP/TLS connection instead of handshaking each time. Calls get a
+default timeout, idempotent ones are retried with jittered backoff on
+connection errors and 502/503/504, and latency is recorded per host.
+"""
+import random
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {502, 503, 504}
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+class HostStats:
+    def __init__(self, window: int = 200):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool):
+        with self._lock:
+            self.latencies.append(latency)
+            self.requests += 1
+            if not ok:
+                self.errors += 1
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            ordered = sorted(self.latencies)
+            counts = {"requests": self.requests, "errors": self.errors, "retries": self.retries}
+
+        def pick(fraction: float) -> Optional[float]:
+            if not ordered:
+                return None
+            return round(ordered[min(int(fraction * len(ordered)), len(ordered) - 1)], 3)
+
+        return {**counts, "p50": pick(0.5), "p95": pick(0.95)}
+
+
+_sessions: Dict[str, requests.Session] = {}
+_stats: Dict[str, HostStats] = {}
+_lock = threading.Lock()
+
+
+def _host(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def session_for(url: str) -> requests.Session:
+    """The pooled session for ``url``'s host, created on first use."""
+    host = _host(url)
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            size = int(_setting("OUTBOUND_HTTP_POOL_SIZE", 16))
+            session = requests.Session()
+            # Retries are handled in request() so they can be jittered and
+            # limited to idempotent calls.
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size, max_retries=0)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[host] = session
+            _stats[host] = HostStats()
+        return session
+
+
+def request(
+    method: str,
+    url: str,
+    retries: Optional[int] = None,
+    idempotent: Optional[bool] = None,
+    **kwargs,
+) -> requests.Response:
+    """Send a request on the host's pooled session.
+
+    ``timeout`` defaults to ``OUTBOUND_HTTP_TIMEOUT`` (connect, read).
+    Idempotent calls (GET and friends, or ``idempotent=True`` for POSTs that
+    are safe to repeat) are retried up to ``retries`` times, defaulting to
+    ``OUTBOUND_HTTP_RETRIES``; the last response or error is returned or
+    raised as usual.
+    """
+    kwargs.setdefault("timeout", tuple(_setting("OUTBOUND_HTTP_TIMEOUT", (3.05, 20))))
+    if idempotent is None:
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+    if retries is None:
+        retries = int(_setting("OUTBOUND_HTTP_RETRIES", 2))
+    attempts = 1 + retries if idempotent else 1
+    backoff = float(_setting("OUTBOUND_HTTP_BACKOFF", 0.25))
+    session = session_for(url)
+    stats = _stats[_host(url)]
+    for attempt in range(attempts):
+        last = attempt + 1 == attempts
+        if attempt:
+            stats.record_retry()
+            # Full jitter keeps workers that failed together from retrying
+            # together.
+            time.sleep(random.uniform(0, backoff * 2 ** (attempt - 1)))
+        started = time.monotonic()
+        try:
+            resp = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            stats.record(time.monotonic() - started, ok=False)
+            if last:
+                raise
+            continue
+        stats.record(time.monotonic() - started, ok=resp.status_code < 500)
+        if last or resp.status_code not in RETRY_STATUSES:
+            return resp
+        resp.close()
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def host_snapshot() -> Dict[str, dict]:
+    with _lock:
+        stats = dict(_stats)
+    return {host: entry.snapshot() for host, entry in stats.items()}
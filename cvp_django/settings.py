@@ -48,6 +48,7 @@ INSTALLED_APPS = [
     'admin_auth.apps.AdminAuthConfig',
     'web',
     'learn_crypto',
+    'blockchain.apps.BlockchainConfig',
     'django_summernote',
 ]
 
@@ -121,6 +122,18 @@ DATABASES = {
     }
 }
 
+# The Paystack callback page shares charge verifications through this cache.
+# Point it at a shared backend (e.g. DJANGO_CACHE_BACKEND=
+# django.core.cache.backends.redis.RedisCache, DJANGO_CACHE_LOCATION=
+# redis://...) so every worker process sees the others' outcomes; the
+# in-memory default only de-duplicates within one process.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', ''),
+    }
+}
+
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
 USE_I18N = True
@@ -142,47 +155,171 @@ REST_FRAMEWORK = {
 
 FASTAPI_BASE_URL = os.environ.get('FASTAPI_BASE_URL', 'http://localhost:8000')
 PAYSTACK_SECRET_KEY = os.environ.get('PAYSTACK_SECRET_KEY', '')
-PAYSTACK_BASE_URL = os.environ.get('PAYSTACK_BASE_URL', 'https://api.paystack.co')
+# Setting PAYSTACK_STANDIN_URL (e.g. http://127.0.0.1:8765, served by
+# `manage.py paystack_standin`) sends every Paystack call to the local
+# stand-in in payments/standin.py instead of the live API.
+PAYSTACK_STANDIN_URL = os.environ.get('PAYSTACK_STANDIN_URL', '')
+PAYSTACK_BASE_URL = PAYSTACK_STANDIN_URL or os.environ.get('PAYSTACK_BASE_URL', 'https://api.paystack.co')
+# Transfers (and new recipients) per Paystack bulk request in payout runs.
+PAYSTACK_BULK_CHUNK = int(os.environ.get('PAYSTACK_BULK_CHUNK', '100'))
+# reconcile_paystack re-reads this many seconds before its cursor, since
+# Paystack filters listings by creation time and transfers settle later.
+PAYSTACK_SYNC_OVERLAP = int(os.environ.get('PAYSTACK_SYNC_OVERLAP', '1800'))
+PAYSTACK_SYNC_PAGE_SIZE = 100
+
+# Receipts packed into one JSON-RPC batch request on EVM networks. Set to 1
+# for nodes that do not accept batch calls.
+EVM_RPC_BATCH_SIZE = int(os.environ.get('EVM_RPC_BATCH_SIZE', '20'))
 
 BLOCKCHAIN_NETWORKS = {
     'BITCOIN': {
         'type': 'blockcypher',
+        'native_price_id': 'bitcoin',  # CoinGecko id, for the fee oracle
         'base_url': os.environ.get('BITCOIN_API_BASE', 'https://api.blockcypher.com/v1/btc/main'),
         'token': os.environ.get('BLOCKCYPHER_TOKEN', ''),
         'min_confirmations': int(os.environ.get('BTC_MIN_CONFIRMATIONS', '1')),
+        'max_concurrency': int(os.environ.get('BTC_MAX_CONCURRENCY', '3')),
+        'block_time': 600,
+        'rate_limit': float(os.environ.get('BTC_RATE_LIMIT', '3')),  # requests per second
     },
     'ERC20': {
         'type': 'evm',
+        'native_price_id': 'ethereum',  # CoinGecko id, for the fee oracle
         'rpc_url': os.environ.get('ETHEREUM_RPC_URL', ''),
         'min_confirmations': int(os.environ.get('ETH_MIN_CONFIRMATIONS', '3')),
+        'batch_size': EVM_RPC_BATCH_SIZE,
+        'block_time': 12,
+        'scan_tokens': {'0xdAC17F958D2ee523a2206206994597C13D831ec7': {'symbol': 'USDT', 'decimals': 6}},
+        'scan_block_window': 1000,
+        'rate_limit': float(os.environ.get('ETH_RATE_LIMIT', '25')),  # requests per second
     },
     'BEP20': {
         'type': 'evm',
+        'native_price_id': 'binancecoin',  # CoinGecko id, for the fee oracle
         'rpc_url': os.environ.get('BSC_RPC_URL', ''),
         'min_confirmations': int(os.environ.get('BSC_MIN_CONFIRMATIONS', '5')),
+        'batch_size': EVM_RPC_BATCH_SIZE,
+        'block_time': 3,
+        'scan_tokens': {'0x55d398326f99059fF775485246999027B3197955': {'symbol': 'USDT', 'decimals': 18}},
+        'scan_block_window': 2000,
+        'rate_limit': float(os.environ.get('BSC_RATE_LIMIT', '25')),  # requests per second
     },
     'POLYGON': {
         'type': 'evm',
+        'native_price_id': 'polygon-ecosystem-token',  # CoinGecko id, for the fee oracle
         'rpc_url': os.environ.get('POLYGON_RPC_URL', ''),
         'min_confirmations': int(os.environ.get('POLYGON_MIN_CONFIRMATIONS', '10')),
+        'batch_size': EVM_RPC_BATCH_SIZE,
+        'block_time': 2,
+        'scan_tokens': {'0xc2132D05D31c914a87C6611C10748AEb04B58e8F': {'symbol': 'USDT', 'decimals': 6}},
+        'scan_block_window': 2000,
+        'rate_limit': float(os.environ.get('POLYGON_RATE_LIMIT', '25')),  # requests per second
     },
     'ARBITRUM': {
         'type': 'evm',
+        'native_price_id': 'ethereum',  # CoinGecko id, for the fee oracle
         'rpc_url': os.environ.get('ARBITRUM_RPC_URL', ''),
         'min_confirmations': int(os.environ.get('ARBITRUM_MIN_CONFIRMATIONS', '6')),
+        'batch_size': EVM_RPC_BATCH_SIZE,
+        'block_time': 0.25,
+        'scan_tokens': {'0xFd086bC7CD5C481DCC9C85ebE478A1C0b69FCbb9': {'symbol': 'USDT', 'decimals': 6}},
+        'scan_block_window': 5000,
+        'rate_limit': float(os.environ.get('ARBITRUM_RATE_LIMIT', '25')),  # requests per second
     },
     'AVALANCHE': {
         'type': 'evm',
+        'native_price_id': 'avalanche-2',  # CoinGecko id, for the fee oracle
         'rpc_url': os.environ.get('AVALANCHE_RPC_URL', ''),
         'min_confirmations': int(os.environ.get('AVALANCHE_MIN_CONFIRMATIONS', '6')),
+        'batch_size': EVM_RPC_BATCH_SIZE,
+        'block_time': 2,
+        'scan_tokens': {'0x9702230A8Ea53601f5cD2dc00fDBc13d4dF4A8c7': {'symbol': 'USDT', 'decimals': 6}},
+        'scan_block_window': 2000,
+        'rate_limit': float(os.environ.get('AVALANCHE_RATE_LIMIT', '25')),  # requests per second
     },
     'TRC20': {
         'type': 'tron',
+        'native_price_id': 'tron',  # CoinGecko id, for the fee oracle
         'base_url': os.environ.get('TRON_API_BASE', 'https://api.trongrid.io'),
         'api_key': os.environ.get('TRON_API_KEY', ''),
+        # Only used by the log scanner; tron_watcher relies on the 'confirmed' flag.
+        'rpc_url': os.environ.get('TRON_RPC_URL', 'https://api.trongrid.io/jsonrpc'),
+        'min_confirmations': int(os.environ.get('TRON_MIN_CONFIRMATIONS', '19')),
+        'scan_tokens': {'TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t': {'symbol': 'USDT', 'decimals': 6}},
+        'scan_block_window': 1000,
+        'block_time': 3,
+        'max_concurrency': int(os.environ.get('TRON_MAX_CONCURRENCY', '10')),
+        # REST and JSON-RPC calls share one TronGrid quota.
+        'provider': 'trongrid',
+        'rate_limit': float(os.environ.get('TRON_RATE_LIMIT', '10')),  # requests per second
+    },
+    'SOLANA': {
+        'type': 'solana',
+        'native_price_id': 'solana',  # CoinGecko id, for the fee oracle
+        'rpc_url': os.environ.get('SOLANA_RPC_URL', 'https://api.mainnet-beta.solana.com'),
+        # Signatures are confirmed once finalized (~32 slots).
+        'min_confirmations': 32,
+        'batch_size': 256,  # getSignatureStatuses limit
+        'block_time': 0.4,
+        'token_mints': ['Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB'],  # USDT
+        'rate_limit': float(os.environ.get('SOLANA_RATE_LIMIT', '10')),  # requests per second
     },
 }
 
+# Fee oracle (manage.py update_network_fees): EWMA weight of each new sample.
+# Networks can tune it with 'fee_ewma_alpha', scale quotes with 'fee_markup',
+# or set 'fee_oracle': False to keep the admin-entered Asset.network_fee_usd.
+NETWORK_FEE_EWMA_ALPHA = float(os.environ.get('NETWORK_FEE_EWMA_ALPHA', '0.3'))
+COINGECKO_API_BASE = os.environ.get('COINGECKO_API_BASE', 'https://api.coingecko.com/api/v3')
+
+# Upper bound on in-flight provider calls per network when the watcher runs
+# with --concurrency > 1. Networks can override it with 'max_concurrency'.
+BLOCKCHAIN_WATCHER_MAX_CONCURRENCY = int(os.environ.get('BLOCKCHAIN_WATCHER_MAX_CONCURRENCY', '16'))
+
+# EVM 'rpc_url' values may list several endpoints separated by commas (or use
+# an 'rpc_urls' list). Calls go to the healthiest endpoint and are hedged to
+# the next one when no answer arrives within the endpoint's 'hedge_percentile'
+# latency (default p90, 'hedge_delay' seconds until enough samples exist).
+# Hedged calls run on a thread pool per network, sized for 'max_concurrency'
+# watcher calls plus their 'max_hedges'; 'hedge_workers' overrides the size.
+#
+# Each network's provider is also guarded by a token bucket ('rate_limit',
+# optional 'burst') and a circuit breaker ('breaker_threshold' consecutive
+# failures, 'breaker_cooldown' seconds) configured in BLOCKCHAIN_NETWORKS.
+
+# Watcher results are written back with one bulk UPDATE per this many rows.
+BLOCKCHAIN_WATCHER_WRITE_CHUNK = int(os.environ.get('BLOCKCHAIN_WATCHER_WRITE_CHUNK', '200'))
+
+# Transaction.chain_metadata keeps a compact summary of each chain check.
+# Enable this to also archive the raw provider payloads in api.ChainPayload
+# (one row per change, not per poll).
+BLOCKCHAIN_STORE_RAW_PAYLOADS = os.environ.get('BLOCKCHAIN_STORE_RAW_PAYLOADS', '0') == '1'
+
+# Shared secrets for provider push notifications at /api/chain/webhooks/<provider>.
+# BlockCypher hooks carry the secret in the callback URL (?secret=...);
+# Alchemy signs the body with the webhook's signing key.
+BLOCKCHAIN_WEBHOOK_SECRETS = {
+    'blockcypher': os.environ.get('BLOCKCYPHER_WEBHOOK_SECRET', ''),
+    'alchemy': os.environ.get('ALCHEMY_WEBHOOK_SIGNING_KEY', ''),
+}
+# Networks with hooks registered can add 'webhook_poll_interval' (seconds) to
+# their BLOCKCHAIN_NETWORKS entry so unseen hashes are only polled as a
+# safety net.
+# Reorg checks fetch block headers with eth_getHeaderByNumber and fall back
+# to eth_getBlockByNumber on nodes that do not serve it; set
+# 'block_hash_method' on a network to pin one of the two.
+
+# How long a watcher worker owns the rows it claimed. Leases held by a
+# crashed worker become claimable again after this many seconds.
+BLOCKCHAIN_WATCHER_LEASE_SECONDS = int(os.environ.get('BLOCKCHAIN_WATCHER_LEASE_SECONDS', '120'))
+
+# Outbound HTTP (cvp_django.http_client): one keep-alive pool per host.
+# Timeout is (connect, read) seconds; retries only apply to idempotent calls.
+OUTBOUND_HTTP_TIMEOUT = (3.05, float(os.environ.get('OUTBOUND_HTTP_READ_TIMEOUT', '20')))
+OUTBOUND_HTTP_RETRIES = int(os.environ.get('OUTBOUND_HTTP_RETRIES', '2'))
+OUTBOUND_HTTP_BACKOFF = 0.25
+OUTBOUND_HTTP_POOL_SIZE = int(os.environ.get('OUTBOUND_HTTP_POOL_SIZE', '16'))
+
 # Paystack Configuration
 PAYSTACK_SECRET_KEY = os.environ.get('PAYSTACK_SECRET_KEY', '')
 PAYSTACK_PUBLIC_KEY = os.environ.get('PAYSTACK_PUBLIC_KEY', '')
\ No newline at end of file
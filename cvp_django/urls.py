@@ -21,6 +21,7 @@ urlpatterns = [
     path('api/', include('api.transaction_urls')),
     path('api/', include('api.payment_urls')),
     path('api/', include('api.payout_urls')),
+    path('api/', include('api.chain_webhook_urls')),
     path('api/payment-methods/', include('api.payment_methods_urls')),
     path('api/exchange/', include('api.exchange_urls')),
     path('health', health),
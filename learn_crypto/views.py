@@ -74,7 +74,7 @@ class LessonDetailView(DetailView):
 from django.views.generic import TemplateView
 from django.http import JsonResponse
 from django.conf import settings
-import requests
+from cvp_django import http_client
 from datetime import timedelta
 from .models import Payment
 
@@ -94,10 +94,11 @@ def verify_payment(request):
     try:
         # Verify payment with Paystack
         paystack_secret = settings.PAYSTACK_SECRET_KEY
+        paystack_base = getattr(settings, 'PAYSTACK_BASE_URL', 'https://api.paystack.co')
         headers = {'Authorization': f'Bearer {paystack_secret}'}
         
-        response = requests.get(
-            f'https://api.paystack.co/transaction/verify/{reference}',
+        response = http_client.get(
+            f'{paystack_base}/transaction/verify/{reference}',
             headers=headers
         )
         
@@ -112,13 +113,15 @@ def verify_payment(request):
             membership.expiry_date = timezone.now() + timedelta(days=30)
             membership.save()
             
-            # Record payment
-            Payment.objects.create(
-                user=request.user,
-                amount=amount,
+            # Record payment (reconciliation may have recorded it already)
+            Payment.objects.update_or_create(
                 reference=reference,
-                status='success',
-                membership=membership
+                defaults={
+                    'user': request.user,
+                    'amount': amount,
+                    'status': 'success',
+                    'membership': membership,
+                },
             )
             
             return JsonResponse({
@@ -0,0 +1,300 @@
+"""Queued single payouts.
+
+``InitiateTransferView`` only calls ``enqueue``, which records a PayoutJob
+keyed on the sell's payment_id and returns. ``run_jobs``, driven by the
+``run_payout_jobs`` command, leases due jobs, makes their Paystack calls on
+a thread pool and applies the answers on the calling thread:
+
+- a queued job is submitted with its reference, or verified first if a
+  request for that reference has already gone out, so a timeout can never
+  turn into a second transfer;
+- a submitted job is verified until Paystack settles it (the transfer
+  webhooks make it due straight away);
+- errors, and transfers Paystack reports failed, are retried with jittered
+  exponential backoff until MAX_PAYOUT_ATTEMPTS, after which the job is
+  dead and the sell's payout_status is "failed".
+
+Results are only written back for jobs whose lease the worker still holds;
+a job another worker took over after the lease ran out is left to it. A
+sell that has already been completed (by a transfer webhook, say) keeps its
+status and completion time.
+"""
+import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import List
+
+from django.db import IntegrityError, connection, transaction as dbtx
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from api.models import PayoutJob, Transaction
+from payments.paystack import initiate_transfer, verify_transfer
+from payments.payouts import PAYOUT_STATUSES, apply_transfer, payout_reference
+
+logger = logging.getLogger(__name__)
+
+# Failed attempts (errors and failed transfers) before a job is dead.
+MAX_PAYOUT_ATTEMPTS = 8
+# Retry n waits up to BACKOFF_BASE * 2**(n-1) seconds, capped at BACKOFF_MAX.
+BACKOFF_BASE = 30
+BACKOFF_MAX = 3600
+# How long after submitting to check on a transfer whose webhook is late.
+VERIFY_AFTER = 60
+# Must outlast a Paystack call; a crashed worker's jobs free up after this.
+LEASE_SECONDS = 120
+
+ACTIVE_STATUSES = ('queued', 'submitted')
+JOB_FIELDS = [
+    'status', 'attempts', 'generation', 'reference', 'transfer_code', 'submitted_at',
+    'next_attempt_at', 'lease_owner', 'lease_expires_at', 'last_error', 'updated_at',
+]
+SELL_FIELDS = ['payout_status', 'payout_reference', 'transfer_code']
+
+
+@dataclass
+class JobRun:
+    claimed: int = 0
+    submitted: int = 0
+    succeeded: int = 0
+    retried: int = 0
+    dead: int = 0
+    lost: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+class PayoutConflict(Exception):
+    """The sell already has a payout that is not managed by a job."""
+
+
+def enqueue(t):
+    """Return ``(job, created)`` for the sell's payout job, creating it
+    if needed. A dead job is queued again; it is verified before anything
+    is resubmitted. A sell whose bulk payout failed has already used its
+    first reference, so its job starts on the next generation."""
+    key = payout_reference(t.payment_id)
+    job = PayoutJob.objects.filter(idempotency_key=key).first()
+    if job is None:
+        if t.payout_status in ('submitting', 'processing', 'success'):
+            raise PayoutConflict(t.payout_status)
+        generation = 1 if t.payout_status == 'failed' and t.payout_reference else 0
+        reference = payout_reference(f'{t.payment_id}-{generation}') if generation else key
+        try:
+            with dbtx.atomic():
+                job = PayoutJob.objects.create(
+                    transaction=t,
+                    idempotency_key=key,
+                    reference=reference,
+                    generation=generation,
+                    amount_ghs=t.fiat_amount,
+                )
+        except IntegrityError:
+            # Lost a race with another request for the same sell.
+            return PayoutJob.objects.get(idempotency_key=key), False
+        Transaction.objects.filter(pk=t.pk).update(payout_status='queued', payout_reference=reference)
+        return job, True
+    if job.status == 'dead':
+        now = timezone.now()
+        job.status = 'queued'
+        job.attempts = 0
+        job.next_attempt_at = now
+        job.updated_at = now
+        job.save(update_fields=['status', 'attempts', 'next_attempt_at', 'updated_at'])
+        Transaction.objects.filter(pk=t.pk).update(payout_status='queued')
+    return job, False
+
+
+def backoff(attempts):
+    return random.uniform(0, min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX))
+
+
+def claim_jobs(owner, limit):
+    """Lease up to ``limit`` due jobs to ``owner``, oldest due first."""
+    now = timezone.now()
+    unleased = Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now)
+    due = PayoutJob.objects.filter(unleased, status__in=ACTIVE_STATUSES, next_attempt_at__lte=now)
+    with dbtx.atomic():
+        candidates = due.order_by('next_attempt_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        ids = list(candidates.values_list('id', flat=True)[:limit])
+        PayoutJob.objects.filter(unleased, id__in=ids).update(
+            lease_owner=owner,
+            lease_expires_at=now + timedelta(seconds=LEASE_SECONDS),
+        )
+    return list(
+        PayoutJob.objects.filter(id__in=ids, lease_owner=owner)
+        .select_related('transaction__vendor')
+        .order_by('next_attempt_at', 'id')
+    )
+
+
+def _call(job, action):
+    """The Paystack call for one job; runs on a pool thread."""
+    try:
+        if action == 'verify':
+            return (*verify_transfer(job.reference), None)
+        recipient = job.transaction.vendor.paystack_recipient_code
+        if not recipient:
+            return None, None, 'vendor has no recipient code'
+        reason = f'Payout {job.transaction.payment_id}'
+        return (*initiate_transfer(job.amount_ghs, recipient, reason, reference=job.reference), None)
+    except Exception as exc:
+        return None, None, f'{type(exc).__name__}: {exc}'
+
+
+def _retry(job, t, error, now, run):
+    job.attempts += 1
+    job.last_error = error[:1000]
+    run.errors.append(f'{job.reference}: {error}')
+    if job.attempts >= MAX_PAYOUT_ATTEMPTS:
+        job.status = 'dead'
+        t.payout_status = 'failed'
+        run.dead += 1
+        logger.warning('Payout job %s is dead after %s attempts: %s', job.reference, job.attempts, error)
+        return
+    job.status = 'queued'
+    job.next_attempt_at = now + timedelta(seconds=backoff(job.attempts))
+    run.retried += 1
+
+
+def _apply(job, action, code, body, error, now, run):
+    t = job.transaction
+    if error:
+        _retry(job, t, error, now, run)
+        return
+    data = (body or {}).get('data') if (body or {}).get('status') else None
+    if action == 'submit':
+        if code in (200, 201) and data:
+            job.status = 'submitted'
+            job.transfer_code = data.get('transfer_code') or job.transfer_code
+            job.next_attempt_at = now + timedelta(seconds=VERIFY_AFTER)
+            apply_transfer(t, data, now)
+            run.submitted += 1
+            if t.payout_status == 'success':
+                job.status = 'succeeded'
+                run.succeeded += 1
+            elif t.payout_status == 'failed':
+                # Let the verify path decide on the retry.
+                t.payout_status = 'processing'
+                job.next_attempt_at = now
+        else:
+            # Rejected or unclear: the next attempt verifies before resubmitting.
+            _retry(job, t, f'transfer returned {code}: {(body or {}).get("message")}', now, run)
+        return
+    if code == 200 and data:
+        job.transfer_code = data.get('transfer_code') or job.transfer_code
+        final = PAYOUT_STATUSES.get(data.get('status'))
+        if final == 'success':
+            job.status = 'succeeded'
+            apply_transfer(t, data, now)
+            run.succeeded += 1
+        elif final == 'failed':
+            # Nothing was paid, so the next attempt is a new transfer.
+            job.generation += 1
+            job.reference = payout_reference(f'{t.payment_id}-{job.generation}')
+            job.submitted_at = None
+            job.transfer_code = ''
+            t.payout_reference = job.reference
+            t.transfer_code = None
+            t.payout_status = 'queued'
+            _retry(job, t, f'transfer {data.get("status")}', now, run)
+        else:
+            job.status = 'submitted'
+            t.payout_status = 'processing'
+            job.next_attempt_at = now + timedelta(seconds=VERIFY_AFTER)
+    elif code == 404 or (code == 400 and not (body or {}).get('status')):
+        # Paystack never saw this reference: safe to submit it now.
+        job.status = 'queued'
+        job.submitted_at = None
+        job.next_attempt_at = now
+    else:
+        _retry(job, t, f'verify returned {code}', now, run)
+
+
+def run_jobs(owner, limit=50, concurrency=4):
+    run = JobRun()
+    jobs = claim_jobs(owner, limit)
+    run.claimed = len(jobs)
+    if not jobs:
+        return run
+    now = timezone.now()
+    actions = {}
+    starting = []
+    for job in jobs:
+        if job.status == 'submitted' or job.submitted_at:
+            actions[job.id] = 'verify'
+        else:
+            actions[job.id] = 'submit'
+            job.submitted_at = now
+            starting.append(job)
+    # Record the send before making it, so a crash mid-request is verified
+    # rather than resubmitted.
+    PayoutJob.objects.filter(id__in=[job.id for job in starting], lease_owner=owner).update(submitted_at=now)
+
+    # Paystack calls only on the pool; database writes stay on this thread.
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1), thread_name_prefix='payout-job') as pool:
+        results = list(pool.map(lambda job: _call(job, actions[job.id]), jobs))
+
+    now = timezone.now()
+    for job, (code, body, error) in zip(jobs, results):
+        _apply(job, actions[job.id], code, body, error, now, run)
+        job.lease_owner = None
+        job.lease_expires_at = None
+        job.updated_at = now
+    write_back(owner, jobs, now, run)
+    return run
+
+
+def _locked(queryset):
+    if connection.features.has_select_for_update:
+        return queryset.select_for_update()
+    return queryset
+
+
+def write_back(owner, jobs, now, run):
+    """Save the jobs ``owner`` still holds and their sells. A job whose
+    lease ran out and was taken by another worker is dropped; its
+    submitted_at is already stored, so that worker verifies before sending."""
+    with dbtx.atomic():
+        held = _locked(PayoutJob.objects.filter(id__in=[job.id for job in jobs], lease_owner=owner))
+        held = set(held.values_list('id', flat=True))
+        kept = [job for job in jobs if job.id in held]
+        run.lost += len(jobs) - len(kept)
+        for job in jobs:
+            if job.id not in held:
+                logger.warning('Lost the lease on payout job %s; leaving it to its new owner', job.reference)
+        completed = set(
+            _locked(Transaction.objects.filter(id__in=[job.transaction_id for job in kept], status='completed'))
+            .values_list('id', flat=True)
+        )
+        sells, newly_completed = [], []
+        for job in kept:
+            t = job.transaction
+            if t.id in completed:
+                # Settled elsewhere while the call was out; the sell is
+                # left as it is and the job just follows it.
+                if job.status in ACTIVE_STATUSES:
+                    job.status = 'succeeded'
+                continue
+            sells.append(t)
+            if t.status == 'completed':
+                newly_completed.append(t)
+        PayoutJob.objects.bulk_update(kept, JOB_FIELDS)
+        Transaction.objects.bulk_update(sells, SELL_FIELDS)
+        Transaction.objects.bulk_update(newly_completed, ['status', 'completed_at'])
+
+
+def wake_job(t):
+    """Make the sell's submitted job due now, so a transfer webhook is
+    acted on by the worker. Returns whether there was one."""
+    return PayoutJob.objects.filter(transaction=t, status='submitted').update(next_attempt_at=timezone.now()) > 0
+
+
+def job_summary():
+    counts = {status: 0 for status, _ in PayoutJob.STATUS_CHOICES}
+    for row in PayoutJob.objects.values('status').annotate(n=Count('id')):
+        counts[row['status']] = row['n']
+    return counts
@@ -0,0 +1,271 @@
+"""Bulk Paystack payouts for confirmed sells.
+
+``run_payouts`` pays every sell whose crypto is confirmed and that has no
+payout yet: it creates missing vendor recipient codes in bulk, then submits
+the transfers through Paystack's bulk transfer endpoint in chunks. Every
+transfer carries a reference derived from the sell's payment_id, so a
+rerun after a crash or timeout cannot pay a sell twice: rows left in
+"submitting" are looked up by reference first and only resubmitted if
+Paystack never saw them. Bulk transfers need OTP disabled on the Paystack
+account.
+
+Only one run pays at a time: a run holds the PayoutRunLock lease until it
+finishes, and a second one raises PayoutRunBusy. The admin endpoint does
+not run payouts itself; ``request_run`` records the request and
+``run_payouts --daemon`` carries it out.
+"""
+import hashlib
+import logging
+import re
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Dict, List
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from api.models import PayoutRunLock, Transaction, Vendor
+from blockchain.leases import default_worker_id
+from payments.paystack import create_recipients_bulk, initiate_bulk_transfer, verify_transfer
+
+logger = logging.getLogger(__name__)
+
+# Paystack transfer status -> Transaction.payout_status
+PAYOUT_STATUSES = {
+    'success': 'success',
+    'failed': 'failed',
+    'reversed': 'failed',
+    'abandoned': 'failed',
+}
+
+
+# Longest a run can hold the lock; a crashed run's lock frees up after this,
+# and its "submitting" sells are recovered by the next run.
+RUN_LOCK_SECONDS = 1800
+
+
+class PayoutRunBusy(Exception):
+    """Another payout run holds the lock."""
+
+
+@dataclass
+class PayoutRun:
+    ready: int = 0
+    amount_ghs: float = 0.0
+    recipients_created: int = 0
+    recovered: int = 0
+    submitted: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    skipped: List[str] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+
+
+def chunk_size():
+    return max(int(getattr(settings, 'PAYSTACK_BULK_CHUNK', 100)), 1)
+
+
+def payout_reference(payment_id):
+    """Paystack references are 16-50 chars of a-z, 0-9, - and _."""
+    reference = re.sub(r'[^a-z0-9_-]', '-', f'payout-{payment_id}'.lower())
+    if len(reference) > 50:
+        reference = 'payout-' + hashlib.sha1(payment_id.encode('utf-8')).hexdigest()
+    return reference.ljust(16, '0')
+
+
+def run_lock():
+    return PayoutRunLock.objects.get_or_create(name='payouts')[0]
+
+
+def acquire_run_lock(owner):
+    """Lease the run lock to ``owner`` and clear any pending request, which
+    this run now answers. Returns whether the lock was free."""
+    lock = run_lock()
+    now = timezone.now()
+    free = Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now)
+    return PayoutRunLock.objects.filter(free, pk=lock.pk).update(
+        lease_owner=owner,
+        lease_expires_at=now + timedelta(seconds=RUN_LOCK_SECONDS),
+        requested_at=None,
+        requested_by='',
+    ) > 0
+
+
+def release_run_lock(owner):
+    PayoutRunLock.objects.filter(name='payouts', lease_owner=owner).update(lease_owner=None, lease_expires_at=None)
+
+
+def request_run(requested_by):
+    """Ask the payout daemon for a run; repeated requests collapse into one."""
+    lock = run_lock()
+    PayoutRunLock.objects.filter(pk=lock.pk, requested_at__isnull=True).update(
+        requested_at=timezone.now(),
+        requested_by=requested_by[:255],
+    )
+    lock.refresh_from_db()
+    return lock
+
+
+def run_requested():
+    return PayoutRunLock.objects.filter(name='payouts', requested_at__isnull=False).exists()
+
+
+def ready_for_payout():
+    return (
+        Transaction.objects.filter(type='sell', status='crypto_confirmed', fiat_amount__gt=0)
+        .filter(Q(payout_status__isnull=True) | Q(payout_status='') | Q(payout_status='submitting'))
+        .select_related('vendor')
+        .order_by('confirmed_at', 'id')
+    )
+
+
+def apply_transfer(t, data, now):
+    """Copy a Paystack transfer object onto the sell, in memory."""
+    t.transfer_code = data.get('transfer_code') or t.transfer_code
+    t.payout_status = PAYOUT_STATUSES.get(data.get('status'), 'processing')
+    if t.payout_status == 'success':
+        t.status = 'completed'
+        t.completed_at = now
+
+
+PAYOUT_FIELDS = ['payout_status', 'payout_reference', 'transfer_code', 'status', 'completed_at']
+
+
+def recover_submitted(transactions, run):
+    """Look up sells a previous run left in "submitting" and return the ones
+    Paystack has no transfer for, which are safe to submit again."""
+    now = timezone.now()
+    resubmit, found = [], []
+    for t in transactions:
+        try:
+            code, body = verify_transfer(t.payout_reference)
+        except Exception as exc:
+            run.errors.append(f'{t.payment_id}: verify failed: {exc}')
+            continue
+        if code == 200 and body.get('status') and body.get('data'):
+            apply_transfer(t, body['data'], now)
+            found.append(t)
+        elif code == 404 or (code == 400 and not body.get('status')):
+            resubmit.append(t)
+        else:
+            run.errors.append(f'{t.payment_id}: verify returned {code}')
+    if found:
+        Transaction.objects.bulk_update(found, PAYOUT_FIELDS)
+        run.recovered += len(found)
+    return resubmit
+
+
+def resolve_recipients(vendors, run):
+    """Create Paystack recipient codes for vendors that have none, in bulk."""
+    missing = [v for v in vendors if not v.paystack_recipient_code and v.momo_number]
+    for start in range(0, len(missing), chunk_size()):
+        chunk = missing[start:start + chunk_size()]
+        try:
+            code, body = create_recipients_bulk([(v.name, v.email, v.momo_number) for v in chunk])
+        except Exception as exc:
+            run.errors.append(f'recipient batch failed: {exc}')
+            continue
+        if code not in (200, 201) or not body.get('status'):
+            run.errors.append(f'recipient batch returned {code}: {body.get("message")}')
+            continue
+        data = body.get('data') or {}
+        created = data.get('success') or []
+        if all(entry.get('email') for entry in created):
+            by_email = {entry['email'].lower(): entry for entry in created}
+        elif not data.get('errors'):
+            # Without an email echo, rely on Paystack keeping the batch order.
+            by_email = {v.email.lower(): entry for v, entry in zip(chunk, created)}
+        else:
+            by_email = {}
+        updated = []
+        for v in chunk:
+            entry = by_email.get(v.email.lower())
+            if entry and entry.get('recipient_code'):
+                v.paystack_recipient_code = entry['recipient_code']
+                updated.append(v)
+        Vendor.objects.bulk_update(updated, ['paystack_recipient_code'])
+        run.recipients_created += len(updated)
+        for error in data.get('errors') or []:
+            run.errors.append(f'recipient error: {error}')
+
+
+def submit_transfers(transactions, run):
+    for start in range(0, len(transactions), chunk_size()):
+        chunk = transactions[start:start + chunk_size()]
+        for t in chunk:
+            t.payout_status = 'submitting'
+        # Record the references before calling Paystack, so a crash
+        # mid-request is recovered by reference on the next run.
+        Transaction.objects.bulk_update(chunk, ['payout_status', 'payout_reference'])
+        try:
+            code, body = initiate_bulk_transfer([
+                (t.fiat_amount, t.vendor.paystack_recipient_code, t.payout_reference, f'Payout {t.payment_id}')
+                for t in chunk
+            ])
+        except Exception as exc:
+            run.errors.append(f'transfer batch failed: {exc}')
+            continue
+        if code not in (200, 201) or not body.get('status'):
+            run.errors.append(f'transfer batch returned {code}: {body.get("message")}')
+            continue
+        now = timezone.now()
+        results: Dict[str, dict] = {entry.get('reference'): entry for entry in body.get('data') or []}
+        answered = []
+        for t in chunk:
+            entry = results.get(t.payout_reference)
+            if entry:
+                apply_transfer(t, entry, now)
+                answered.append(t)
+        Transaction.objects.bulk_update(answered, PAYOUT_FIELDS)
+        run.submitted += len(answered)
+
+
+def run_payouts(dry_run=False, owner=None):
+    """Pay every ready sell, holding the run lock as ``owner`` throughout.
+    Raises PayoutRunBusy if another run holds it; a dry run needs no lock."""
+    if dry_run:
+        return pay_ready(dry_run=True)
+    owner = owner or default_worker_id()
+    if not acquire_run_lock(owner):
+        raise PayoutRunBusy()
+    try:
+        return pay_ready()
+    finally:
+        release_run_lock(owner)
+
+
+def pay_ready(dry_run=False):
+    run = PayoutRun()
+    transactions = list(ready_for_payout())
+    run.ready = len(transactions)
+    run.amount_ghs = round(sum(t.fiat_amount for t in transactions), 2)
+    if dry_run or not transactions:
+        return run
+
+    submitting = [t for t in transactions if t.payout_status == 'submitting' and t.payout_reference]
+    submitting_ids = {t.id for t in submitting}
+    fresh = [t for t in transactions if t.id not in submitting_ids]
+    pending = recover_submitted(submitting, run) + fresh
+
+    # One instance per vendor, so a code created for it reaches every sell.
+    vendors = {t.vendor_id: t.vendor for t in pending}
+    resolve_recipients(list(vendors.values()), run)
+    payable = []
+    for t in pending:
+        t.vendor = vendors[t.vendor_id]
+        if not t.vendor.paystack_recipient_code:
+            run.skipped.append(t.payment_id)
+            continue
+        t.payout_reference = t.payout_reference or payout_reference(t.payment_id)
+        payable.append(t)
+    submit_transfers(payable, run)
+
+    for t in transactions:
+        if t.payout_status == 'success':
+            run.succeeded += 1
+        elif t.payout_status == 'failed':
+            run.failed += 1
+    for error in run.errors:
+        logger.warning('Payout run: %s', error)
+    return run
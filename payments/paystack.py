@@ -1,22 +1,59 @@
-import requests
 from django.conf import settings
 
-BASE = getattr(settings, 'PAYSTACK_BASE_URL', 'https://api.paystack.co')
-KEY = getattr(settings, 'PAYSTACK_SECRET_KEY', '')
+from cvp_django import http_client
+
+# Read on every call rather than at import, so PAYSTACK_BASE_URL can be
+# pointed at the local stand-in (payments.standin) per process or per test.
+def _base():
+    return getattr(settings, 'PAYSTACK_BASE_URL', 'https://api.paystack.co').rstrip('/')
 
 def _headers():
-    return {'Authorization': f'Bearer {KEY}', 'Content-Type': 'application/json'}
+    key = getattr(settings, 'PAYSTACK_SECRET_KEY', '')
+    return {'Authorization': f'Bearer {key}', 'Content-Type': 'application/json'}
+
+def _recipient_data(name, email, momo_number):
+    return {'type': 'mobile_money', 'name': name, 'email': email, 'mobile_money': {'phone': momo_number, 'provider': 'mtn'}}
 
 def create_recipient(name, email, momo_number):
-    data = {'type': 'mobile_money', 'name': name, 'email': email, 'mobile_money': {'phone': momo_number, 'provider': 'mtn'}}
-    r = requests.post(f'{BASE}/transferrecipient', json=data, headers=_headers(), timeout=10)
+    data = _recipient_data(name, email, momo_number)
+    r = http_client.post(f'{_base()}/transferrecipient', json=data, headers=_headers(), timeout=10)
+    return r.status_code, r.json()
+
+def create_recipients_bulk(recipients):
+    """recipients: list of (name, email, momo_number)"""
+    data = {'batch': [_recipient_data(*recipient) for recipient in recipients]}
+    r = http_client.post(f'{_base()}/transferrecipient/bulk', json=data, headers=_headers(), timeout=30)
     return r.status_code, r.json()
 
-def initiate_transfer(amount_ghs, recipient_code, reason):
+def initiate_transfer(amount_ghs, recipient_code, reason, reference=None):
     data = {'source': 'balance', 'amount': int(round(amount_ghs * 100)), 'recipient': recipient_code, 'reason': reason, 'currency': 'GHS'}
-    r = requests.post(f'{BASE}/transfer', json=data, headers=_headers(), timeout=10)
+    if reference:
+        data['reference'] = reference
+    r = http_client.post(f'{_base()}/transfer', json=data, headers=_headers(), timeout=10)
+    return r.status_code, r.json()
+
+def initiate_bulk_transfer(transfers):
+    """transfers: list of (amount_ghs, recipient_code, reference, reason). Each
+    reference is the idempotency key: Paystack rejects a reference it has seen."""
+    data = {
+        'source': 'balance',
+        'currency': 'GHS',
+        'transfers': [
+            {'amount': int(round(amount_ghs * 100)), 'recipient': recipient_code, 'reference': reference, 'reason': reason}
+            for amount_ghs, recipient_code, reference, reason in transfers
+        ],
+    }
+    r = http_client.post(f'{_base()}/transfer/bulk', json=data, headers=_headers(), timeout=60)
     return r.status_code, r.json()
 
 def verify_transfer(reference):
-    r = requests.get(f'{BASE}/transfer/verify/{reference}', headers=_headers(), timeout=10)
-    return r.status_code, r.json()
\ No newline at end of file
+    r = http_client.get(f'{_base()}/transfer/verify/{reference}', headers=_headers(), timeout=10)
+    return r.status_code, r.json()
+
+def list_transactions(params):
+    r = http_client.get(f'{_base()}/transaction', params=params, headers=_headers(), timeout=20)
+    return r.status_code, r.json()
+
+def list_transfers(params):
+    r = http_client.get(f'{_base()}/transfer', params=params, headers=_headers(), timeout=20)
+    return r.status_code, r.json()
@@ -0,0 +1,200 @@
+"""Incremental reconciliation against Paystack's listings.
+
+Catches state the webhook inbox and the callback page missed: charges that
+succeeded without the BuyOrder being marked paid or the VIP upgrade being
+recorded, and payouts whose final status never arrived. Each listing is read from a
+persisted cursor up to the start of the run, one page at a time, and every
+page is matched with a few ``__in`` lookups on indexed columns and written
+back with ``bulk_update``. A run therefore costs roughly one request and a
+handful of queries per page of new activity.
+"""
+import logging
+from dataclasses import dataclass, field
+from datetime import timedelta
+from decimal import Decimal
+from typing import Dict, List
+
+from django.conf import settings
+from django.db import transaction as dbtx
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from api.models import BuyOrder, PaystackSyncCursor, Transaction, Vendor
+from learn_crypto.models import Membership, Payment
+from payments.paystack import list_transactions, list_transfers
+from payments.payouts import PAYOUT_STATUSES
+
+logger = logging.getLogger(__name__)
+
+# References the VIP upgrade page gives its inline checkouts.
+VIP_PREFIX = 'VIP_'
+VIP_DAYS = 30
+
+
+@dataclass
+class SyncReport:
+    stream: str
+    pages: int = 0
+    records: int = 0
+    applied: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def iter_pages(fetch, since, until, report):
+    """Yield the ``data`` list of each listing page between ``since`` and
+    ``until``. Stops at the last page or the first failed request."""
+    per_page = int(_setting('PAYSTACK_SYNC_PAGE_SIZE', 100))
+    page = 1
+    while True:
+        params = {'perPage': per_page, 'page': page, 'to': until.isoformat()}
+        if since:
+            params['from'] = since.isoformat()
+        try:
+            code, body = fetch(params)
+        except Exception as exc:
+            report.errors.append(f'page {page}: {exc}')
+            return
+        if code != 200 or not body.get('status'):
+            report.errors.append(f'page {page} returned {code}: {body.get("message")}')
+            return
+        records = body.get('data') or []
+        report.pages += 1
+        report.records += len(records)
+        yield records
+        meta = body.get('meta') or {}
+        if not records or page >= int(meta.get('pageCount') or page):
+            return
+        page += 1
+
+
+def apply_charges(records):
+    """Mark buy orders and VIP payments paid for successful charges.
+    Returns how many rows changed."""
+    now = timezone.now()
+    paid = {r.get('reference'): r for r in records if r.get('status') == 'success' and r.get('reference')}
+    if not paid:
+        return 0
+    orders = list(BuyOrder.objects.filter(order_id__in=paid).exclude(payment_status='paid'))
+    for b in orders:
+        b.payment_status = 'paid'
+        b.paid_at = now
+        b.status = 'processing'
+        b.paystack_reference = b.order_id
+    buys = list(
+        Transaction.objects.filter(type='buy', payment_id__in=[b.order_id for b in orders])
+        .exclude(status__in=['processing', 'completed'])
+    )
+    for t in buys:
+        t.status = 'processing'
+    payments, memberships = vip_payments(paid, now)
+    with dbtx.atomic():
+        BuyOrder.objects.bulk_update(orders, ['payment_status', 'paid_at', 'status', 'paystack_reference'])
+        Transaction.objects.bulk_update(buys, ['status'])
+        Membership.objects.bulk_update(memberships, ['is_vip', 'expiry_date'])
+        Payment.objects.bulk_update([p for p in payments if p.pk], ['status', 'membership'])
+        Payment.objects.bulk_create([p for p in payments if not p.pk], ignore_conflicts=True)
+    return len(orders) + len(payments)
+
+
+def vip_payments(paid, now):
+    """Return the Payments to save for successful VIP charges, and the
+    memberships they extend. The upgrade page checks out in the browser and
+    only records a Payment once ``verify_payment`` succeeds, so a charge
+    whose verify never happened is tied to its vendor by the customer
+    email and gets its Payment created here."""
+    vip = {ref: r for ref, r in paid.items() if ref.startswith(VIP_PREFIX)}
+    if not vip:
+        return [], []
+    existing = {p.reference: p for p in Payment.objects.filter(reference__in=vip).select_related('membership')}
+    emails = {
+        ref: ((r.get('customer') or {}).get('email') or '').lower()
+        for ref, r in vip.items() if ref not in existing
+    }
+    vendors = {
+        v.email_lower: v
+        for v in Vendor.objects.annotate(email_lower=Lower('email')).filter(email_lower__in=set(emails.values()))
+    }
+    held = {m.user_id: m for m in Membership.objects.filter(user__in=vendors.values())}
+    payments = [p for p in existing.values() if p.status != 'success']
+    for ref, email in emails.items():
+        vendor = vendors.get(email)
+        if vendor is None:
+            logger.warning('VIP charge %s: no vendor with email %r', ref, email)
+            continue
+        amount = Decimal(vip[ref].get('amount') or 0) / 100
+        payments.append(Payment(user=vendor, amount=amount, reference=ref))
+    memberships = {}
+    for payment in payments:
+        payment.status = 'success'
+        membership = payment.membership or held.get(payment.user_id)
+        if membership is None:
+            membership = held[payment.user_id] = Membership.objects.get_or_create(user_id=payment.user_id)[0]
+        membership.is_vip = True
+        membership.expiry_date = now + timedelta(days=VIP_DAYS)
+        payment.membership = membership
+        memberships[membership.pk] = membership
+    return payments, list(memberships.values())
+
+
+def apply_transfers(records):
+    """Carry final transfer statuses over to the sells they paid out.
+
+    Records are matched on the sell's current payout_reference only: a
+    payout that failed and was retried under a new reference still carries
+    the old transfer_code, and the old transfer's failure must not reach it.
+    """
+    now = timezone.now()
+    final = {}
+    for r in records:
+        status = PAYOUT_STATUSES.get(r.get('status'))
+        if status and r.get('reference'):
+            final[r['reference']] = status
+    if not final:
+        return 0
+    changed = []
+    for t in Transaction.objects.filter(payout_reference__in=final).exclude(payout_status='success'):
+        status = final[t.payout_reference]
+        if status == t.payout_status:
+            continue
+        t.payout_status = status
+        if status == 'success':
+            t.status = 'completed'
+            t.completed_at = now
+        changed.append(t)
+    Transaction.objects.bulk_update(changed, ['payout_status', 'status', 'completed_at'])
+    return len(changed)
+
+
+STREAMS = {
+    'transactions': (list_transactions, apply_charges),
+    'transfers': (list_transfers, apply_transfers),
+}
+
+
+def sync_stream(stream, full=False):
+    fetch, apply = STREAMS[stream]
+    report = SyncReport(stream)
+    cursor, _ = PaystackSyncCursor.objects.get_or_create(stream=stream)
+    until = timezone.now()
+    since = None
+    if cursor.synced_to and not full:
+        # Re-read a margin before the cursor: Paystack filters on creation
+        # time, and recent transfers may only have settled since.
+        since = cursor.synced_to - timedelta(seconds=int(_setting('PAYSTACK_SYNC_OVERLAP', 1800)))
+    for records in iter_pages(fetch, since, until, report):
+        report.applied += apply(records)
+    if not report.errors:
+        cursor.synced_to = until
+        cursor.updated_at = timezone.now()
+        cursor.save()
+    for error in report.errors:
+        logger.warning('Paystack %s sync: %s', stream, error)
+    return report
+
+
+def sync_all(full=False) -> Dict[str, SyncReport]:
+    return {stream: sync_stream(stream, full) for stream in STREAMS}
@@ -0,0 +1,532 @@
+"""Local stand-in for the Paystack API.
+
+Answers the endpoints this project calls (transaction initialize, verify
+and listing; transfer recipients, single and bulk transfers, transfer
+verify and listing) from memory, on one threaded keep-alive HTTP server.
+``authorization_url`` points back at the stand-in: fetching it plays the
+customer completing checkout and redirects to the order's callback_url.
+Successful charges and settled transfers are announced with webhooks
+signed like Paystack's (HMAC-SHA512 of the body with the secret key).
+
+Latency, 500s and stalls are injected at configurable rates. A stalled
+request is applied and then answered late, which is how a client timeout
+against the real API looks: the write may have happened. Point
+PAYSTACK_BASE_URL at ``url`` (or run ``manage.py paystack_standin``) to
+use it.
+"""
+import hashlib
+import heapq
+import hmac
+import itertools
+import json
+import random
+import secrets
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+
+def _now():
+    return datetime.now(dt_timezone.utc)
+
+
+def _iso(moment):
+    return moment.isoformat().replace('+00:00', 'Z') if moment else None
+
+
+def _parse_time(value):
+    try:
+        moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return None
+    return moment if moment.tzinfo else moment.replace(tzinfo=dt_timezone.utc)
+
+
+def sign(secret, body):
+    return hmac.new(secret.encode('utf-8'), body, hashlib.sha512).hexdigest()
+
+
+class PaystackStandin:
+    """Threaded HTTP server answering as the Paystack API.
+
+    ``latency`` and ``jitter`` are seconds. ``error_rate`` is the fraction
+    of API calls answered with a 500 before doing anything; ``stall_rate``
+    the fraction applied but answered ``stall`` seconds late. Transfers
+    stay pending for ``settle_after`` seconds and then succeed, or fail at
+    ``transfer_failure_rate``. Webhooks go to ``webhook_url`` after
+    ``webhook_delay`` seconds, are retried ``webhook_retries`` times on
+    anything but a 200, and are delivered twice at ``duplicate_rate``.
+    """
+
+    def __init__(
+        self,
+        secret_key,
+        webhook_url=None,
+        latency=0.05,
+        jitter=0.02,
+        error_rate=0.0,
+        stall_rate=0.0,
+        stall=30.0,
+        settle_after=1.0,
+        transfer_failure_rate=0.0,
+        webhook_delay=0.2,
+        webhook_retries=3,
+        duplicate_rate=0.0,
+        webhook_workers=4,
+        host='127.0.0.1',
+        port=0,
+    ):
+        self.secret_key = secret_key
+        self.webhook_url = webhook_url
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.settle_after = settle_after
+        self.transfer_failure_rate = transfer_failure_rate
+        self.webhook_delay = webhook_delay
+        self.webhook_retries = webhook_retries
+        self.duplicate_rate = duplicate_rate
+        self.transactions: Dict[str, dict] = {}
+        self.access_codes: Dict[str, str] = {}
+        self.recipients: Dict[str, dict] = {}
+        self.transfers: Dict[str, dict] = {}
+        self.transfer_codes: Dict[str, str] = {}
+        self.requests = 0
+        self.connections = 0
+        self.calls: Counter = Counter()
+        self.injected: Counter = Counter()
+        self.webhooks: Counter = Counter()
+        self._ids = itertools.count(1_000_000)
+        self._lock = threading.Lock()
+        # (due, sequence, event, data, attempt) waiting for delivery.
+        self._pending = []
+        self._pending_ready = threading.Condition(self._lock)
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._stopping = False
+        self._senders = ThreadPoolExecutor(max_workers=webhook_workers, thread_name_prefix='standin-webhook')
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._threads = []
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        for target, name in ((self._server.serve_forever, 'standin-paystack'), (self._dispatch, 'standin-dispatch')):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        with self._lock:
+            self._stopping = True
+            self._pending_ready.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+        self._senders.shutdown(wait=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # -- request handling --------------------------------------------------
+
+    def _fault(self) -> Tuple[Optional[int], float]:
+        """Sleep for the simulated latency, then pick an injected 500 or a
+        stall to add after the request has been applied."""
+        delay = random.gauss(self.latency, self.jitter) if self.jitter else self.latency
+        if delay > 0:
+            time.sleep(delay)
+        roll = random.random()
+        if roll < self.error_rate:
+            return 500, 0.0
+        if roll < self.error_rate + self.stall_rate:
+            return None, self.stall
+        return None, 0.0
+
+    def _handler_class(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                with standin._lock:
+                    standin.connections += 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, headers=None):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up on a stalled call.
+                    self.close_connection = True
+
+            def _handle(self, method):
+                parts = urlsplit(self.path)
+                path = parts.path.rstrip('/')
+                query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+                with standin._lock:
+                    standin.requests += 1
+                if path.startswith('/checkout/'):
+                    status, body, headers = standin.checkout(path.rsplit('/', 1)[-1], query)
+                    self._send(status, body, headers)
+                    return
+                payload = None
+                if method == 'POST':
+                    # Read the body even when refusing the call, so the
+                    # keep-alive connection stays usable.
+                    length = int(self.headers.get('Content-Length') or 0)
+                    try:
+                        payload = json.loads(self.rfile.read(length) or b'{}')
+                    except ValueError:
+                        self._send(400, {'status': False, 'message': 'Invalid JSON'})
+                        return
+                if self.headers.get('Authorization') != f'Bearer {standin.secret_key}':
+                    self._send(401, {'status': False, 'message': 'Invalid key'})
+                    return
+                injected, stall = standin._fault()
+                if injected:
+                    standin._count(standin.injected, str(injected))
+                    self._send(injected, {'status': False, 'message': 'Injected failure'})
+                    return
+                status, body = standin.route(method, path, query, payload)
+                if stall:
+                    standin._count(standin.injected, 'stall')
+                    time.sleep(stall)
+                self._send(status, body)
+
+            def do_GET(self):
+                self._handle('GET')
+
+            def do_POST(self):
+                self._handle('POST')
+
+        return Handler
+
+    def _count(self, counter, key, amount=1):
+        with self._lock:
+            counter[key] += amount
+
+    def route(self, method, path, query, payload):
+        if method == 'POST' and not isinstance(payload, dict):
+            return 400, {'status': False, 'message': 'Invalid payload'}
+        routes = {
+            ('POST', '/transaction/initialize'): lambda: self.initialize(payload),
+            ('GET', '/transaction'): lambda: self.listing(self.transactions, query),
+            ('POST', '/transferrecipient'): lambda: self.create_recipient(payload),
+            ('POST', '/transferrecipient/bulk'): lambda: self.create_recipients(payload),
+            ('POST', '/transfer'): lambda: self.transfer(payload),
+            ('POST', '/transfer/bulk'): lambda: self.bulk_transfer(payload),
+            ('GET', '/transfer'): lambda: self.listing(self.transfers, query),
+        }
+        key = (method, path)
+        if key not in routes:
+            for prefix, handler in (
+                ('/transaction/verify/', self.verify_transaction),
+                ('/transfer/verify/', self.verify_transfer),
+            ):
+                if method == 'GET' and path.startswith(prefix):
+                    key = (method, prefix.rstrip('/'))
+                    routes[key] = lambda handler=handler: handler(path[len(prefix):])
+                    break
+        if key not in routes:
+            return 404, {'status': False, 'message': 'Not found'}
+        self._count(self.calls, f'{key[0]} {key[1]}')
+        return routes[key]()
+
+    # -- transactions --------------------------------------------------------
+
+    def initialize(self, payload):
+        try:
+            amount = int(payload.get('amount'))
+        except (TypeError, ValueError):
+            return 400, {'status': False, 'message': 'Invalid Amount Sent'}
+        email = payload.get('email')
+        if not email:
+            return 400, {'status': False, 'message': 'Invalid Email Address Passed'}
+        reference = payload.get('reference') or secrets.token_hex(8)
+        access_code = secrets.token_hex(8)
+        with self._lock:
+            if reference in self.transactions:
+                return 400, {'status': False, 'message': 'Duplicate Transaction Reference'}
+            self.transactions[reference] = {
+                'id': next(self._ids),
+                'reference': reference,
+                'amount': amount,
+                'currency': payload.get('currency') or 'GHS',
+                'status': 'abandoned',
+                'gateway_response': 'The transaction was not completed',
+                'channel': 'mobile_money',
+                'customer': {'email': email},
+                'metadata': payload.get('metadata'),
+                'callback_url': payload.get('callback_url'),
+                'createdAt': _now(),
+                'paid_at': None,
+            }
+            self.access_codes[access_code] = reference
+        return 200, {
+            'status': True,
+            'message': 'Authorization URL created',
+            'data': {
+                'authorization_url': f'{self.url}/checkout/{access_code}',
+                'access_code': access_code,
+                'reference': reference,
+            },
+        }
+
+    def pay(self, reference, outcome='success'):
+        """Settle a charge as the customer would, and schedule its webhook."""
+        with self._lock:
+            charge = self.transactions.get(reference)
+            if charge is None or charge['status'] != 'abandoned':
+                return charge
+            charge['status'] = outcome
+            charge['gateway_response'] = 'Approved' if outcome == 'success' else 'Declined'
+            if outcome == 'success':
+                charge['paid_at'] = _now()
+                self._schedule_locked('charge.success', self._public(charge))
+        return charge
+
+    def checkout(self, access_code, query):
+        reference = self.access_codes.get(access_code)
+        if reference is None:
+            return 404, {'status': False, 'message': 'Unknown access code'}, None
+        self._count(self.calls, 'GET /checkout')
+        charge = self.pay(reference, 'failed' if query.get('outcome') == 'failed' else 'success')
+        if not charge.get('callback_url'):
+            return 200, {'status': True, 'data': self._public(charge)}, None
+        separator = '&' if '?' in charge['callback_url'] else '?'
+        location = charge['callback_url'] + separator + urlencode({'trxref': reference, 'reference': reference})
+        return 302, {'status': True}, {'Location': location}
+
+    def verify_transaction(self, reference):
+        charge = self.transactions.get(reference)
+        if charge is None:
+            return 400, {'status': False, 'message': 'Transaction reference not found'}
+        return 200, {'status': True, 'message': 'Verification successful', 'data': self._public(charge)}
+
+    # -- transfers -----------------------------------------------------------
+
+    def _recipient(self, data):
+        if not data.get('name') or not data.get('type'):
+            return None
+        code = f'RCP_{secrets.token_hex(8)}'
+        recipient = {
+            'id': next(self._ids),
+            'recipient_code': code,
+            'type': data['type'],
+            'name': data['name'],
+            'email': data.get('email'),
+            'details': data.get('mobile_money') or {'account_number': data.get('account_number')},
+            'active': True,
+        }
+        with self._lock:
+            self.recipients[code] = recipient
+        return recipient
+
+    def create_recipient(self, payload):
+        recipient = self._recipient(payload)
+        if recipient is None:
+            return 400, {'status': False, 'message': 'Name and type are required'}
+        return 201, {'status': True, 'message': 'Transfer recipient created successfully', 'data': recipient}
+
+    def create_recipients(self, payload):
+        created, errors = [], []
+        for index, data in enumerate(payload.get('batch') or []):
+            recipient = self._recipient(data)
+            if recipient is None:
+                errors.append({'message': 'Name and type are required', 'index': index})
+            else:
+                created.append(recipient)
+        return 200, {'status': True, 'message': 'Recipients added successfully', 'data': {'success': created, 'errors': errors}}
+
+    def _transfer(self, data, currency):
+        """Create a pending transfer, or return an error message."""
+        try:
+            amount = int(data.get('amount'))
+        except (TypeError, ValueError):
+            return None, 'Invalid amount'
+        recipient = self.recipients.get(data.get('recipient'))
+        if recipient is None:
+            return None, 'Recipient specified is invalid'
+        reference = data.get('reference') or secrets.token_hex(10)
+        code = f'TRF_{secrets.token_hex(8)}'
+        transfer = {
+            'id': next(self._ids),
+            'transfer_code': code,
+            'reference': reference,
+            'amount': amount,
+            'currency': currency,
+            'reason': data.get('reason'),
+            'recipient': recipient['recipient_code'],
+            'status': 'pending',
+            'createdAt': _now(),
+        }
+        with self._lock:
+            if reference in self.transfers:
+                return None, 'Transfer reference already exists'
+            self.transfers[reference] = transfer
+            self.transfer_codes[code] = reference
+        threading.Timer(self.settle_after, self._settle, args=(reference,)).start()
+        return transfer, None
+
+    def _settle(self, reference):
+        with self._lock:
+            transfer = self.transfers[reference]
+            if transfer['status'] != 'pending':
+                return
+            transfer['status'] = 'failed' if random.random() < self.transfer_failure_rate else 'success'
+            self._schedule_locked(f"transfer.{transfer['status']}", self._public(transfer))
+
+    def transfer(self, payload):
+        transfer, error = self._transfer(payload, payload.get('currency') or 'GHS')
+        if error:
+            return 400, {'status': False, 'message': error}
+        return 200, {'status': True, 'message': 'Transfer has been queued', 'data': self._public(transfer)}
+
+    def bulk_transfer(self, payload):
+        entries = payload.get('transfers') or []
+        references = [entry.get('reference') for entry in entries]
+        if any(not reference for reference in references) or len(set(references)) != len(references):
+            return 400, {'status': False, 'message': 'Each transfer needs a unique reference'}
+        data = []
+        for entry in entries:
+            transfer, error = self._transfer(entry, payload.get('currency') or 'GHS')
+            if error:
+                return 400, {'status': False, 'message': f"{entry['reference']}: {error}"}
+            data.append({key: transfer[key] for key in ('reference', 'recipient', 'amount', 'transfer_code', 'currency', 'status')})
+        return 200, {'status': True, 'message': f'{len(data)} transfers queued.', 'data': data}
+
+    def verify_transfer(self, reference):
+        transfer = self.transfers.get(reference) or self.transfers.get(self.transfer_codes.get(reference, ''))
+        if transfer is None:
+            return 404, {'status': False, 'message': 'Transfer not found'}
+        return 200, {'status': True, 'message': 'Transfer retrieved', 'data': self._public(transfer)}
+
+    # -- listings ------------------------------------------------------------
+
+    def listing(self, records, query):
+        try:
+            per_page = max(int(query.get('perPage', 50)), 1)
+            page = max(int(query.get('page', 1)), 1)
+        except ValueError:
+            return 400, {'status': False, 'message': 'Invalid pagination'}
+        since, until = _parse_time(query.get('from')), _parse_time(query.get('to'))
+        with self._lock:
+            matching = [
+                record for record in records.values()
+                if (since is None or record['createdAt'] >= since) and (until is None or record['createdAt'] <= until)
+            ]
+        matching.sort(key=lambda record: record['createdAt'], reverse=True)
+        rows = matching[(page - 1) * per_page:page * per_page]
+        return 200, {
+            'status': True,
+            'message': 'Records retrieved',
+            'data': [self._public(record) for record in rows],
+            'meta': {
+                'total': len(matching),
+                'perPage': per_page,
+                'page': page,
+                'pageCount': max((len(matching) + per_page - 1) // per_page, 1),
+            },
+        }
+
+    @staticmethod
+    def _public(record):
+        public = {key: value for key, value in record.items() if key != 'callback_url'}
+        for key in ('createdAt', 'paid_at'):
+            if key in public:
+                public[key] = _iso(public[key])
+        return public
+
+    # -- webhooks ------------------------------------------------------------
+
+    def _schedule_locked(self, event, data, attempt=0, delay=None):
+        if not self.webhook_url:
+            return
+        due = time.monotonic() + (self.webhook_delay if delay is None else delay)
+        heapq.heappush(self._pending, (due, next(self._sequence), event, data, attempt))
+        if attempt == 0 and random.random() < self.duplicate_rate:
+            self.webhooks['duplicated'] += 1
+            heapq.heappush(self._pending, (due + self.webhook_delay, next(self._sequence), event, data, attempt))
+        self._pending_ready.notify()
+
+    def _dispatch(self):
+        with self._lock:
+            while not self._stopping:
+                if not self._pending:
+                    self._pending_ready.wait()
+                    continue
+                wait = self._pending[0][0] - time.monotonic()
+                if wait > 0:
+                    self._pending_ready.wait(wait)
+                    continue
+                _, _, event, data, attempt = heapq.heappop(self._pending)
+                self._in_flight += 1
+                self._senders.submit(self._deliver, event, data, attempt)
+
+    def _deliver(self, event, data, attempt):
+        body = json.dumps({'event': event, 'data': data}).encode()
+        request = urllib.request.Request(
+            self.webhook_url,
+            data=body,
+            method='POST',
+            headers={'Content-Type': 'application/json', 'x-paystack-signature': sign(self.secret_key, body)},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                delivered = response.status == 200
+        except (urllib.error.URLError, OSError):
+            delivered = False
+        with self._lock:
+            self._in_flight -= 1
+            if delivered:
+                self.webhooks['delivered'] += 1
+            elif attempt < self.webhook_retries and not self._stopping:
+                self.webhooks['retried'] += 1
+                self._schedule_locked(event, data, attempt + 1, delay=min(2 ** attempt, 30))
+            else:
+                self.webhooks['failed'] += 1
+
+    def webhooks_pending(self):
+        """Webhooks queued or being delivered."""
+        with self._lock:
+            return len(self._pending) + self._in_flight
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'connections': self.connections,
+                'calls': dict(self.calls),
+                'injected': dict(self.injected),
+                'webhooks': dict(self.webhooks),
+                'transactions': len(self.transactions),
+                'transfers': len(self.transfers),
+            }
@@ -0,0 +1,98 @@
+"""Shared cache of Paystack charge verifications.
+
+The callback page verifies the charge it was redirected for. Refreshes
+and browser retries of the same page used to verify again every time.
+``verification_cache`` keeps each reference's outcome in Django's cache.
+Settled charges (success, failed, reversed) are kept for FINAL_TTL.
+Anything else is kept only for PENDING_TTL, so a customer who pays after an
+abandoned attempt is re-checked almost at once.
+
+Concurrent requests for one reference share a single verify call: threads
+of a process wait on a local lock, and processes claim the verify with
+``cache.add`` on a lock key and wait for the holder's outcome. That only
+spans processes when CACHES points at a shared backend (Redis, Memcached,
+the database); with the default in-memory cache each process verifies on
+its own.
+"""
+import threading
+import time
+import zlib
+from typing import Any, Callable, Tuple
+
+from django.core.cache import caches
+
+# Seconds an outcome is reused: settled charges, and everything else
+# (abandoned, pending, errors).
+FINAL_TTL = 3600
+PENDING_TTL = 5
+FINAL_STATUSES = {'success', 'failed', 'reversed'}
+# How long another process's claim on a verify is waited for before this
+# one verifies anyway, and how often its outcome is looked for meanwhile.
+LOCK_TIMEOUT = 15
+LOCK_POLL = 0.1
+LOCAL_LOCKS = 64
+
+_missing = object()
+
+
+def ttl_for(paystack_status):
+    return FINAL_TTL if paystack_status in FINAL_STATUSES else PENDING_TTL
+
+
+class VerificationCache:
+    def __init__(self, alias='default', prefix='paystack-verify'):
+        self.alias = alias
+        self.prefix = prefix
+        # Striped rather than one per reference, so the set stays bounded.
+        self._locks = [threading.Lock() for _ in range(LOCAL_LOCKS)]
+        self._guard = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def store(self):
+        return caches[self.alias]
+
+    def _count(self, hit):
+        with self._guard:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, reference, fetch: Callable[[], Tuple[Any, float]]):
+        """The cached outcome for ``reference``, or ``fetch()``'s. ``fetch``
+        returns ``(outcome, ttl)`` and runs at most once at a time per
+        reference."""
+        key = f'{self.prefix}:{reference}'
+        lock_key = f'{key}:lock'
+        with self._locks[zlib.crc32(reference.encode()) % LOCAL_LOCKS]:
+            outcome = self.store.get(key, _missing)
+            if outcome is not _missing:
+                self._count(hit=True)
+                return outcome
+            deadline = time.monotonic() + LOCK_TIMEOUT
+            claimed = self.store.add(lock_key, 1, LOCK_TIMEOUT)
+            while not claimed and time.monotonic() < deadline:
+                # Another process is verifying this reference.
+                time.sleep(LOCK_POLL)
+                outcome = self.store.get(key, _missing)
+                if outcome is not _missing:
+                    self._count(hit=True)
+                    return outcome
+                claimed = self.store.add(lock_key, 1, LOCK_TIMEOUT)
+            self._count(hit=False)
+            try:
+                outcome, ttl = fetch()
+                self.store.set(key, outcome, ttl)
+            finally:
+                if claimed:
+                    self.store.delete(lock_key)
+            return outcome
+
+    def snapshot(self):
+        with self._guard:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+verification_cache = VerificationCache()
@@ -0,0 +1,219 @@
+"""Paystack webhook inbox.
+
+``PaystackWebhookView`` verifies the signature, appends the delivery with
+``record_event`` and answers straight away. ``process_events``, run by the
+``process_paystack_events`` command, applies stored events in arrival order
+through ``EVENT_HANDLERS``. A redelivered event hits the unique event_key
+and is dropped before any work is done.
+
+Several workers can run at once. Each leases the batch it applies, and
+events for one reference are applied strictly in order: a reference whose
+earliest outstanding event is leased elsewhere or has just failed waits
+until that event succeeds or is given up on after MAX_EVENT_ATTEMPTS.
+"""
+import hashlib
+import hmac
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction as dbtx
+from django.db.models import F, Q
+from django.utils import timezone
+
+from api.models import BuyOrder, PaystackWebhookEvent, PayoutJob, Transaction
+from blockchain.leases import default_worker_id
+from payments.payout_jobs import ACTIVE_STATUSES, wake_job
+
+logger = logging.getLogger(__name__)
+
+# Give up retrying an event after this many failed attempts.
+MAX_EVENT_ATTEMPTS = 5
+# Handlers only touch the database, so a batch is done well within this.
+EVENT_LEASE_SECONDS = 60
+
+
+def verify_signature(raw, signature):
+    secret = getattr(settings, 'PAYSTACK_SECRET_KEY', '')
+    if not signature or not secret:
+        return False
+    computed = hmac.new(secret.encode('utf-8'), raw, hashlib.sha512).hexdigest()
+    return hmac.compare_digest(signature, computed)
+
+
+def event_key(payload):
+    """Paystack sends no delivery id; the event name plus the id of the
+    charge or transfer it is about is stable across retries."""
+    data = payload.get('data') or {}
+    subject = data.get('id') or data.get('transfer_code') or data.get('reference')
+    if not subject:
+        subject = hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    return f"{payload.get('event', '')}:{subject}"[:150]
+
+
+def record_event(payload):
+    """Store a verified delivery, or return ``None`` for a duplicate."""
+    data = payload.get('data') or {}
+    try:
+        with dbtx.atomic():
+            return PaystackWebhookEvent.objects.create(
+                event=(payload.get('event') or '')[:50],
+                event_key=event_key(payload),
+                reference=str(data.get('reference') or '')[:150],
+                payload=payload,
+            )
+    except IntegrityError:
+        return None
+
+
+def handle_charge_success(data):
+    reference = data.get('reference')
+    if not reference:
+        return
+    b = BuyOrder.objects.filter(order_id=reference).first()
+    if b and b.payment_status != 'paid':
+        b.payment_status = 'paid'
+        b.paid_at = timezone.now()
+        b.status = 'processing'  # Move to processing, waiting for delivery
+        b.paystack_reference = reference
+        b.save()
+    t = Transaction.objects.filter(payment_id=reference, type='buy').first()
+    if t and t.status not in ('processing', 'completed'):
+        t.status = 'processing'  # Don't mark completed until delivery
+        t.save()
+
+
+def payout_transaction(data):
+    # Bulk payouts are matched on our own reference, single ones on the
+    # transfer code Paystack returned.
+    if data.get('reference'):
+        t = Transaction.objects.filter(payout_reference=data['reference']).first()
+        if t:
+            return t
+    ref = data.get('reference') or data.get('transfer_code')
+    if ref:
+        return Transaction.objects.filter(transfer_code=ref).first()
+    return None
+
+
+def handle_transfer_success(data):
+    t = payout_transaction(data)
+    if t:
+        t.payout_status = 'success'
+        t.status = 'completed'
+        t.completed_at = timezone.now()
+        t.save()
+        PayoutJob.objects.filter(transaction=t, status__in=ACTIVE_STATUSES).update(
+            status='succeeded',
+            transfer_code=data.get('transfer_code') or '',
+            updated_at=timezone.now(),
+        )
+
+
+def handle_transfer_failed(data):
+    t = payout_transaction(data)
+    if t and t.payout_status != 'success':
+        # A queued payout decides for itself whether to retry or give up.
+        if wake_job(t):
+            return
+        t.payout_status = 'failed'
+        t.save()
+
+
+# Event type -> handler taking the event's data object. Other events are
+# stored and marked processed without doing anything.
+EVENT_HANDLERS = {
+    'charge.success': handle_charge_success,
+    'transfer.success': handle_transfer_success,
+    'transfer.failed': handle_transfer_failed,
+    'transfer.reversed': handle_transfer_failed,
+}
+
+
+def outstanding_events():
+    return PaystackWebhookEvent.objects.filter(processed_at__isnull=True, attempts__lt=MAX_EVENT_ATTEMPTS)
+
+
+def claim_events(owner, limit):
+    """Lease up to ``limit`` outstanding events to ``owner``, oldest first.
+
+    An event is only taken if every earlier outstanding event for its
+    reference is taken with it, so a reference is never split between
+    workers or applied out of order."""
+    now = timezone.now()
+    unleased = Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now)
+    with dbtx.atomic():
+        candidates = outstanding_events().filter(unleased).order_by('id')
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        rows = list(candidates.values_list('id', 'reference')[:limit])
+        if not rows:
+            return []
+        taken = {pk for pk, _ in rows}
+        refs = {ref for _, ref in rows if ref}
+        blocked = set()
+        earlier = (
+            outstanding_events().filter(reference__in=refs, id__lte=max(taken))
+            .order_by('id').values_list('id', 'reference')
+        )
+        for pk, ref in earlier:
+            if pk not in taken:
+                blocked.add(ref)
+            elif ref in blocked:
+                taken.discard(pk)
+        PaystackWebhookEvent.objects.filter(unleased, id__in=taken).update(
+            lease_owner=owner,
+            lease_expires_at=now + timedelta(seconds=EVENT_LEASE_SECONDS),
+        )
+    return list(PaystackWebhookEvent.objects.filter(id__in=taken, lease_owner=owner).order_by('id'))
+
+
+def apply_event(event, owner):
+    """Run the event's handler and mark it processed in one transaction,
+    provided ``owner`` still holds it. Returns whether it was applied."""
+    handler = EVENT_HANDLERS.get(event.event)
+    with dbtx.atomic():
+        # Marking it first also locks the row until the handler commits.
+        marked = PaystackWebhookEvent.objects.filter(
+            pk=event.pk, lease_owner=owner, processed_at__isnull=True,
+        ).update(
+            processed_at=timezone.now(),
+            attempts=F('attempts') + 1,
+            lease_owner=None,
+            lease_expires_at=None,
+        )
+        if not marked:
+            return False
+        if handler:
+            handler(event.payload.get('data') or {})
+    return True
+
+
+def process_events(limit=200, owner=None):
+    """Apply up to ``limit`` stored events, oldest first, and return how
+    many were applied. A failed event stays queued until MAX_EVENT_ATTEMPTS
+    and holds back the later events for its reference until then."""
+    owner = owner or f'paystack-events:{default_worker_id()}'
+    events = claim_events(owner, limit)
+    failed = set()
+    applied = 0
+    for event in events:
+        if event.reference and event.reference in failed:
+            continue
+        try:
+            if apply_event(event, owner):
+                applied += 1
+        except Exception as exc:
+            logger.exception('Paystack event %s (%s) failed', event.pk, event.event)
+            if event.reference:
+                failed.add(event.reference)
+            PaystackWebhookEvent.objects.filter(pk=event.pk, lease_owner=owner).update(
+                attempts=F('attempts') + 1,
+                last_error=str(exc)[:1000],
+            )
+    # Release whatever is left: failed events and the ones held back behind them.
+    PaystackWebhookEvent.objects.filter(
+        id__in=[event.pk for event in events], lease_owner=owner, processed_at__isnull=True,
+    ).update(lease_owner=None, lease_expires_at=None)
+    return applied
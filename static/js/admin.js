@@ -622,6 +622,7 @@ async function deleteAdminAsset(assetId) {
 function getStatusBadge(status) {
     const badges = {
         pending: 'badge-warning',
+        detected: 'badge-info',
         completed: 'badge-success',
         failed: 'badge-danger',
         paid: 'badge-info',
@@ -35,7 +35,7 @@ async function loadSellOrders(page = 1) {
                 <td><span class="badge ${getStatusBadge(o.status)}">${o.status}</span></td>
                 <td>
                     <div class="flex gap-1">
-                        ${o.status === 'pending' ? `
+                        ${['pending', 'detected'].includes(o.status) ? `
                             <button class="btn btn-success text-xs py-1 px-2" onclick="openUpdateSellOrderModal('${o.payment_id}', 'paid')">Mark Paid</button>
                         ` : ''}
                         ${o.status === 'paid' ? `
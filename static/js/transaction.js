@@ -228,6 +228,7 @@ function renderTransactions(transactions) {
 function getStatusBadge(status) {
   const badges = {
     pending: 'badge-warning',
+    detected: 'badge-info',
     paid: 'badge-info',
     sent: 'badge-primary',
     confirmed: 'badge-success',